@@ -0,0 +1,94 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compares per-value and bulk canonicalization of OS and browser columns.
+
+Run from the repository root:
+
+    python -m benchmarks.canonicalize_benchmark --values 1000000
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import argparse
+import itertools
+import timeit
+
+from client_wrapper import canonicalize
+from client_wrapper import names
+
+_OS_VERSIONS = (('Windows', '10.0'), ('Ubuntu', '14.04'), ('OSX', '10.11'))
+_BROWSER_VERSIONS = ((names.CHROME, '49.0.2623'), (names.FIREFOX, '45.0'),
+                     (names.EDGE, '25.10586.0.0'), (names.SAFARI, '9.03'))
+
+
+def create_columns(count):
+    """Creates columns of OS and browser values, as in a results archive."""
+    os_pairs = list(itertools.islice(itertools.cycle(_OS_VERSIONS), count))
+    browser_pairs = list(itertools.islice(
+        itertools.cycle(_BROWSER_VERSIONS), count))
+    oses, os_versions = zip(*os_pairs)
+    browsers, browser_versions = zip(*browser_pairs)
+    return oses, os_versions, browsers, browser_versions
+
+
+def main(args):
+    oses, os_versions, browsers, browser_versions = create_columns(args.values)
+
+    def canonicalize_uncached():
+        # Parses every browser version, as canonicalization did before
+        # browser names were cached.
+        return ([canonicalize.os_to_shortname(os, os_version)
+                 for os, os_version in zip(oses, os_versions)],
+                [canonicalize._parse_browser_canonical_name(browser, version)
+                 for browser, version in zip(browsers, browser_versions)])
+
+    def canonicalize_individually():
+        return ([canonicalize.os_to_shortname(os, os_version)
+                 for os, os_version in zip(oses, os_versions)],
+                [canonicalize.browser_to_canonical_name(browser, version)
+                 for browser, version in zip(browsers, browser_versions)])
+
+    def canonicalize_columns():
+        return (canonicalize.os_to_shortnames(oses, os_versions),
+                canonicalize.browsers_to_canonical_names(browsers,
+                                                         browser_versions))
+
+    if canonicalize_individually() != canonicalize_columns():
+        raise AssertionError('bulk canonicalization output differs')
+
+    print('Canonicalizing %d OS and browser values (best of %d runs):' %
+          (args.values, args.repeat))
+    baseline = None
+    for name, function in (('uncached', canonicalize_uncached),
+                           ('per-value cached', canonicalize_individually),
+                           ('bulk columns', canonicalize_columns)):
+        seconds = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        baseline = baseline or seconds
+        print('  %-24s %8.3fs  %7.3f us/value  %5.2fx' %
+              (name, seconds, seconds / args.values * 1e6, baseline / seconds))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='NDT canonicalization benchmark',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--values',
+                        help='Number of OS and browser values to canonicalize',
+                        type=int,
+                        default=1000000)
+    parser.add_argument('--repeat',
+                        help='Number of times to repeat each measurement',
+                        type=int,
+                        default=3)
+    main(parser.parse_args())
@@ -0,0 +1,79 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measures the Python-side overhead of NdtHtml5SeleniumDriver per test.
+
+Runs tests against in-process fake WebDrivers whose test phases take no time,
+so the measured time is spent entirely in the driver and the fake WebDriver.
+
+Run from the repository root:
+
+    python -m benchmarks.driver_overhead_benchmark --tests 10000
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import argparse
+import timeit
+
+from client_wrapper import fake_webdriver
+from client_wrapper import html5_driver
+
+# Driver configurations to measure, as (name, driver arguments) pairs.
+_CONFIGURATIONS = (('polling', {}),
+                   ('polling, batch scrape', {'batch_scrape': True}),
+                   ('observer, batch scrape', {
+                       'phase_detection': html5_driver.PHASE_DETECTION_OBSERVER,
+                       'batch_scrape': True
+                   }),
+                   ('persistent session', {'persistent_session': True}),)
+
+
+def main(args):
+    print('Running %d tests against fake WebDrivers (best of %d runs):' %
+          (args.tests, args.repeat))
+    for name, driver_args in _CONFIGURATIONS:
+        factory = fake_webdriver.FakeWebDriverFactory()
+        driver = html5_driver.NdtHtml5SeleniumDriver(browser='firefox',
+                                                     url='http://ndt.fake/',
+                                                     timeout=1,
+                                                     browser_factory=factory,
+                                                     **driver_args)
+
+        def run_tests():
+            for _ in range(args.tests):
+                if driver.perform_test().errors:
+                    raise AssertionError('Test against fake WebDriver failed')
+
+        seconds = min(timeit.repeat(run_tests, number=1, repeat=args.repeat))
+        driver.close()
+        commands = sum(sum(fake_driver.command_counts.values())
+                       for fake_driver in factory.drivers)
+        print('  %-24s %7.2f us/test  %5.1f WebDriver commands/test' %
+              (name, seconds / args.tests * 1e6,
+               commands / float(args.tests * args.repeat)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='NDT HTML5 driver overhead benchmark',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--tests',
+                        help='Number of tests to run per measurement',
+                        type=int,
+                        default=10000)
+    parser.add_argument('--repeat',
+                        help='Number of times to repeat each measurement',
+                        type=int,
+                        default=3)
+    main(parser.parse_args())
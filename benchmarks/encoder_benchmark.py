@@ -0,0 +1,182 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compares the NDT result encoders against the original encoder.
+
+The original encoder returned nested datetimes and TestErrors unconverted, so
+the json module passed each of them back to default(), and formatted
+timestamps with strftime. A copy of it is kept here as the baseline, so the
+speedup of the current NdtResultEncoder and of result_encoder.encode_many is
+measured against it rather than against each other.
+
+Run from the repository root:
+
+    python -m benchmarks.encoder_benchmark --results 100000
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import argparse
+import datetime
+import json
+import timeit
+
+import pytz
+
+from client_wrapper import result_encoder
+from client_wrapper import results
+
+
+class OriginalNdtResultEncoder(json.JSONEncoder):
+    """Copy of NdtResultEncoder as it was before encode_many was added.
+
+    Scalar fields added to NdtResult since are encoded in the same way, so
+    that its output is identical to that of the current encoders. Results with
+    spans or phase timeouts are not supported.
+    """
+
+    def default(self, obj):
+        if isinstance(obj, results.NdtResult):
+            return _original_encode_ndt_result(obj)
+        elif isinstance(obj, results.TestError):
+            return {'timestamp': obj.timestamp, 'message': obj.message}
+        elif isinstance(obj, datetime.datetime):
+            return datetime.datetime.strftime(obj, '%Y-%m-%dT%H:%M:%S.%fZ')
+        return json.JSONEncoder.default(self, obj)
+
+
+def _original_encode_ndt_result(result):
+    if result.spans is not None or result.phase_timeouts_ns is not None:
+        raise NotImplementedError('spans and phase timeouts are not '
+                                  'benchmarked')
+    result_dict = {
+        'start_time': result.start_time,
+        'end_time': result.end_time,
+        'duration_ms': _original_encode_duration(result.duration_ns),
+        'client': result.client,
+        'client_version': result.client_version,
+        'os': result.os,
+        'os_version': result.os_version,
+        'browser': result.browser,
+        'browser_version': result.browser_version,
+        'browser_launch_ms':
+        _original_encode_duration(result.browser_launch_ns),
+        'load_retries': result.load_retries,
+        'load_backoff_ms': _original_encode_duration(result.load_backoff_ns),
+        'phase_timeouts_ms': None,
+        'timed_out_phase': result.timed_out_phase,
+        'spans': None,
+        'errors': result.errors,
+    }
+    for prefix, single_result in (('c2s', result.c2s_result),
+                                  ('s2c', result.s2c_result)):
+        if single_result:
+            result_dict[prefix + '_start_time'] = single_result.start_time
+            result_dict[prefix + '_end_time'] = single_result.end_time
+            result_dict[prefix + '_duration_ms'] = _original_encode_duration(
+                single_result.duration_ns)
+            result_dict[prefix + '_throughput'] = single_result.throughput
+        else:
+            result_dict[prefix + '_start_time'] = None
+            result_dict[prefix + '_end_time'] = None
+            result_dict[prefix + '_duration_ms'] = None
+            result_dict[prefix + '_throughput'] = None
+    result_dict['latency'] = result.latency
+    return result_dict
+
+
+def _original_encode_duration(duration_ns):
+    if duration_ns is None:
+        return None
+    return duration_ns / 1e6
+
+
+def create_ndt_results(count):
+    """Creates fully populated NdtResults with distinct timestamps."""
+    base_time = datetime.datetime(2016, 2, 26, 15, 51, 23, 452234, pytz.utc)
+    ndt_results = []
+    for i in range(count):
+        start_time = base_time + datetime.timedelta(seconds=i, microseconds=i)
+        result = results.NdtResult(
+            start_time=start_time,
+            end_time=start_time + datetime.timedelta(seconds=25),
+            errors=[],
+            latency=23.8,
+            duration_ns=25000000000)
+        result.client = 'ndt_js'
+        result.client_version = '3.7.0'
+        result.os = 'Ubuntu'
+        result.os_version = '14.04'
+        result.c2s_result = results.NdtSingleTestResult(
+            start_time=start_time + datetime.timedelta(seconds=1),
+            end_time=start_time + datetime.timedelta(seconds=11),
+            duration_ns=10000000000,
+            throughput=10.127)
+        result.s2c_result = results.NdtSingleTestResult(
+            start_time=start_time + datetime.timedelta(seconds=12),
+            end_time=start_time + datetime.timedelta(seconds=22),
+            duration_ns=10000000000,
+            throughput=98.235)
+        if i % 10 == 0:
+            result.errors.append(
+                results.TestError(start_time + datetime.timedelta(seconds=5),
+                                  'mock error message'))
+        ndt_results.append(result)
+    return ndt_results
+
+
+def main(args):
+    ndt_results = create_ndt_results(args.results)
+    original_encoder = OriginalNdtResultEncoder()
+    encoder = result_encoder.NdtResultEncoder()
+
+    def encode_original():
+        return [original_encoder.encode(result) for result in ndt_results]
+
+    def encode_individually():
+        return [encoder.encode(result) for result in ndt_results]
+
+    def encode_many():
+        return list(result_encoder.encode_many(ndt_results))
+
+    expected = encode_original()
+    if encode_individually() != expected:
+        raise AssertionError('NdtResultEncoder output differs from original')
+    if encode_many() != expected:
+        raise AssertionError('encode_many output differs from original')
+
+    print('Encoding %d results (best of %d runs):' % (args.results,
+                                                      args.repeat))
+    baseline = None
+    for name, function in (('original encoder', encode_original),
+                           ('NdtResultEncoder.encode', encode_individually),
+                           ('encode_many', encode_many)):
+        seconds = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        baseline = baseline or seconds
+        print('  %-24s %8.3fs  %7.2f us/result  %5.2fx' %
+              (name, seconds, seconds / args.results * 1e6, baseline / seconds))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='NDT result encoder benchmark',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--results',
+                        help='Number of results to encode',
+                        type=int,
+                        default=100000)
+    parser.add_argument('--repeat',
+                        help='Number of times to repeat each measurement',
+                        type=int,
+                        default=3)
+    main(parser.parse_args())
@@ -0,0 +1,143 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmarks the HTML5 driver end to end against a local fake NDT server.
+
+Measures, for each test, the driver's overhead (the wall time of the test
+beyond the phase durations that the fake server was configured with) and the
+error of the driver's c2s and s2c durations relative to the browser's own
+timeline of the page. Requires a local browser and its WebDriver, but no
+network access.
+
+Run from the repository root:
+
+    python -m benchmarks.pipeline_benchmark --browser firefox --iterations 10
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import argparse
+import time
+
+from client_wrapper import clocks
+from client_wrapper import fake_ndt_server
+from client_wrapper import html5_driver
+from client_wrapper import summary_stats
+
+# How long to wait for the page to report a completed test's timeline, which
+# it sends asynchronously after displaying the results.
+_TIMELINE_WAIT_SECONDS = 2
+
+
+def _wait_for_timeline(server, timeline_count):
+    """Returns whether the server has received timeline_count timelines."""
+    deadline = time.time() + _TIMELINE_WAIT_SECONDS
+    while len(server.timelines) < timeline_count:
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _print_stats(name, stats):
+    if not stats.count:
+        print('  %-28s no values' % name)
+        return
+    stddev = stats.stddev
+    print('  %-28s mean=%8.2f  stddev=%8s  min=%8.2f  max=%8.2f' %
+          (name, stats.mean, 'n/a' if stddev is None else '%.2f' % stddev,
+           stats.min, stats.max))
+
+
+def main(args):
+    clock = clocks.SystemClock()
+    configured_ms = (
+        args.start_delay_ms + args.c2s_duration_ms + args.s2c_duration_ms)
+    overhead_ms = summary_stats.RunningStats()
+    c2s_error_ms = summary_stats.RunningStats()
+    s2c_error_ms = summary_stats.RunningStats()
+    failures = 0
+
+    with fake_ndt_server.FakeNdtServer(
+            start_delay_ms=args.start_delay_ms,
+            c2s_duration_ms=args.c2s_duration_ms,
+            s2c_duration_ms=args.s2c_duration_ms) as server:
+        driver = html5_driver.NdtHtml5SeleniumDriver(
+            browser=args.browser,
+            url=server.url,
+            timeout=20,
+            persistent_session=args.persistent_session,
+            phase_detection=args.phase_detection,
+            batch_scrape=args.batch_scrape)
+        try:
+            for _ in range(args.iterations):
+                timelines_before = len(server.timelines)
+                start_ns = clock.monotonic_ns()
+                result = driver.perform_test()
+                elapsed_ms = (clock.monotonic_ns() - start_ns) / 1e6
+                if (result.errors or
+                        not _wait_for_timeline(server, timelines_before + 1)):
+                    failures += 1
+                    continue
+                overhead_ms.add(elapsed_ms - configured_ms)
+                timeline = server.timelines[-1]
+                c2s_error_ms.add(result.c2s_result.duration_ns / 1e6 - (
+                    timeline['s2c_start'] - timeline['c2s_start']))
+                s2c_error_ms.add(result.s2c_result.duration_ns / 1e6 - (
+                    timeline['end'] - timeline['s2c_start']))
+        finally:
+            driver.close()
+
+    print('%d tests with %s (%d failed), %d ms of configured phases each:' %
+          (args.iterations, args.browser, failures, configured_ms))
+    _print_stats('overhead per test (ms)', overhead_ms)
+    _print_stats('c2s duration error (ms)', c2s_error_ms)
+    _print_stats('s2c duration error (ms)', s2c_error_ms)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='NDT HTML5 driver pipeline benchmark',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--browser',
+                        help='Browser to run tests in',
+                        choices=('chrome', 'firefox', 'safari', 'edge'),
+                        default='firefox')
+    parser.add_argument('--iterations',
+                        help='Number of tests to run',
+                        type=int,
+                        default=10)
+    parser.add_argument('--start_delay_ms',
+                        help='Delay before the fake c2s phase starts',
+                        type=int,
+                        default=100)
+    parser.add_argument('--c2s_duration_ms',
+                        help='Duration of the fake c2s phase',
+                        type=int,
+                        default=1000)
+    parser.add_argument('--s2c_duration_ms',
+                        help='Duration of the fake s2c phase',
+                        type=int,
+                        default=1000)
+    parser.add_argument('--persistent_session',
+                        help='Reuse one browser session across tests',
+                        action='store_true')
+    parser.add_argument('--phase_detection',
+                        help='How the driver detects test phase transitions',
+                        choices=(html5_driver.PHASE_DETECTION_POLLING,
+                                 html5_driver.PHASE_DETECTION_OBSERVER),
+                        default=html5_driver.PHASE_DETECTION_POLLING)
+    parser.add_argument('--batch_scrape',
+                        help='Read all metrics in a single WebDriver call',
+                        action='store_true')
+    main(parser.parse_args())
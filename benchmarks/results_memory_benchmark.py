@@ -0,0 +1,120 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compares memory used per result by dict-backed and slotted result classes.
+
+Measures the bytes allocated for the result objects themselves (including
+their nested single-test results, error lists and errors, but not the field
+values, which are the same for both representations).
+
+Run from the repository root:
+
+    python -m benchmarks.results_memory_benchmark
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import argparse
+import sys
+
+from client_wrapper import results
+
+
+class DictNdtSingleTestResult(object):
+    """Dict-backed equivalent of NdtSingleTestResult, for comparison."""
+
+    def __init__(self, throughput, start_time, end_time, duration_ns):
+        self.throughput = throughput
+        self.start_time = start_time
+        self.end_time = end_time
+        self.duration_ns = duration_ns
+
+
+class DictTestError(object):
+    """Dict-backed equivalent of TestError, for comparison."""
+
+    def __init__(self, timestamp, message):
+        self.timestamp = timestamp
+        self.message = message
+
+
+class DictNdtResult(object):
+    """Dict-backed equivalent of NdtResult, for comparison."""
+
+    def __init__(self, start_time, end_time, errors, c2s_result, s2c_result,
+                 latency, duration_ns):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.duration_ns = duration_ns
+        self.c2s_result = c2s_result
+        self.s2c_result = s2c_result
+        self.errors = errors
+        self.latency = latency
+        self.os = None
+        self.os_version = None
+        self.client = None
+        self.client_version = None
+        self.browser = None
+        self.browser_version = None
+
+
+def object_size(obj):
+    """Returns the bytes used by an object and its __dict__, if it has one."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def result_size(result):
+    """Returns the bytes used by a result's own objects."""
+    size = object_size(result) + sys.getsizeof(result.errors)
+    for child in [result.c2s_result, result.s2c_result] + result.errors:
+        size += object_size(child)
+    return size
+
+
+def create_result(result_class, single_test_result_class, error_class,
+                  error_count):
+    return result_class(
+        start_time=None,
+        end_time=None,
+        errors=[error_class(None, 'mock error') for _ in range(error_count)],
+        c2s_result=single_test_result_class(10.127, None, None, 10000000000),
+        s2c_result=single_test_result_class(98.235, None, None, 10000000000),
+        latency=23.8,
+        duration_ns=25000000000)
+
+
+def main(args):
+    print('Bytes per result (excluding field values):')
+    for error_count in range(args.max_errors + 1):
+        dict_size = result_size(create_result(
+            DictNdtResult, DictNdtSingleTestResult, DictTestError, error_count))
+        slotted_size = result_size(
+            create_result(results.NdtResult, results.NdtSingleTestResult,
+                          results.TestError, error_count))
+        print('  %d error(s): dict-backed %5d, slotted %5d (%.1fx smaller)' %
+              (error_count, dict_size, slotted_size,
+               dict_size / float(slotted_size)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='NDT result memory benchmark',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--max_errors',
+                        help='Maximum number of errors per result to measure',
+                        type=int,
+                        default=2)
+    main(parser.parse_args())
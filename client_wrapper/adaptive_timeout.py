@@ -0,0 +1,354 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Per-phase test timeouts learned from the durations of earlier tests.
+
+A single fixed timeout for every phase is too short for slow links and far too
+long for a fast server that has hung. AdaptiveTimeouts instead keeps a history
+of how long each phase of a successful test took against each NDT server, and
+sets the timeout of each phase to a high percentile of its past durations plus
+a margin, within fixed bounds. The history is saved to a JSON file, so it
+carries over from one run to the next.
+
+A phase that times out took at least as long as its timeout, so the timeout is
+added to the history in place of its duration. In case the link has become
+much slower, the phase's timeout is also doubled for each consecutive test in
+which it timed out, until it completes again.
+"""
+
+import contextlib
+import json
+import math
+import os
+import tempfile
+import threading
+import warnings
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no fcntl, so saves from different processes are not locked.
+    fcntl = None
+
+# Phases of a test that the driver waits on, in the order they run: the delay
+# between clicking Start Test and the c2s phase starting, then the c2s and s2c
+# phases themselves.
+PHASE_START = 'start'
+PHASE_C2S = 'c2s'
+PHASE_S2C = 's2c'
+
+PHASES = (PHASE_START, PHASE_C2S, PHASE_S2C)
+
+_NANOSECONDS_PER_SECOND = 1e9
+
+
+def fixed_timeouts(timeout):
+    """Returns phase timeouts that use the same timeout for every phase.
+
+    Args:
+        timeout: The number of seconds to wait for each phase.
+
+    Returns:
+        A dictionary mapping each phase in PHASES to timeout.
+    """
+    return dict.fromkeys(PHASES, timeout)
+
+
+class TimeoutHistory(object):
+    """Durations of the phases of earlier tests, by NDT server URL.
+
+    Only the most recent durations of each phase are kept, along with the
+    number of consecutive tests in which the phase timed out. The history is
+    safe to use from different threads.
+
+    Histories in different processes (e.g. the worker processes of a parallel
+    run) may share a file. Each merges the durations added since its last save
+    into the file's current contents when it saves, rather than replacing
+    them. Saves are serialized across processes by locking a file beside the
+    history file (except on Windows, which lacks flock).
+    """
+
+    def __init__(self, path=None, max_samples=200):
+        """Creates a history, loading it from a file if the file exists.
+
+        Args:
+            path: Path of the JSON file the history is loaded from and saved
+                to (or None to keep the history only in memory).
+            max_samples: The number of most recent durations to keep for each
+                phase of each URL.
+        """
+        self._path = path
+        self._max_samples = max_samples
+        self._lock = threading.Lock()
+        # Maps each URL to a dictionary mapping each phase to a dictionary of
+        # its 'durations' and 'consecutive_timeouts'.
+        self._phases = {}
+        # Samples added since the history was last saved, as (url, phase,
+        # duration, timed_out) tuples.
+        self._unsaved = []
+        if path:
+            self._phases = _load(path) or {}
+
+    def add(self, url, phase, duration):
+        """Adds the duration, in seconds, of a phase of a test against a URL.
+
+        The phase's count of consecutive timeouts is reset.
+        """
+        self._add_sample((url, phase, duration, False))
+
+    def add_timeout(self, url, phase, timeout):
+        """Adds a phase of a test against a URL that timed out.
+
+        The timeout is added as the phase's duration, since the phase took at
+        least that long, and the phase's count of consecutive timeouts grows
+        by one.
+
+        Args:
+            url: The URL of the NDT server the test ran against.
+            phase: The phase that timed out.
+            timeout: The number of seconds after which the phase timed out.
+        """
+        self._add_sample((url, phase, timeout, True))
+
+    def durations(self, url, phase):
+        """Returns the recorded durations of a phase, oldest first."""
+        with self._lock:
+            return list(self._phase_history(url, phase)['durations'])
+
+    def consecutive_timeouts(self, url, phase):
+        """Returns how many of the latest tests a phase timed out in."""
+        with self._lock:
+            return self._phase_history(url, phase)['consecutive_timeouts']
+
+    def save(self):
+        """Saves the history to its file, replacing the file atomically.
+
+        The samples added since the last save are merged into the file's
+        current contents, which become the history.
+        """
+        if not self._path:
+            return
+        with self._lock, _locked(self._path + '.lock'):
+            phases = _load(self._path)
+            if phases is None:
+                # The file cannot be read, so it is replaced with this
+                # history, which already includes the unsaved samples.
+                phases = self._phases
+            else:
+                for sample in self._unsaved:
+                    self._apply(phases, sample)
+            _write_atomically(self._path, json.dumps(phases, sort_keys=True))
+            self._phases = phases
+            self._unsaved = []
+
+    def _phase_history(self, url, phase):
+        return self._phases.get(url, {}).get(phase, {
+            'durations': [],
+            'consecutive_timeouts': 0
+        })
+
+    def _add_sample(self, sample):
+        with self._lock:
+            self._apply(self._phases, sample)
+            if self._path:
+                self._unsaved.append(sample)
+
+    def _apply(self, phases, sample):
+        """Adds a (url, phase, duration, timed_out) sample to phases."""
+        url, phase, duration, timed_out = sample
+        phase_history = phases.setdefault(url, {}).setdefault(
+            phase, {'durations': [],
+                    'consecutive_timeouts': 0})
+        durations = phase_history['durations']
+        durations.append(duration)
+        del durations[:-self._max_samples]
+        if timed_out:
+            phase_history['consecutive_timeouts'] += 1
+        else:
+            phase_history['consecutive_timeouts'] = 0
+
+
+class AdaptiveTimeouts(object):
+    """Chooses the timeout of each phase of a test from its past durations."""
+
+    def __init__(self,
+                 history,
+                 default_timeout,
+                 percentile=95,
+                 margin=2.0,
+                 floor=5.0,
+                 ceiling=60.0,
+                 min_samples=5):
+        """Creates an adaptive timeout policy.
+
+        Args:
+            history: The TimeoutHistory to choose timeouts from and to record
+                durations in.
+            default_timeout: The number of seconds to wait for a phase whose
+                history has fewer than min_samples durations.
+            percentile: The percentile, from 0 to 100, of past durations that
+                a phase's timeout is based on.
+            margin: The number of seconds added to the percentile.
+            floor: The minimum timeout, in seconds.
+            ceiling: The maximum timeout, in seconds, including after it has
+                been doubled for consecutive timeouts.
+            min_samples: The number of durations of a phase needed before its
+                timeout is based on them.
+        """
+        if not 0 < percentile <= 100:
+            raise ValueError('percentile must be greater than 0 and at most '
+                             '100')
+        if floor > ceiling:
+            raise ValueError('floor must not be greater than ceiling')
+        self._history = history
+        self._default_timeout = default_timeout
+        self._percentile = percentile
+        self._margin = margin
+        self._floor = floor
+        self._ceiling = ceiling
+        self._min_samples = min_samples
+
+    def timeouts(self, url):
+        """Returns the timeout of each phase of a test against a URL.
+
+        Returns:
+            A dictionary mapping each phase in PHASES to the number of seconds
+            to wait for it.
+        """
+        timeouts = {}
+        for phase in PHASES:
+            durations = self._history.durations(url, phase)
+            if len(durations) < self._min_samples:
+                timeout = self._default_timeout
+            else:
+                timeout = _percentile(durations,
+                                      self._percentile) + self._margin
+            timeout *= 2**self._history.consecutive_timeouts(url, phase)
+            timeouts[phase] = min(self._ceiling, max(self._floor, timeout))
+        return timeouts
+
+    def record_result(self, url, result):
+        """Adds the phase durations of a test to the history and saves it.
+
+        If a phase timed out, its timeout is added in place of its duration
+        (along with the c2s duration, if the s2c phase timed out).
+        Tests that failed in other ways are not recorded, because their phase
+        durations are cut short or missing.
+
+        Args:
+            url: The URL of the NDT server the test ran against.
+            result: The NdtResult of the test.
+        """
+        timed_out_phase = result.timed_out_phase
+        if timed_out_phase == PHASE_S2C:
+            self._history.add(url, PHASE_C2S, result.c2s_result.duration_ns /
+                              _NANOSECONDS_PER_SECOND)
+        if timed_out_phase is not None:
+            self._history.add_timeout(url, timed_out_phase,
+                                      result.phase_timeouts_ns[timed_out_phase]
+                                      / _NANOSECONDS_PER_SECOND)
+        else:
+            if result.errors:
+                return
+            phase_durations_ns = _phase_durations_ns(result)
+            if phase_durations_ns is None:
+                return
+            for phase in PHASES:
+                self._history.add(url, phase, phase_durations_ns[phase] /
+                                  _NANOSECONDS_PER_SECOND)
+        self._history.save()
+
+
+def _load(path):
+    """Returns the phase histories saved in a file.
+
+    Returns:
+        The phase histories, {} if the file is missing, or None (after a
+        warning) if the file cannot be read or is not a valid history, e.g.
+        because it was truncated.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as history_file:
+            phases = json.load(history_file)
+        _check_phases(phases)
+    except (IOError, ValueError) as e:
+        warnings.warn('Ignoring unreadable timeout history %s: %s' % (path, e),
+                      RuntimeWarning)
+        return None
+    return phases
+
+
+def _check_phases(phases):
+    """Raises ValueError if phases is not a valid dictionary of histories."""
+    try:
+        for url_phases in phases.itervalues():
+            for phase_history in url_phases.itervalues():
+                if not isinstance(phase_history['durations'], list):
+                    raise ValueError('durations must be a list')
+                int(phase_history['consecutive_timeouts'])
+    except (AttributeError, KeyError, TypeError):
+        raise ValueError('unexpected structure')
+
+
+@contextlib.contextmanager
+def _locked(lock_path):
+    """Holds an exclusive lock on a lock file, shared between processes."""
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _write_atomically(path, contents):
+    """Replaces a file with new contents, via a uniquely named temp file."""
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp',
+                                     prefix=os.path.basename(path) + '.',
+                                     dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'w') as temp_file:
+            temp_file.write(contents)
+        if os.name == 'nt' and os.path.exists(path):
+            # Windows cannot rename over an existing file.
+            os.remove(path)
+        os.rename(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+def _phase_durations_ns(result):
+    """Returns the duration of each phase of a test (or None if incomplete)."""
+    if (result.duration_ns is None or result.c2s_result is None or
+            result.s2c_result is None or
+            result.c2s_result.duration_ns is None or
+            result.s2c_result.duration_ns is None):
+        return None
+    return {
+        PHASE_START: (result.duration_ns - result.c2s_result.duration_ns -
+                      result.s2c_result.duration_ns),
+        PHASE_C2S: result.c2s_result.duration_ns,
+        PHASE_S2C: result.s2c_result.duration_ns,
+    }
+
+
+def _percentile(values, percentile):
+    """Returns the nearest-rank percentile of a non-empty list of values."""
+    rank = int(math.ceil(percentile / 100.0 * len(values)))
+    return sorted(values)[max(rank, 1) - 1]
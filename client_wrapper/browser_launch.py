@@ -0,0 +1,193 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Configures how Selenium browsers are launched.
+
+By default, browsers are launched exactly as Selenium launches them. Launch
+options can instead run browsers headless (Chrome only), with a minimal profile that turns
+off the background work (update checks, telemetry, safe browsing downloads,
+prefetching, first-run pages) that slows startup and competes with NDT tests
+for the network, and with a non-default page load strategy.
+
+The pinned Selenium release drives Firefox through the legacy FirefoxDriver,
+which supports only Firefox 47 and earlier. Headless mode needs Firefox 56 or
+later driven through marionette, and the legacy driver ignores the eager page
+load strategy, so both are rejected for Firefox rather than silently ignored.
+"""
+
+from selenium import webdriver
+from selenium.webdriver.common import desired_capabilities
+
+import names
+
+# Page load strategies, which control when loading a page returns.
+PAGE_LOAD_NORMAL = 'normal'
+PAGE_LOAD_EAGER = 'eager'
+PAGE_LOAD_NONE = 'none'
+PAGE_LOAD_STRATEGIES = (PAGE_LOAD_NORMAL, PAGE_LOAD_EAGER, PAGE_LOAD_NONE)
+
+# Firefox preferences of a minimal profile.
+_FIREFOX_MINIMAL_PREFERENCES = (
+    # Updates of the browser, extensions and search engines.
+    ('app.update.enabled', False),
+    ('app.update.auto', False),
+    ('extensions.update.enabled', False),
+    ('browser.search.update', False),
+    # First-run and default browser pages.
+    ('browser.shell.checkDefaultBrowser', False),
+    ('browser.startup.homepage_override.mstone', 'ignore'),
+    ('browser.startup.page', 0),
+    # Background network traffic.
+    ('browser.safebrowsing.enabled', False),
+    ('browser.safebrowsing.malware.enabled', False),
+    ('datareporting.healthreport.uploadEnabled', False),
+    ('datareporting.policy.dataSubmissionEnabled', False),
+    ('toolkit.telemetry.enabled', False),
+    ('network.prefetch-next', False),
+    ('network.dns.disablePrefetch', True),
+    # Disk cache and GPU compositing, neither of which a test page needs.
+    ('browser.cache.disk.enable', False),
+    ('layers.acceleration.disabled', True),)
+
+# Chrome command line switches of a minimal profile.
+_CHROME_MINIMAL_ARGUMENTS = ('--no-first-run',
+                             '--no-default-browser-check',
+                             '--disable-extensions',
+                             '--disable-default-apps',
+                             '--disable-background-networking',
+                             '--disable-component-update',
+                             '--disable-sync',
+                             '--disable-translate',)
+
+_CHROME_HEADLESS_ARGUMENTS = ('--headless', '--disable-gpu')
+
+
+class LaunchOptions(object):
+    """Settings for launching a browser.
+
+    Attributes:
+        headless: If True, browsers run without a display. Only Chrome can
+            run headless.
+        minimal_profile: If True, Firefox and Chrome run with a profile that
+            disables updates, extensions, background networking and GPU
+            acceleration. Other browsers ignore this setting.
+        page_load_strategy: One of PAGE_LOAD_STRATEGIES (or None to use the
+            browser's default, which waits for the page to load fully).
+            Firefox does not support the eager strategy.
+    """
+
+    def __init__(self,
+                 headless=False,
+                 minimal_profile=False,
+                 page_load_strategy=None):
+        if (page_load_strategy is not None and
+                page_load_strategy not in PAGE_LOAD_STRATEGIES):
+            raise ValueError('Invalid page load strategy: %s' %
+                             page_load_strategy)
+        self.headless = headless
+        self.minimal_profile = minimal_profile
+        self.page_load_strategy = page_load_strategy
+
+
+def firefox_arguments(launch_options):
+    """Creates the keyword arguments of webdriver.Firefox for launch options.
+
+    Raises:
+        ValueError: If the launch options require headless mode or the eager
+            page load strategy, neither of which the legacy FirefoxDriver
+            supports.
+    """
+    if launch_options.headless:
+        raise ValueError('Headless mode is not supported for %s' %
+                         names.FIREFOX)
+    if launch_options.page_load_strategy == PAGE_LOAD_EAGER:
+        raise ValueError('The %s page load strategy is not supported for %s' %
+                         (PAGE_LOAD_EAGER, names.FIREFOX))
+    arguments = {}
+    if launch_options.minimal_profile:
+        profile = webdriver.FirefoxProfile()
+        for name, value in _FIREFOX_MINIMAL_PREFERENCES:
+            profile.set_preference(name, value)
+        arguments['firefox_profile'] = profile
+    if launch_options.page_load_strategy:
+        capabilities = dict(desired_capabilities.DesiredCapabilities.FIREFOX)
+        capabilities['pageLoadStrategy'] = launch_options.page_load_strategy
+        arguments['capabilities'] = capabilities
+    return arguments
+
+
+def chrome_arguments(launch_options):
+    """Creates the keyword arguments of webdriver.Chrome for launch options."""
+    switches = ()
+    if launch_options.minimal_profile:
+        switches += _CHROME_MINIMAL_ARGUMENTS
+    if launch_options.headless:
+        switches += _CHROME_HEADLESS_ARGUMENTS
+    arguments = {}
+    if switches:
+        chrome_options = webdriver.ChromeOptions()
+        for switch in switches:
+            chrome_options.add_argument(switch)
+        arguments['chrome_options'] = chrome_options
+    if launch_options.page_load_strategy:
+        capabilities = dict(desired_capabilities.DesiredCapabilities.CHROME)
+        capabilities['pageLoadStrategy'] = launch_options.page_load_strategy
+        arguments['desired_capabilities'] = capabilities
+    return arguments
+
+
+def edge_arguments(launch_options):
+    """Creates the keyword arguments of webdriver.Edge for launch options.
+
+    Raises:
+        ValueError: If the launch options require headless mode.
+    """
+    return _capabilities_arguments(
+        names.EDGE, launch_options, 'capabilities',
+        desired_capabilities.DesiredCapabilities.EDGE)
+
+
+def safari_arguments(launch_options):
+    """Creates the keyword arguments of webdriver.Safari for launch options.
+
+    Raises:
+        ValueError: If the launch options require headless mode.
+    """
+    return _capabilities_arguments(
+        names.SAFARI, launch_options, 'desired_capabilities',
+        desired_capabilities.DesiredCapabilities.SAFARI)
+
+
+def _capabilities_arguments(browser, launch_options, argument_name,
+                            default_capabilities):
+    """Creates the arguments of a browser configured by capabilities alone.
+
+    Args:
+        browser: Name of the browser.
+        launch_options: The LaunchOptions to apply.
+        argument_name: Name of the browser's capabilities argument.
+        default_capabilities: The browser's default capabilities.
+
+    Returns:
+        A dictionary of arguments for the browser's webdriver class.
+
+    Raises:
+        ValueError: If the launch options require headless mode.
+    """
+    if launch_options.headless:
+        raise ValueError('Headless mode is not supported for %s' % browser)
+    if not launch_options.page_load_strategy:
+        return {}
+    capabilities = dict(default_capabilities)
+    capabilities['pageLoadStrategy'] = launch_options.page_load_strategy
+    return {argument_name: capabilities}
@@ -28,6 +28,25 @@ class UnrecognizedVersionStringError(Error):
     """Indicates an unrecognized version string."""
     pass
 
+# Maps each supported (OS name, OS version) pair to its shortname.
+_OS_SHORTNAMES = {
+    #TODO(mtlynch): Check whether this is the right version string for
+    # Win10.
+    ('Windows', '10.0'): names.WINDOWS_10,
+    ('Ubuntu', '14.04'): names.UBUNTU_14,
+    #TODO(mtlynch): Check whether this is the right version string for
+    # El Capitan.
+    ('OSX', '10.11'): names.OSX_10_11,
+}
+
+# Maximum number of (browser, version) pairs to remember canonical names for.
+# The cache is cleared when it fills, which only happens if a caller
+# canonicalizes a very large number of distinct browser versions.
+_MAX_BROWSER_CACHE_SIZE = 1024
+
+# Maps (browser, browser version) pairs to previously computed canonical names.
+_browser_cache = {}
+
 
 def os_to_shortname(os, os_version):
     """Converts an OS name and version to its shortname.
@@ -46,18 +65,8 @@ def os_to_shortname(os, os_version):
         UnsupportedPlatformError if the caller specifies an OS and version
         combination that does not have a known shortname.
     """
-    shortname_map = {
-        #TODO(mtlynch): Check whether this is the right version string for
-        # Win10.
-        'Windows-10.0': names.WINDOWS_10,
-        'Ubuntu-14.04': names.UBUNTU_14,
-        #TODO(mtlynch): Check whether this is the right version string for
-        # El Capitan.
-        'OSX-10.11': names.OSX_10_11,
-    }
-    key = '%s-%s' % (os, os_version)
     try:
-        return shortname_map[key]
+        return _OS_SHORTNAMES[(os, os_version)]
     except KeyError:
         raise UnsupportedPlatformError('Unsupported OS platform: %s v%s' %
                                        (os, os_version))
@@ -67,7 +76,8 @@ def browser_to_canonical_name(browser, browser_version):
     """Converts a browser and version to its canonical name.
 
     Converts a browser to the format of "[name][major version]", e.g.
-    "firefox49".
+    "firefox49". Canonical names are cached, so repeated calls with the same
+    browser and version do not re-parse the version string.
 
     Args:
         browser: Browser name to convert to canonical name (e.g. "firefox" or
@@ -79,6 +89,70 @@ def browser_to_canonical_name(browser, browser_version):
     Returns:
         Returns the browser in shortname form, e.g. "firefox49".
     """
+    key = (browser, browser_version)
+    canonical_name = _browser_cache.get(key)
+    if canonical_name is None:
+        canonical_name = _parse_browser_canonical_name(browser, browser_version)
+        if len(_browser_cache) >= _MAX_BROWSER_CACHE_SIZE:
+            _browser_cache.clear()
+        _browser_cache[key] = canonical_name
+    return canonical_name
+
+
+def os_to_shortnames(oses, os_versions):
+    """Converts columns of OS names and versions to their shortnames.
+
+    Equivalent to calling os_to_shortname on each pair of values, but faster
+    for large columns.
+
+    Args:
+        oses: A sequence of OS platform names.
+        os_versions: A sequence of OS version strings, the same length as oses.
+
+    Returns:
+        A list of the OS shortnames, in the same order as the inputs.
+
+    Raises:
+        UnsupportedPlatformError if any OS and version combination does not
+        have a known shortname.
+    """
+    shortnames = _OS_SHORTNAMES
+    try:
+        return [shortnames[key] for key in zip(oses, os_versions)]
+    except KeyError as e:
+        os, os_version = e.args[0]
+        raise UnsupportedPlatformError('Unsupported OS platform: %s v%s' %
+                                       (os, os_version))
+
+
+def browsers_to_canonical_names(browsers, browser_versions):
+    """Converts columns of browser names and versions to canonical names.
+
+    Equivalent to calling browser_to_canonical_name on each pair of values,
+    but each distinct pair is parsed only once.
+
+    Args:
+        browsers: A sequence of browser names.
+        browser_versions: A sequence of browser version strings, the same
+            length as browsers.
+
+    Returns:
+        A list of the canonical browser names, in the same order as the inputs.
+
+    Raises:
+        UnrecognizedVersionStringError if any version string is not in a
+        recognized format.
+    """
+    canonical_names = {}
+    for key in set(zip(browsers, browser_versions)):
+        canonical_names[key] = browser_to_canonical_name(*key)
+    return [canonical_names[key] for key in zip(browsers, browser_versions)]
+
+
+def _parse_browser_canonical_name(browser, browser_version):
+    # Drivers that do not report a browser version leave it as None.
+    if not isinstance(browser_version, basestring):
+        raise UnrecognizedVersionStringError('Missing version string')
     version_parts = browser_version.split('.')
     if len(version_parts) < 2:
         raise UnrecognizedVersionStringError(
@@ -13,34 +13,249 @@
 # limitations under the License.
 
 import argparse
+import functools
+import json
 
+import adaptive_timeout
+import browser_launch
+import filename
 import html5_driver
+import metrics
 import names
+import orchestrator
+import parallel
+import profiling
+import result_sink
+import result_store
+import retry
+import scheduler
+import summary_stats
 
 
 def main(args):
     if args.client == names.NDT_HTML5:
-        driver = html5_driver.NdtHtml5SeleniumDriver(args.browser,
-                                                     args.client_url,
-                                                     timeout=20)
+        driver_factory = functools.partial(
+            html5_driver.NdtHtml5SeleniumDriver,
+            browser=args.browser,
+            url=args.client_url,
+            timeout=args.timeout,
+            persistent_session=args.persistent_session,
+            prewarm=args.prewarm,
+            max_tests_per_session=args.max_tests_per_session,
+            phase_detection=args.phase_detection,
+            batch_scrape=args.batch_scrape,
+            collect_spans=args.collect_spans,
+            load_retry_policy=_create_load_retry_policy(args),
+            load_failure_budget=args.load_failure_budget,
+            timeout_policy=_create_timeout_policy(args),
+            launch_options=browser_launch.LaunchOptions(
+                headless=args.headless,
+                minimal_profile=args.minimal_profile,
+                page_load_strategy=args.page_load_strategy))
     else:
         raise ValueError('unsupported NDT client: %s' % args.client)
 
-    for i in range(args.iterations):
-        print 'starting iteration %d...' % (i + 1)
-        result = driver.perform_test()
+    profiler = None
+    if args.profile:
+        if args.workers > 1 or args.sessions > 1:
+            raise ValueError(
+                '--profile cannot be used with --workers or --sessions')
+        profiler = profiling.IterationProfiler(
+            args.profile,
+            sample_interval=args.profile_sample_interval)
 
-        print '\tc2s_throughput: %s Mbps' % result.c2s_result.throughput
-        print '\ts2c_throughput: %s Mbps' % result.s2c_result.throughput
-        if result.errors:
-            print '\terrors:'
-            for error in result.errors:
-                print '\t * %s: %s' % (
-                    error.timestamp.strftime('%y-%m-%d %H:%M:%S'),
-                    error.message)
+    sinks = []
+    if args.output:
+        sinks.append(
+            result_sink.JsonlResultSink(args.output,
+                                        flush_interval=args.flush_every,
+                                        fsync_interval=args.fsync_every))
+    if args.results_dir:
+        sinks.append(result_store.ResultFileStore(args.results_dir,
+                                                  layout=args.results_layout))
+    if args.metrics_file or args.metrics_port is not None:
+        sinks.append(_create_metrics_sink(args))
+    summary = summary_stats.ResultSummary()
+    try:
+        if args.workers > 1:
+            _run_parallel(driver_factory, args, sinks, summary)
+        elif args.sessions > 1:
+            _run_orchestrated(driver_factory, args, sinks, summary)
+        elif args.interval:
+            _run_scheduled(
+                _create_driver(driver_factory, profiler), args, sinks, summary)
+        else:
+            _run_serial(
+                _create_driver(driver_factory, profiler), args, sinks, summary)
+    except html5_driver.FailureBudgetExhaustedError as e:
+        print 'stopping run: %s' % e
+    finally:
+        for sink in sinks:
+            sink.close()
+        if profiler:
+            profiler.finish()
 
+    if profiler:
+        print profiler.format_report(args.profile_top)
 
-if __name__ == '__main__':
+    _print_summary('final summary', summary)
+    if args.summary_output:
+        with open(args.summary_output, 'w') as summary_file:
+            json.dump(summary.to_dict(), summary_file)
+
+
+def _create_timeout_policy(args):
+    if not args.timeout_history:
+        return None
+    return adaptive_timeout.AdaptiveTimeouts(
+        adaptive_timeout.TimeoutHistory(args.timeout_history),
+        default_timeout=args.timeout,
+        percentile=args.timeout_percentile,
+        margin=args.timeout_margin,
+        floor=args.timeout_floor,
+        ceiling=args.timeout_ceiling)
+
+
+def _create_load_retry_policy(args):
+    if not args.load_retries:
+        return None
+    return retry.RetryPolicy(max_retries=args.load_retries,
+                             initial_backoff=args.load_backoff,
+                             max_backoff=args.load_max_backoff)
+
+
+def _create_driver(driver_factory, profiler):
+    driver = driver_factory()
+    if profiler:
+        driver = profiling.ProfiledDriver(driver, profiler)
+    return driver
+
+
+def _create_metrics_sink(args):
+    harness_metrics = metrics.HarnessMetrics()
+    exporters = []
+    if args.metrics_file:
+        exporters.append(
+            metrics.TextfileExporter(harness_metrics,
+                                     args.metrics_file,
+                                     interval=args.metrics_interval))
+    if args.metrics_port is not None:
+        exporters.append(metrics.HttpExporter(harness_metrics,
+                                              port=args.metrics_port))
+    return metrics.MetricsSink(harness_metrics, exporters)
+
+
+def _run_serial(driver, args, sinks, summary):
+    try:
+        for i in range(args.iterations):
+            print 'starting iteration %d...' % (i + 1)
+            _process_result(driver.perform_test(), args, sinks, summary)
+    finally:
+        driver.close()
+
+    if args.prewarm:
+        print 'prewarmed browsers used: %d of %d tests' % (
+            driver.prewarmed_tests, args.iterations)
+    if args.persistent_session:
+        print 'browser launches: %d, reuses: %d, startup time saved: %.1fs' % (
+            driver.browser_launches, driver.browser_reuses,
+            driver.startup_time_saved)
+
+
+def _run_scheduled(driver, args, sinks, summary):
+    test_scheduler = scheduler.Scheduler(args.interval,
+                                         jitter=args.jitter,
+                                         overrun_policy=args.overrun_policy)
+
+    def run_test():
+        print 'starting scheduled run %d...' % (test_scheduler.runs + 1)
+        _process_result(driver.perform_test(), args, sinks, summary)
+
+    try:
+        test_scheduler.run(run_test, max_runs=args.max_runs)
+    except KeyboardInterrupt:
+        print 'stopping scheduled runs'
+    finally:
+        driver.close()
+    print 'scheduled runs: %d, skipped after overruns: %d' % (
+        test_scheduler.runs, test_scheduler.skipped_runs)
+
+
+def _run_parallel(driver_factory, args, sinks, summary):
+    url_semaphores = None
+    if args.max_concurrent_per_url:
+        url_semaphores = parallel.create_url_semaphores(
+            [args.client_url], args.max_concurrent_per_url)
+    ordered_results = parallel.run_iterations(driver_factory,
+                                              args.client_url,
+                                              args.iterations,
+                                              args.workers,
+                                              url_semaphores=url_semaphores)
+    for i, result in enumerate(ordered_results):
+        print 'completed iteration %d...' % (i + 1)
+        _process_result(result, args, sinks, summary)
+
+
+def _run_orchestrated(driver_factory, args, sinks, summary):
+    session_orchestrator = orchestrator.Orchestrator(
+        lambda url: driver_factory(url=url),
+        max_workers=args.sessions,
+        max_concurrent_per_target=args.max_concurrent_per_url,
+        timeout=args.run_timeout)
+
+    def process_completion(completion):
+        print 'completed iteration %d...' % (completion.index + 1)
+        if completion.error is not None:
+            print '\ttest failed: %s' % completion.error
+            return
+        _process_result(completion.result, args, sinks, summary)
+
+    run_summary = session_orchestrator.run(
+        [args.client_url] * args.iterations, process_completion)
+    if run_summary.timed_out:
+        print 'run timed out: %d tests cancelled, %d abandoned' % (
+            run_summary.cancelled, run_summary.abandoned)
+
+
+def _process_result(result, args, sinks, summary):
+    _print_result(result)
+    for sink in sinks:
+        try:
+            sink.write(result)
+        except filename.FilenameCreationError as e:
+            print '\tcould not save result: %s' % e
+    summary.add_result(result)
+    if (args.summary_interval and
+            summary.result_count % args.summary_interval == 0):
+        _print_summary('summary after %d iterations' % summary.result_count,
+                       summary)
+
+
+def _print_result(result):
+    # A test that failed early (e.g. its page failed to load) has no c2s or
+    # s2c result.
+    print '\tc2s_throughput: %s Mbps' % _throughput(result.c2s_result)
+    print '\ts2c_throughput: %s Mbps' % _throughput(result.s2c_result)
+    if result.errors:
+        print '\terrors:'
+        for error in result.errors:
+            print '\t * %s: %s' % (
+                error.timestamp.strftime('%y-%m-%d %H:%M:%S'), error.message)
+
+
+def _throughput(single_test_result):
+    if single_test_result is None:
+        return None
+    return single_test_result.throughput
+
+
+def _print_summary(title, summary):
+    print '%s:' % title
+    for line in summary.format_report().splitlines():
+        print '\t%s' % line
+
+
+def _create_parser():
     parser = argparse.ArgumentParser(
         prog='NDT E2E Testing Client Wrapper',
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
@@ -57,4 +272,195 @@ if __name__ == '__main__':
                         help='Number of iterations to run',
                         type=int,
                         default=1)
-    main(parser.parse_args())
+    parser.add_argument('--interval',
+                        help=('Run one iteration every this many seconds '
+                              'until interrupted, instead of running '
+                              '--iterations back to back'),
+                        type=float)
+    parser.add_argument('--jitter',
+                        help=('Maximum random delay, in seconds, of each '
+                              'scheduled iteration (with --interval)'),
+                        type=float,
+                        default=0)
+    parser.add_argument(
+        '--overrun_policy',
+        help=('Whether to skip or queue scheduled iterations '
+              'that are due while an earlier one is still '
+              'running (with --interval)'),
+        choices=(scheduler.OVERRUN_SKIP, scheduler.OVERRUN_QUEUE),
+        default=scheduler.OVERRUN_SKIP)
+    parser.add_argument('--max_runs',
+                        help=('Number of scheduled iterations after which to '
+                              'exit (with --interval)'),
+                        type=int)
+    parser.add_argument('--persistent_session',
+                        help='Reuse one browser session across iterations',
+                        action='store_true')
+    parser.add_argument('--max_tests_per_session',
+                        help=('Number of tests to run in a persistent browser '
+                              'session before relaunching it'),
+                        type=int)
+    parser.add_argument('--prewarm',
+                        help=('Launch the next iteration\'s browser while the '
+                              'current iteration finishes'),
+                        action='store_true')
+    parser.add_argument('--phase_detection',
+                        help=('How to detect NDT test phase transitions in '
+                              'the browser'),
+                        choices=(html5_driver.PHASE_DETECTION_POLLING,
+                                 html5_driver.PHASE_DETECTION_OBSERVER),
+                        default=html5_driver.PHASE_DETECTION_POLLING)
+    parser.add_argument('--batch_scrape',
+                        help=('Read all metrics from the results page in a '
+                              'single WebDriver call'),
+                        action='store_true')
+    parser.add_argument('--collect_spans',
+                        help=('Record the duration of each test phase and of '
+                              'the WebDriver commands in it'),
+                        action='store_true')
+    parser.add_argument('--timeout',
+                        help=('Seconds to wait for each phase of a test, or '
+                              'for phases without enough history with '
+                              '--timeout_history'),
+                        type=float,
+                        default=20)
+    parser.add_argument('--timeout_history',
+                        help=('Path of a JSON file of past phase durations, '
+                              'by NDT server, from which to set adaptive '
+                              'per-phase timeouts. It is created if missing '
+                              'and updated after each test that completes or '
+                              'times out'))
+    parser.add_argument('--timeout_percentile',
+                        help=('Percentile of past durations of a phase that '
+                              'its adaptive timeout is based on'),
+                        type=float,
+                        default=95)
+    parser.add_argument('--timeout_margin',
+                        help=('Seconds added to the percentile to get an '
+                              'adaptive timeout'),
+                        type=float,
+                        default=2.0)
+    parser.add_argument('--timeout_floor',
+                        help='Minimum adaptive timeout, in seconds',
+                        type=float,
+                        default=5.0)
+    parser.add_argument('--timeout_ceiling',
+                        help='Maximum adaptive timeout, in seconds',
+                        type=float,
+                        default=60.0)
+    parser.add_argument('--load_retries',
+                        help=('Number of times to retry loading the NDT '
+                              'client page, in the same browser, after it '
+                              'fails to load'),
+                        type=int,
+                        default=0)
+    parser.add_argument('--load_backoff',
+                        help=('Seconds to wait before the first retry of '
+                              'loading the NDT client page, doubling with '
+                              'each further retry'),
+                        type=float,
+                        default=1.0)
+    parser.add_argument('--load_max_backoff',
+                        help=('Maximum seconds to wait before a retry of '
+                              'loading the NDT client page'),
+                        type=float,
+                        default=30.0)
+    parser.add_argument('--load_failure_budget',
+                        help=('Number of consecutive iterations that may fail '
+                              'to load the NDT client page before the run '
+                              'stops'),
+                        type=int)
+    parser.add_argument('--headless',
+                        help=('Run browsers without a display (Chrome only; '
+                              'the pinned Selenium cannot run Firefox '
+                              'headless)'),
+                        action='store_true')
+    parser.add_argument('--minimal_profile',
+                        help=('Launch browsers with a profile that disables '
+                              'updates, extensions and background networking'),
+                        action='store_true')
+    parser.add_argument('--page_load_strategy',
+                        help=('When loading the NDT client page completes '
+                              '(the browser\'s default if not given; Firefox '
+                              'does not support eager)'),
+                        choices=browser_launch.PAGE_LOAD_STRATEGIES)
+    parser.add_argument('--workers',
+                        help=('Number of worker processes to run iterations '
+                              'in, each with its own browser'),
+                        type=int,
+                        default=1)
+    parser.add_argument('--sessions',
+                        help=('Number of browser sessions to run iterations '
+                              'in concurrently from this process (ignored if '
+                              '--workers is greater than 1)'),
+                        type=int,
+                        default=1)
+    parser.add_argument('--run_timeout',
+                        help=('Seconds after which concurrent sessions stop '
+                              'starting iterations (only with --sessions)'),
+                        type=float)
+    parser.add_argument('--max_concurrent_per_url',
+                        help=('Maximum number of workers that may test '
+                              'against the same NDT server at once'),
+                        type=int)
+    parser.add_argument('--output',
+                        help=('Path of a JSONL file to append each result to '
+                              'as it completes'))
+    parser.add_argument('--flush_every',
+                        help=('Number of results to buffer before flushing '
+                              'them to the output file'),
+                        type=int,
+                        default=1)
+    parser.add_argument('--fsync_every',
+                        help=('Number of results to write between syncs of '
+                              'the output file to disk'),
+                        type=int)
+    parser.add_argument('--results_dir',
+                        help=('Directory to write each result to as a '
+                              'separate JSON file'))
+    parser.add_argument(
+        '--results_layout',
+        help=('Layout of result files in --results_dir: all '
+              'in one directory, or sharded into '
+              'os/browser/YYYY/MM/DD subdirectories'),
+        choices=(result_store.LAYOUT_FLAT, result_store.LAYOUT_SHARDED),
+        default=result_store.LAYOUT_FLAT)
+    parser.add_argument('--summary_interval',
+                        help=('Number of iterations between printed summaries '
+                              'of the results so far'),
+                        type=int)
+    parser.add_argument('--summary_output',
+                        help=('Path of a JSON file to write the final summary '
+                              'to, in a form that can be merged with other '
+                              'summaries'))
+    parser.add_argument('--metrics_file',
+                        help=('Path of a file to keep updated with Prometheus '
+                              'metrics of the tests run (e.g. for '
+                              'node_exporter\'s textfile collector)'))
+    parser.add_argument('--metrics_interval',
+                        help=('Number of seconds between updates of '
+                              '--metrics_file'),
+                        type=float,
+                        default=15)
+    parser.add_argument('--metrics_port',
+                        help=('Port to serve Prometheus metrics of the tests '
+                              'run on, at /metrics'),
+                        type=int)
+    parser.add_argument('--profile',
+                        help=('Directory to save a cProfile stats file of '
+                              'each iteration, and of the whole run, to'))
+    parser.add_argument('--profile_sample_interval',
+                        help=('With --profile, also sample the wall-clock '
+                              'stack of each iteration every this many '
+                              'seconds'),
+                        type=float)
+    parser.add_argument('--profile_top',
+                        help=('Number of functions to list in the profile '
+                              'report'),
+                        type=int,
+                        default=20)
+    return parser
+
+
+if __name__ == '__main__':
+    main(_create_parser().parse_args())
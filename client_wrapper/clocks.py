@@ -0,0 +1,100 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Clocks for timestamping and timing NDT test phases.
+
+A clock provides two readings: a timezone-aware wall-clock datetime, used for
+the timestamps stored in results, and a monotonic nanosecond counter, used to
+measure durations that are unaffected by wall-clock adjustments such as NTP
+slews.
+"""
+
+import ctypes
+import ctypes.util
+import datetime
+import sys
+import time
+
+import pytz
+
+_NANOSECONDS_PER_SECOND = 1000000000
+
+# clockid_t of CLOCK_MONOTONIC on Linux.
+_LINUX_CLOCK_MONOTONIC = 1
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+def _create_monotonic_ns():
+    """Returns the best available function for reading monotonic time in ns.
+
+    Python 2 has no monotonic clock in its standard library, so this uses
+    clock_gettime(CLOCK_MONOTONIC) on Linux and the performance counter behind
+    time.clock() on Windows. Other platforms fall back to time.time(), which
+    is high-resolution but not monotonic.
+    """
+    if hasattr(time, 'monotonic'):
+        return lambda: int(time.monotonic() * _NANOSECONDS_PER_SECOND)
+    if sys.platform.startswith('linux'):
+        libc_name = ctypes.util.find_library('c')
+        if libc_name:
+            clock_gettime = ctypes.CDLL(libc_name).clock_gettime
+            clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_Timespec)]
+
+            def linux_monotonic_ns():
+                timespec = _Timespec()
+                clock_gettime(_LINUX_CLOCK_MONOTONIC, ctypes.byref(timespec))
+                return (timespec.tv_sec * _NANOSECONDS_PER_SECOND +
+                        timespec.tv_nsec)
+
+            return linux_monotonic_ns
+    if sys.platform == 'win32':
+        return lambda: int(time.clock() * _NANOSECONDS_PER_SECOND)
+    return lambda: int(time.time() * _NANOSECONDS_PER_SECOND)
+
+
+_monotonic_ns = _create_monotonic_ns()
+
+
+class SystemClock(object):
+    """Clock backed by the system's wall clock and monotonic clock."""
+
+    def now(self):
+        """Returns the current time as a datetime in UTC."""
+        return datetime.datetime.now(pytz.utc)
+
+    def monotonic_ns(self):
+        """Returns the current reading of a monotonic clock in nanoseconds.
+
+        Readings are only meaningful relative to other readings from the same
+        process.
+        """
+        return _monotonic_ns()
+
+
+def elapsed_ns(start_ns, end_ns):
+    """Returns the nanoseconds between two monotonic readings.
+
+    Args:
+        start_ns: The monotonic reading at the start of the interval, or None.
+        end_ns: The monotonic reading at the end of the interval, or None.
+
+    Returns:
+        The duration of the interval in nanoseconds, or None if either reading
+        is missing.
+    """
+    if start_ns is None or end_ns is None:
+        return None
+    return end_ns - start_ns
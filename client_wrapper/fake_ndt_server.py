@@ -0,0 +1,340 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Local stand-in for an NDT server's HTML5 client page.
+
+The fake server serves a page with the same DOM contract as the NDT HTML5
+client, as far as NdtHtml5SeleniumDriver depends on it, but instead of
+measuring anything, it steps through the test phases on timers and displays
+configured metric values. This allows the whole client wrapper pipeline to be
+run and benchmarked offline.
+
+The page reports the browser's own timeline of each test back to the server,
+so the phase durations that the driver measures can be checked against the
+times at which the page actually changed.
+
+Run a standalone server with, e.g.:
+
+    python client_wrapper/fake_ndt_server.py --port 7123 --c2s_duration_ms 500
+"""
+
+import argparse
+import BaseHTTPServer
+import cgi
+import json
+import SocketServer
+import threading
+import urlparse
+
+# Settings of a fake test, with their defaults. Each can be overridden for a
+# single page load with a query parameter of the same name, e.g.
+# http://localhost:7123/?c2s_duration_ms=500.
+DEFAULT_SETTINGS = {
+    # Delay between clicking Start Test and the c2s phase starting. Like the
+    # phase durations, this is an integer number of milliseconds.
+    'start_delay_ms': 100,
+    'c2s_duration_ms': 1000,
+    's2c_duration_ms': 1000,
+    # Metric values, which are displayed verbatim on the results page.
+    'upload_speed': '10.12',
+    'upload_speed_units': 'Mb/s',
+    'download_speed': '98.23',
+    'download_speed_units': 'Mb/s',
+    'latency': '23',
+}
+
+_DURATION_SETTINGS = ('start_delay_ms', 'c2s_duration_ms', 's2c_duration_ms')
+
+# How often the serving thread checks whether it has been stopped.
+_POLL_INTERVAL_SECONDS = 0.05
+
+# Path the page posts its timeline to once the results are displayed.
+_TIMELINE_PATH = '/timeline'
+
+# The page's text must not contain the phrases the driver searches for (e.g.
+# 'Start Test') anywhere other than in the elements that display them, because
+# the driver uses the first element whose text contains each phrase.
+_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Fake NDT HTML5 client</title>
+</head>
+<body>
+<input type="radio" id="websocketButton" name="protocol" value="websocket">
+<label for="websocketButton">WebSocket</label>
+<button id="start-button" onclick="fakeNdt.start()">Start Test</button>
+<p id="upload-progress" style="display: none">
+Now testing your upload speed . . .</p>
+<p id="download-progress" style="display: none">
+Now testing your download speed . . .</p>
+<div id="results" style="display: none">
+<p>Upload: <span id="upload-speed">%(upload_speed)s</span>
+<span id="upload-speed-units">%(upload_speed_units)s</span></p>
+<p>Download: <span id="download-speed">%(download_speed)s</span>
+<span id="download-speed-units">%(download_speed_units)s</span></p>
+<p>Latency: <span id="latency">%(latency)s</span> ms</p>
+</div>
+<script>
+var fakeNdt = (function() {
+  var settings = %(settings_json)s;
+  var timeline = {};
+  var started = false;
+
+  function setDisplayed(id, displayed) {
+    document.getElementById(id).style.display = displayed ? '' : 'none';
+  }
+
+  function mark(phase) {
+    timeline[phase] = performance.now();
+  }
+
+  function reportTimeline() {
+    var request = new XMLHttpRequest();
+    request.open('POST', '%(timeline_path)s');
+    request.setRequestHeader('Content-Type', 'application/json');
+    request.send(JSON.stringify(timeline));
+  }
+
+  function start() {
+    if (started) {
+      return;
+    }
+    started = true;
+    mark('start');
+    setTimeout(function() {
+      setDisplayed('start-button', false);
+      setDisplayed('upload-progress', true);
+      mark('c2s_start');
+      setTimeout(function() {
+        setDisplayed('upload-progress', false);
+        setDisplayed('download-progress', true);
+        mark('s2c_start');
+        setTimeout(function() {
+          setDisplayed('download-progress', false);
+          setDisplayed('results', true);
+          mark('end');
+          reportTimeline();
+        }, settings.s2c_duration_ms);
+      }, settings.c2s_duration_ms);
+    }, settings.start_delay_ms);
+  }
+
+  return {start: start, timeline: timeline};
+})();
+</script>
+</body>
+</html>
+"""
+
+
+class FakeNdtServer(object):
+    """HTTP server for a fake NDT HTML5 client page, run in a thread.
+
+    Attributes:
+        timelines: A list of the timelines reported by completed tests, in the
+            order they were reported. Each timeline is a dictionary mapping
+            'start', 'c2s_start', 's2c_start' and 'end' to the browser's
+            performance.now() reading, in milliseconds, when the page entered
+            that phase.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, **kwargs):
+        """Creates a fake server. The server does not listen until started.
+
+        Args:
+            host: Host address to listen on.
+            port: Port to listen on, or 0 to choose any free port.
+            **kwargs: Overrides of DEFAULT_SETTINGS for every test served.
+        """
+        self._address = (host, port)
+        self._settings = _merge_settings(DEFAULT_SETTINGS, kwargs)
+        self._server = None
+        self._thread = None
+        self._timelines_lock = threading.Lock()
+        self.timelines = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def url(self):
+        """The URL of the fake NDT client page."""
+        host, port = self._server.server_address
+        return 'http://%s:%d/' % (host, port)
+
+    def start(self):
+        """Starts serving requests on a background thread."""
+        self._server = self._create_http_server()
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={'poll_interval': _POLL_INTERVAL_SECONDS})
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops serving requests and closes the listening socket."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+
+    def serve_forever(self):
+        """Serves requests on the calling thread until interrupted."""
+        self._server = self._create_http_server()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self._server = None
+
+    def render_page(self, query_settings):
+        """Renders the client page.
+
+        Args:
+            query_settings: A dictionary of settings that override the
+                server's settings for this page, with string values.
+
+        Returns:
+            The page's HTML.
+
+        Raises:
+            ValueError: If a setting is unrecognized or invalid.
+        """
+        settings = _merge_settings(self._settings, query_settings)
+        page_values = {
+            name: cgi.escape(
+                str(value),
+                quote=True)
+            for name, value in settings.iteritems()
+        }
+        page_values['settings_json'] = json.dumps({name: settings[name]
+                                                   for name in
+                                                   _DURATION_SETTINGS})
+        page_values['timeline_path'] = _TIMELINE_PATH
+        return _PAGE_TEMPLATE % page_values
+
+    def add_timeline(self, timeline):
+        with self._timelines_lock:
+            self.timelines.append(timeline)
+
+    def _create_http_server(self):
+        http_server = _ThreadingHttpServer(self._address, _FakeNdtHandler)
+        http_server.fake_ndt_server = self
+        return http_server
+
+
+class _ThreadingHttpServer(SocketServer.ThreadingMixIn,
+                           BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class _FakeNdtHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        url = urlparse.urlparse(self.path)
+        if url.path != '/':
+            self.send_error(404)
+            return
+        query_settings = {
+            name: values[-1]
+            for name, values in urlparse.parse_qs(url.query).iteritems()
+        }
+        try:
+            page = self.server.fake_ndt_server.render_page(query_settings)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        self._send_response(200, 'text/html; charset=utf-8', page)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        if self.path != _TIMELINE_PATH:
+            self.send_error(404)
+            return
+        length = int(self.headers.getheader('Content-Length', 0))
+        try:
+            timeline = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_error(400, 'Invalid timeline')
+            return
+        self.server.fake_ndt_server.add_timeline(timeline)
+        self._send_response(204, None, '')
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        # Requests are not logged, so they do not clutter benchmark output.
+        pass
+
+    def _send_response(self, status, content_type, body):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        # Every page load must show a fresh test.
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _merge_settings(settings, overrides):
+    """Applies overrides to a dictionary of settings.
+
+    Args:
+        settings: A dictionary of valid settings.
+        overrides: A dictionary of settings to override. Durations may be
+            given as integers or as strings of integers.
+
+    Returns:
+        A new dictionary of the merged settings.
+
+    Raises:
+        ValueError: If an override is unrecognized or invalid.
+    """
+    merged = dict(settings)
+    for name, value in overrides.iteritems():
+        if name not in DEFAULT_SETTINGS:
+            raise ValueError('Unrecognized fake NDT setting: %s' % name)
+        if name in _DURATION_SETTINGS:
+            value = int(value)
+            if value < 0:
+                raise ValueError('%s must not be negative' % name)
+        merged[name] = value
+    return merged
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='Fake NDT HTML5 server',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--host',
+                        help='Host address to listen on',
+                        default='127.0.0.1')
+    parser.add_argument('--port',
+                        help='Port to listen on',
+                        type=int,
+                        default=7123)
+    for setting_name, default in sorted(DEFAULT_SETTINGS.iteritems()):
+        parser.add_argument('--' + setting_name,
+                            help='Default %s of each fake test' % setting_name,
+                            type=type(default),
+                            default=default)
+    settings = vars(parser.parse_args())
+    host = settings.pop('host')
+    port = settings.pop('port')
+    print 'serving fake NDT client at http://%s:%d/' % (host, port)
+    FakeNdtServer(host, port, **settings).serve_forever()
@@ -0,0 +1,281 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""In-process stand-in for a Selenium WebDriver running an NDT HTML5 test.
+
+FakeWebDriver implements the subset of the WebDriver API that
+NdtHtml5SeleniumDriver uses, and simulates the NDT HTML5 client page: after
+the Start Test button is clicked, the page steps through the test phases on a
+scripted schedule and then displays scripted metric values. No browser or
+network is involved, so running NdtHtml5SeleniumDriver against it measures the
+driver's own overhead.
+
+Pass a FakeWebDriverFactory as the browser_factory of NdtHtml5SeleniumDriver to
+use fake browsers.
+"""
+
+import re
+import time
+
+from selenium.common import exceptions
+
+import clocks
+
+# Operations whose failure can be injected with FakeWebDriver's failures
+# argument.
+OPERATIONS = ('get', 'click', 'find_element', 'is_displayed', 'execute_script',
+              'execute_async_script', 'close')
+
+DEFAULT_METRICS = {
+    'upload-speed': '10.12',
+    'upload-speed-units': 'Mb/s',
+    'download-speed': '98.23',
+    'download-speed-units': 'Mb/s',
+    'latency': '23',
+}
+
+_XPATH_TEXT_PATTERN = re.compile(r"^//\*\[contains\(text\(\), '(.*)'\)\]$")
+
+# Elements of the fake page that the driver finds by their text.
+_ELEMENT_IDS_BY_TEXT = {
+    'Start Test': 'start-button',
+    'your upload speed': 'upload-progress',
+    'your download speed': 'download-progress',
+}
+
+# Elements that are displayed while the page is in each state. Unlike on a
+# real NDT page, progress messages stay displayed once shown, so that the
+# driver sees every phase even when phases are shorter than its polling
+# interval.
+_DISPLAYED_ELEMENT_IDS = {
+    'idle': ('websocketButton', 'start-button'),
+    'starting': ('websocketButton',),
+    'c2s': ('websocketButton', 'upload-progress'),
+    's2c': ('websocketButton', 'upload-progress', 'download-progress'),
+    'results': ('websocketButton', 'upload-progress', 'download-progress',
+                'results') + tuple(DEFAULT_METRICS),
+}
+
+_ALL_ELEMENT_IDS = frozenset([element_id
+                              for element_ids in _DISPLAYED_ELEMENT_IDS.values()
+                              for element_id in element_ids] +
+                             _ELEMENT_IDS_BY_TEXT.values())
+
+_NANOSECONDS_PER_MILLISECOND = 1000000
+
+
+class FakeWebDriverFactory(object):
+    """Creates FakeWebDrivers that share the same settings.
+
+    Attributes:
+        drivers: A list of every FakeWebDriver the factory has created.
+    """
+
+    def __init__(self, **kwargs):
+        """Creates a factory of fake drivers.
+
+        Args:
+            **kwargs: Arguments to pass to each FakeWebDriver.
+        """
+        self._kwargs = kwargs
+        self.drivers = []
+
+    def __call__(self, browser):
+        """Creates a fake driver, ignoring which browser was requested."""
+        driver = FakeWebDriver(**self._kwargs)
+        self.drivers.append(driver)
+        return driver
+
+
+class FakeWebDriver(object):
+    """Fake Selenium WebDriver showing a simulated NDT HTML5 client page.
+
+    Phase boundaries are scheduled relative to the click of the Start Test
+    button. With the default schedule of zero-length phases, the results are
+    displayed as soon as the test starts, so tests complete without waiting.
+
+    Attributes:
+        capabilities: The capabilities the fake browser reports.
+        command_counts: A dictionary mapping each operation in OPERATIONS to
+            the number of times it was performed.
+    """
+
+    def __init__(self,
+                 start_delay_ms=0,
+                 c2s_duration_ms=0,
+                 s2c_duration_ms=0,
+                 metrics=None,
+                 failures=None,
+                 clock=None):
+        """Creates a fake driver showing a blank page.
+
+        Args:
+            start_delay_ms: Delay between clicking Start Test and the c2s
+                phase starting.
+            c2s_duration_ms: Duration of the c2s phase.
+            s2c_duration_ms: Duration of the s2c phase.
+            metrics: A dictionary mapping metric element IDs (e.g.
+                'upload-speed') to the text they display, overriding
+                DEFAULT_METRICS.
+            failures: A dictionary mapping operations in OPERATIONS to an
+                exception (e.g. a WebDriverException or TimeoutException) to
+                raise every time that operation is performed.
+            clock: The clock that the page's schedule follows (or None to use
+                the system clock).
+        """
+        for operation in failures or {}:
+            if operation not in OPERATIONS:
+                raise ValueError('Unrecognized operation: %s' % operation)
+        self._c2s_start_ns = start_delay_ms * _NANOSECONDS_PER_MILLISECOND
+        self._s2c_start_ns = self._c2s_start_ns + (c2s_duration_ms *
+                                                   _NANOSECONDS_PER_MILLISECOND)
+        self._end_ns = self._s2c_start_ns + (s2c_duration_ms *
+                                             _NANOSECONDS_PER_MILLISECOND)
+        self._metrics = dict(DEFAULT_METRICS)
+        self._metrics.update(metrics or {})
+        self._failures = failures or {}
+        self._clock = clock or clocks.SystemClock()
+        self._url = None
+        self._test_start_ns = None
+        self.capabilities = {'browserName': 'fake', 'version': '1.0'}
+        self.command_counts = dict.fromkeys(OPERATIONS, 0)
+
+    def get(self, url):
+        self._perform('get')
+        self._url = url
+        self._test_start_ns = None
+
+    def close(self):
+        self._perform('close')
+        self._url = None
+
+    def quit(self):
+        self.close()
+
+    def delete_all_cookies(self):
+        pass
+
+    def set_script_timeout(self, timeout):
+        pass
+
+    def find_element_by_id(self, element_id):
+        self._perform('find_element')
+        if not self._url or element_id not in _ALL_ELEMENT_IDS:
+            raise exceptions.NoSuchElementException(
+                'Unable to locate element: %s' % element_id)
+        return FakeWebElement(self, element_id)
+
+    def find_elements_by_xpath(self, xpath):
+        self._perform('find_element')
+        match = _XPATH_TEXT_PATTERN.match(xpath)
+        if not self._url or not match:
+            return []
+        element_id = _ELEMENT_IDS_BY_TEXT.get(match.group(1))
+        if element_id is None:
+            return []
+        return [FakeWebElement(self, element_id)]
+
+    def execute_script(self, script, *args):
+        """Simulates running a script in the page.
+
+        Scripts given a list of element IDs (i.e. the driver's metric scraping
+        script) return the text of each element, or None if any is missing.
+        Other scripts return None.
+        """
+        self._perform('execute_script')
+        if args and isinstance(args[0], list):
+            metric_text = {}
+            for element_id in args[0]:
+                if element_id not in self._metrics:
+                    return None
+                metric_text[element_id] = self.element_text(element_id)
+            return metric_text
+        return None
+
+    def execute_async_script(self, script, *args):
+        """Simulates the driver's phase observer script.
+
+        Waits until the test completes and returns the page's timeline, in
+        milliseconds, in the form that the observer script returns.
+        """
+        self._perform('execute_async_script')
+        if self._test_start_ns is None:
+            raise exceptions.TimeoutException('Test was not started')
+        installed_ns = self._clock.monotonic_ns()
+        remaining_ns = self._test_start_ns + self._end_ns - installed_ns
+        if remaining_ns > 0:
+            time.sleep(remaining_ns / 1e9)
+
+        def phase_time(phase_start_ns):
+            # Like the observer script, phases that started before the script
+            # was installed are timestamped with the installation time.
+            return max(installed_ns, self._test_start_ns + phase_start_ns) / 1e6
+
+        return {
+            'installed': installed_ns / 1e6,
+            'c2s_start': phase_time(self._c2s_start_ns),
+            's2c_start': phase_time(self._s2c_start_ns),
+            'end': phase_time(self._end_ns),
+            'timed_out': False
+        }
+
+    def click(self, element_id):
+        self._perform('click')
+        if element_id == 'start-button' and self._test_start_ns is None:
+            self._test_start_ns = self._clock.monotonic_ns()
+
+    def is_displayed(self, element_id):
+        self._perform('is_displayed')
+        return element_id in _DISPLAYED_ELEMENT_IDS[self._page_state()]
+
+    def element_text(self, element_id):
+        if not self.is_displayed(element_id):
+            # Like Selenium, hidden elements have no visible text.
+            return ''
+        return self._metrics.get(element_id, '')
+
+    def _page_state(self):
+        if self._test_start_ns is None:
+            return 'idle'
+        elapsed_ns = self._clock.monotonic_ns() - self._test_start_ns
+        if elapsed_ns >= self._end_ns:
+            return 'results'
+        elif elapsed_ns >= self._s2c_start_ns:
+            return 's2c'
+        elif elapsed_ns >= self._c2s_start_ns:
+            return 'c2s'
+        return 'starting'
+
+    def _perform(self, operation):
+        self.command_counts[operation] += 1
+        failure = self._failures.get(operation)
+        if failure is not None:
+            raise failure
+
+
+class FakeWebElement(object):
+    """An element of a FakeWebDriver's page."""
+
+    def __init__(self, driver, element_id):
+        self._driver = driver
+        self.id = element_id
+
+    @property
+    def text(self):
+        return self._driver.element_text(self.id)
+
+    def click(self):
+        self._driver.click(self.id)
+
+    def is_displayed(self):
+        return self._driver.is_displayed(self.id)
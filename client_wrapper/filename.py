@@ -25,6 +25,14 @@ class FilenameCreationError(Error):
 
 _FILENAME_FORMAT = ('{os}-{browser}-{client}-{timestamp}-{type}.{extension}')
 
+# The parts of _FILENAME_FORMAT before and after the timestamp, so that
+# create_result_filenames can format each part once for many results.
+_FILENAME_PREFIX_FORMAT, _FILENAME_SUFFIX_FORMAT = _FILENAME_FORMAT.split(
+    '{timestamp}')
+
+# Maximum number of formatted timestamps create_result_filenames keeps at once.
+_MAX_TIMESTAMP_CACHE_SIZE = 4096
+
 
 def create_result_filename(result):
     """Create an output filename based on an NdtResult.
@@ -36,6 +44,117 @@ def create_result_filename(result):
         An output filename representing the result, for example:
 
             win10-chrome49-ndt_js-2016-02-26T155423Z-results.json
+
+    Raises:
+        FilenameCreationError: If the result's OS or browser is unrecognized,
+            or the result has no start time.
+    """
+    os, browser = _canonicalize_platform(result)
+    client = result.client
+    timestamp = _format_time(_start_time(result))
+    return _FILENAME_FORMAT.format(os=os,
+                                   browser=browser,
+                                   client=client,
+                                   timestamp=timestamp,
+                                   type='results',
+                                   extension='json')
+
+
+def create_result_filenames(results):
+    """Create output filenames for many NdtResults.
+
+    Produces the same filenames as calling create_result_filename on each
+    result, but canonicalizes each distinct combination of OS, browser and
+    client only once, and formats each distinct start time (to the second)
+    only once. A result whose filename cannot be created does not prevent
+    filenames being created for the other results.
+
+    Args:
+        results: An iterable of NdtResult instances.
+
+    Returns:
+        A (filenames, failures) tuple. filenames is a list containing, for
+        each result in order, its filename or None if its filename could not
+        be created. failures is a list of (index, error) pairs, where index is
+        the position of a result whose filename could not be created and error
+        is the FilenameCreationError or NotImplementedError describing why.
+    """
+    filenames = []
+    failures = []
+    # Maps (os, os_version, browser, browser_version, client) tuples to
+    # filename prefixes, or to the error raised when creating the prefix.
+    prefixes = {}
+    # Maps start times, truncated to the second, to formatted timestamps.
+    timestamps = {}
+    suffix = _FILENAME_SUFFIX_FORMAT.format(type='results', extension='json')
+    for index, result in enumerate(results):
+        metadata = (result.os, result.os_version, result.browser,
+                    result.browser_version, result.client)
+        prefix = prefixes.get(metadata)
+        if prefix is None:
+            try:
+                os, browser = _canonicalize_platform(result)
+                prefix = _FILENAME_PREFIX_FORMAT.format(os=os,
+                                                        browser=browser,
+                                                        client=result.client)
+            except (FilenameCreationError, NotImplementedError) as e:
+                prefix = e
+            prefixes[metadata] = prefix
+        if isinstance(prefix, Exception):
+            filenames.append(None)
+            failures.append((index, prefix))
+            continue
+
+        try:
+            start_time = _start_time(result)
+        except FilenameCreationError as e:
+            filenames.append(None)
+            failures.append((index, e))
+            continue
+        # Timestamps are formatted from the datetime's own fields, so key the
+        # cache by those fields rather than by the (timezone-normalized)
+        # datetime itself.
+        second = start_time.timetuple()[:6]
+        timestamp = timestamps.get(second)
+        if timestamp is None:
+            if len(timestamps) >= _MAX_TIMESTAMP_CACHE_SIZE:
+                timestamps.clear()
+            timestamp = _format_time(start_time)
+            timestamps[second] = timestamp
+        filenames.append(prefix + timestamp + suffix)
+    return filenames, failures
+
+
+def create_result_shard(result):
+    """Create the directory components of the shard a result belongs in.
+
+    Results are sharded by OS, browser and start date, so that each shard
+    holds at most one day's results for a single platform.
+
+    Args:
+        result: NdtResult instance for which to create a shard.
+
+    Returns:
+        A tuple of directory names, from outermost to innermost, for example:
+
+            ('win10', 'chrome49', '2016', '02', '26')
+
+    Raises:
+        FilenameCreationError: If the result's OS or browser is unrecognized,
+            or the result has no start time.
+    """
+    os, browser = _canonicalize_platform(result)
+    start_time = _start_time(result)
+    return (os, browser, '%04d' % start_time.year, '%02d' % start_time.month,
+            '%02d' % start_time.day)
+
+
+def _canonicalize_platform(result):
+    """Returns the canonical OS and browser names of an NdtResult.
+
+    Raises:
+        NotImplementedError: If the result is not from a browser-based test.
+        FilenameCreationError: If the result's OS or browser is unrecognized.
     """
     if not result.browser:
         raise NotImplementedError(
@@ -47,14 +166,20 @@ def create_result_filename(result):
     except canonicalize.Error as e:
         raise FilenameCreationError(
             'Could not generate filename for NDT result: %s', e.message)
-    client = result.client
-    timestamp = _format_time(result.start_time)
-    return _FILENAME_FORMAT.format(os=os,
-                                   browser=browser,
-                                   client=client,
-                                   timestamp=timestamp,
-                                   type='results',
-                                   extension='json')
+    return os, browser
+
+
+def _start_time(result):
+    """Returns the start time of an NdtResult.
+
+    Raises:
+        FilenameCreationError: If the result has no start time (e.g. its test
+            UI failed to load).
+    """
+    if result.start_time is None:
+        raise FilenameCreationError(
+            'Could not generate filename for NDT result: no start time')
+    return result.start_time
 
 
 def _format_time(timestamp):
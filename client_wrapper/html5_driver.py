@@ -15,6 +15,9 @@
 from __future__ import division
 import contextlib
 import datetime
+import functools
+import platform
+import threading
 
 import pytz
 from selenium import webdriver
@@ -22,93 +25,658 @@ from selenium.webdriver.support import ui
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common import exceptions
 
+import adaptive_timeout
+import browser_launch
+import clocks
+import instrumentation
 import names
 import results
 
 
+class Error(Exception):
+    pass
+
+
+class FailureBudgetExhaustedError(Error):
+    """Indicates that too many consecutive tests failed to load the client."""
+    pass
+
+# Phase detection modes for NdtHtml5SeleniumDriver.
+PHASE_DETECTION_POLLING = 'polling'
+PHASE_DETECTION_OBSERVER = 'observer'
+
+# Asynchronous script that watches the NDT client page with a MutationObserver
+# and records a performance.now() timestamp when each test phase's element
+# becomes visible. It calls back with the whole timeline once the results are
+# visible, or early (with timed_out set) if any phase takes longer than its
+# timeout. The script's first argument is the list of the timeouts, in
+# milliseconds, of the start delay, the c2s phase and the s2c phase.
+_PHASE_OBSERVER_SCRIPT = """
+var timeoutsMs = arguments[0];
+var callback = arguments[arguments.length - 1];
+var timeline = {installed: performance.now(), timed_out: false};
+
+function findByText(text) {
+  return document.evaluate('//*[contains(text(), "' + text + '")]', document,
+      null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+
+function isVisible(element) {
+  if (!element || element.getClientRects().length === 0) {
+    return false;
+  }
+  for (var node = element; node && node.nodeType === 1;
+       node = node.parentNode) {
+    var style = window.getComputedStyle(node);
+    if (style.display === 'none' || style.visibility === 'hidden') {
+      return false;
+    }
+  }
+  return true;
+}
+
+var phases = [
+  ['c2s_start', function() { return findByText('your upload speed'); }],
+  ['s2c_start', function() { return findByText('your download speed'); }],
+  ['end', function() { return document.getElementById('results'); }]
+];
+var nextPhase = 0;
+var finished = false;
+var deadline = null;
+var observer = new MutationObserver(checkPhases);
+
+function finish(timedOut) {
+  if (finished) {
+    return;
+  }
+  finished = true;
+  observer.disconnect();
+  clearTimeout(deadline);
+  timeline.timed_out = timedOut;
+  callback(timeline);
+}
+
+function resetDeadline() {
+  clearTimeout(deadline);
+  if (nextPhase < phases.length) {
+    deadline = setTimeout(function() { finish(true); }, timeoutsMs[nextPhase]);
+  }
+}
+
+function checkPhases() {
+  while (nextPhase < phases.length && isVisible(phases[nextPhase][1]())) {
+    timeline[phases[nextPhase][0]] = performance.now();
+    nextPhase++;
+    resetDeadline();
+  }
+  if (nextPhase === phases.length) {
+    finish(false);
+  }
+}
+
+observer.observe(document.documentElement, {
+  childList: true, subtree: true, attributes: true, characterData: true});
+resetDeadline();
+checkPhases();
+"""
+
+# IDs of the results page elements that display the NDT test metrics.
+_METRIC_ELEMENT_IDS = ('upload-speed', 'upload-speed-units', 'download-speed',
+                       'download-speed-units', 'latency')
+
+# Reads the visible text of each element whose ID is given in the script's
+# first argument, returning null if any of the elements is missing.
+_SCRAPE_METRICS_SCRIPT = """
+var metricText = {};
+for (var i = 0; i < arguments[0].length; i++) {
+  var element = document.getElementById(arguments[0][i]);
+  if (!element) {
+    return null;
+  }
+  var text = element.innerText;
+  if (text === undefined) {
+    text = element.textContent;
+  }
+  metricText[arguments[0][i]] = text.trim();
+}
+return metricText;
+"""
+
+# Clears web storage for the current page, ignoring pages (e.g. about:blank)
+# where storage access is forbidden.
+_CLEAR_STORAGE_SCRIPT = """
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+"""
+
+
 class NdtHtml5SeleniumDriver(object):
 
-    def __init__(self, browser, url, timeout):
+    def __init__(self,
+                 browser,
+                 url,
+                 timeout,
+                 persistent_session=False,
+                 max_tests_per_session=None,
+                 phase_detection=PHASE_DETECTION_POLLING,
+                 batch_scrape=False,
+                 clock=None,
+                 browser_factory=None,
+                 launch_options=None,
+                 prewarm=False,
+                 hooks=None,
+                 collect_spans=False,
+                 load_retry_policy=None,
+                 load_failure_budget=None,
+                 timeout_policy=None):
         """Creates a NDT HTML5 client driver for the given URL and browser.
 
         Args:
             url: The URL of an NDT server to test against.
             browser: Can be one of 'firefox', 'chrome', 'edge', or 'safari'.
             timeout: The number of seconds that the driver will wait for each
-                element to become visible before timing out.
+                element to become visible before timing out, unless
+                timeout_policy is given.
+            persistent_session: If True, the driver keeps one browser session
+                alive across calls to perform_test, resetting page state
+                between tests instead of launching a new browser for each
+                test. The caller must call close() when finished.
+            max_tests_per_session: The number of tests to run in a persistent
+                browser session before relaunching the browser (or None to
+                relaunch only after a failed test).
+            phase_detection: How the driver detects the start and end of each
+                test phase. PHASE_DETECTION_POLLING polls each element's
+                visibility over WebDriver. PHASE_DETECTION_OBSERVER injects a
+                MutationObserver that timestamps each phase in the browser and
+                returns the whole timeline in one script call, falling back to
+                polling if the browser cannot run the script.
+            batch_scrape: If True, the driver reads all metric values from the
+                results page in a single script call instead of one WebDriver
+                call per element.
+            clock: The clock used to timestamp and time test phases (or None
+                to use the system clock).
+            browser_factory: A function that takes a browser name and returns
+                a new Selenium webdriver for that browser (or None to launch
+                real browsers). For example, a
+                fake_webdriver.FakeWebDriverFactory.
+            launch_options: A browser_launch.LaunchOptions instance that
+                configures real browsers (or None to launch them with
+                Selenium's defaults). Ignored if browser_factory is given.
+            prewarm: If True, the driver launches the browser for the next
+                test on a background thread once the current test reaches its
+                s2c phase, so that the next test does not wait for a launch.
+                Each test still runs in a fresh browser. Cannot be combined
+                with persistent_session. The caller must call close() when
+                finished to discard the unused browser.
+            hooks: A list of instrumentation.PhaseHooks that receive the
+                phase and WebDriver command events of every test (or None).
+            collect_spans: If True, each result's spans attribute is set to
+                the list of PhaseSpans of its test.
+            load_retry_policy: A retry.RetryPolicy for retrying, in the same
+                browser, a failed load of the NDT client page (or None to not
+                retry).
+            load_failure_budget: The number of consecutive tests that may
+                fail to load the NDT client page, after any retries, before
+                perform_test raises FailureBudgetExhaustedError instead of
+                running another test (or None for no limit).
+            timeout_policy: An adaptive_timeout.AdaptiveTimeouts that chooses
+                the timeout of each test phase from the durations of earlier
+                tests against url, and records the durations and timeouts of
+                each test (or None to wait timeout seconds for every phase).
         """
+        if prewarm and persistent_session:
+            raise ValueError('prewarm cannot be used with persistent_session')
         self._browser = browser
         self._url = url
         self._timeout = timeout
+        self._persistent_session = persistent_session
+        self._max_tests_per_session = max_tests_per_session
+        self._phase_detection = phase_detection
+        self._batch_scrape = batch_scrape
+        self._clock = clock or clocks.SystemClock()
+        self._browser_factory = browser_factory or functools.partial(
+            _create_browser,
+            launch_options=launch_options)
+        self._os, self._os_version = _get_os_metadata()
+        self._session = None
+        self._session_test_count = 0
+        self._browser_launches = 0
+        self._browser_reuses = 0
+        self._total_launch_ns = 0
+        self._prewarm = prewarm
+        self._prewarmed_browser = None
+        self._prewarmed_tests = 0
+        self._hooks = list(hooks or [])
+        self._collect_spans = collect_spans
+        self._load_retry_policy = load_retry_policy
+        self._load_failure_budget = load_failure_budget
+        self._consecutive_load_failures = 0
+        self._timeout_policy = timeout_policy
+
+    @property
+    def browser_launches(self):
+        """The number of browsers this driver has launched."""
+        return self._browser_launches
+
+    @property
+    def browser_reuses(self):
+        """The number of tests that ran in an already-running browser."""
+        return self._browser_reuses
+
+    @property
+    def prewarmed_tests(self):
+        """The number of tests that ran in a browser prewarmed for them."""
+        return self._prewarmed_tests
+
+    @property
+    def startup_time_saved(self):
+        """Estimated seconds of browser startup avoided by session reuse.
+
+        Each reuse of a persistent session is credited with the mean launch
+        time of the browsers this driver actually launched.
+        """
+        if not self._browser_launches:
+            return 0.0
+        mean_launch_ns = self._total_launch_ns / self._browser_launches
+        return self._browser_reuses * mean_launch_ns / 1e9
 
     def perform_test(self):
         """Performs a full NDT test (both s2c and c2s) with the HTML5 client.
 
         Returns:
             A populated NdtResult object.
+
+        Raises:
+            FailureBudgetExhaustedError: If the load failure budget has been
+                used up by earlier tests.
         """
+        if (self._load_failure_budget is not None and
+                self._consecutive_load_failures >= self._load_failure_budget):
+            raise FailureBudgetExhaustedError(
+                'NDT client failed to load in %d consecutive tests' %
+                self._consecutive_load_failures)
         result = results.NdtResult(start_time=None, end_time=None, errors=[])
+        result.client = names.NDT_HTML5
+        result.os = self._os
+        result.os_version = self._os_version
+        result.browser = self._browser
+
+        if not self._persistent_session:
+            with contextlib.closing(self._acquire_browser(result)) as driver:
+                self._perform_test_in_browser(driver, result)
+            return result
+
+        driver = self._acquire_session(result)
+        try:
+            self._perform_test_in_browser(driver, result)
+        except Exception:
+            self._end_session()
+            raise
+        self._release_session(result)
+        return result
 
-        with contextlib.closing(_create_browser(self._browser)) as driver:
+    def close(self):
+        """Closes the persistent browser session and any prewarmed browser."""
+        self._end_session()
+        self._discard_prewarmed_browser()
 
-            if not _load_url(driver, self._url, result):
-                return result
+    def _perform_test_in_browser(self, driver, result):
+        """Runs a single NDT test in an already launched browser.
 
-            _click_start_button(driver, result)
+        Args:
+            driver: An instance of a Selenium webdriver browser class.
+            result: An instance of NdtResult to populate.
+        """
+        result.browser_version = _get_browser_version(driver)
+        collector = None
+        hooks = self._hooks
+        if self._collect_spans:
+            collector = instrumentation.SpanCollector()
+            hooks = hooks + [collector]
+        if hooks:
+            hooks = instrumentation.HookDispatcher(hooks)
+            driver = instrumentation.InstrumentedWebDriver(driver, hooks,
+                                                           self._clock)
+        else:
+            hooks = None
+        try:
+            self._run_test_phases(driver, result, hooks)
+        finally:
+            if collector:
+                result.spans = collector.spans
 
-            if not _record_test_in_progress_values(result, driver,
-                                                   self._timeout):
-                return result
+    def _run_test_phases(self, driver, result, hooks):
+        """Runs each phase of a test, reporting each phase to hooks.
 
-            if not _populate_metric_values(result, driver):
-                return result
+        Args:
+            driver: An instance of a Selenium webdriver browser class.
+            result: An instance of NdtResult to populate.
+            hooks: The PhaseHooks to report phases to (or None).
+        """
+        with _phase(hooks, instrumentation.PHASE_LOAD_URL, self._clock):
+            loaded = _load_url(driver, self._url, result,
+                               self._load_retry_policy)
+        if not loaded:
+            self._consecutive_load_failures += 1
+            return
+        self._consecutive_load_failures = 0
+
+        with _phase(hooks, instrumentation.PHASE_CLICK_START, self._clock):
+            start_ns = _click_start_button(driver, result, self._clock)
+
+        if self._timeout_policy:
+            timeouts = self._timeout_policy.timeouts(self._url)
+        else:
+            timeouts = adaptive_timeout.fixed_timeouts(self._timeout)
+        result.phase_timeouts_ns = {
+            phase: int(timeout * 1e9)
+            for phase, timeout in timeouts.iteritems()
+        }
+        on_s2c_start = self._prewarm_browser if self._prewarm else None
+        with _phase(hooks, instrumentation.PHASE_TEST_IN_PROGRESS, self._clock):
+            if self._phase_detection == PHASE_DETECTION_OBSERVER:
+                recorded = _observe_test_in_progress_values(
+                    result, driver, timeouts, self._clock, start_ns,
+                    on_s2c_start)
+            else:
+                recorded = _record_test_in_progress_values(
+                    result, driver, timeouts, self._clock, start_ns,
+                    on_s2c_start)
+        if recorded:
+            with _phase(hooks, instrumentation.PHASE_SCRAPE_METRICS,
+                        self._clock):
+                _populate_metric_values(result, driver, self._batch_scrape)
+        # Tests that timed out are recorded too, so that the timeouts of a
+        # link that has become slower can grow.
+        if self._timeout_policy:
+            self._timeout_policy.record_result(self._url, result)
+
+    def _launch_browser(self, result):
+        """Launches a new browser and records how long the launch took.
 
-            return result
+        Args:
+            result: The NdtResult of the test the browser is launched for,
+                whose browser_launch_ns is set to the launch time.
+        """
+        driver, launch_ns = self._timed_launch()
+        self._record_launch(result, launch_ns)
+        return driver
 
+    def _timed_launch(self):
+        """Launches a new browser.
 
-def _create_browser(browser):
+        Returns:
+            A tuple of the browser's Selenium webdriver and the nanoseconds
+            the launch took.
+        """
+        launch_start_ns = self._clock.monotonic_ns()
+        driver = self._browser_factory(self._browser)
+        return driver, self._clock.monotonic_ns() - launch_start_ns
+
+    def _record_launch(self, result, launch_ns):
+        result.browser_launch_ns = launch_ns
+        self._total_launch_ns += launch_ns
+        self._browser_launches += 1
+
+    def _acquire_browser(self, result):
+        """Returns a fresh browser for a test.
+
+        Uses the prewarmed browser if there is one, and otherwise launches a
+        browser. A failed prewarm launch is retried here, so that its error
+        is raised from the test that needs the browser.
+
+        Args:
+            result: The NdtResult of the test the browser is acquired for.
+        """
+        prewarmed_browser = self._prewarmed_browser
+        self._prewarmed_browser = None
+        if prewarmed_browser is not None:
+            launch = prewarmed_browser.take()
+            if launch is not None:
+                driver, launch_ns = launch
+                self._record_launch(result, launch_ns)
+                self._prewarmed_tests += 1
+                return driver
+        return self._launch_browser(result)
+
+    def _prewarm_browser(self):
+        """Starts launching the next test's browser in the background."""
+        if self._prewarmed_browser is None:
+            self._prewarmed_browser = _PrewarmedBrowser(self._timed_launch)
+
+    def _discard_prewarmed_browser(self):
+        prewarmed_browser = self._prewarmed_browser
+        self._prewarmed_browser = None
+        if prewarmed_browser is None:
+            return
+        launch = prewarmed_browser.take()
+        if launch is None:
+            return
+        try:
+            launch[0].close()
+        except exceptions.WebDriverException:
+            pass
+
+    def _acquire_session(self, result):
+        """Returns the persistent browser, launching it if necessary.
+
+        Args:
+            result: The NdtResult of the test the browser is acquired for.
+        """
+        if self._session is None:
+            self._session = self._launch_browser(result)
+            self._session_test_count = 0
+        else:
+            self._browser_reuses += 1
+        return self._session
+
+    def _release_session(self, result):
+        """Prepares the persistent browser for the next test.
+
+        The session is ended if the test failed, if the session has reached
+        its test limit, or if its page state could not be reset. Otherwise,
+        it is left idle on a blank page for the next call to perform_test.
+
+        Args:
+            result: The NdtResult of the test that just completed.
+        """
+        self._session_test_count += 1
+        if result.errors:
+            self._end_session()
+        elif (self._max_tests_per_session and
+              self._session_test_count >= self._max_tests_per_session):
+            self._end_session()
+        elif not _reset_page_state(self._session):
+            self._end_session()
+
+    def _end_session(self):
+        if self._session is None:
+            return
+        session = self._session
+        self._session = None
+        try:
+            session.close()
+        except exceptions.WebDriverException:
+            pass
+
+
+@contextlib.contextmanager
+def _phase(hooks, phase, clock):
+    """Reports the start and end of a test phase to hooks, if any."""
+    if hooks is None:
+        yield
+        return
+    hooks.phase_started(phase, clock.monotonic_ns())
+    try:
+        yield
+    finally:
+        hooks.phase_ended(phase, clock.monotonic_ns())
+
+
+class _PrewarmedBrowser(object):
+    """A browser launched on a background thread."""
+
+    def __init__(self, launch):
+        """Starts launching a browser.
+
+        Args:
+            launch: A function that launches a browser, returning what take()
+                should return.
+        """
+        self._launch = launch
+        self._launched = None
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._launched = self._launch()
+        except Exception:  # pylint: disable=broad-except
+            # The caller launches a browser itself instead.
+            pass
+
+    def take(self):
+        """Waits for the launch to finish.
+
+        Returns:
+            The value returned by the launch function, or None if it failed.
+        """
+        self._thread.join()
+        return self._launched
+
+
+def _create_browser(browser, launch_options=None):
     """Creates browser for an NDT test.
 
     Args:
         browser: Can be one of 'firefox', 'chrome', 'edge', or 'safari'
+        launch_options: A browser_launch.LaunchOptions instance (or None to
+            launch the browser with Selenium's defaults).
 
     Returns:
         An instance of a Selenium webdriver browser class corresponding to
         the specified browser.
+
+    Raises:
+        ValueError: If the browser is invalid, or does not support the launch
+            options.
     """
+    launch_options = launch_options or browser_launch.LaunchOptions()
     if browser == names.FIREFOX:
-        return webdriver.Firefox()
+        return webdriver.Firefox(
+            **browser_launch.firefox_arguments(launch_options))
     elif browser == names.CHROME:
-        return webdriver.Chrome()
+        return webdriver.Chrome(
+            **browser_launch.chrome_arguments(launch_options))
     elif browser == names.EDGE:
-        return webdriver.Edge()
+        return webdriver.Edge(**browser_launch.edge_arguments(launch_options))
     elif browser == names.SAFARI:
-        return webdriver.Safari()
+        return webdriver.Safari(
+            **browser_launch.safari_arguments(launch_options))
     raise ValueError('Invalid browser specified: %s' % browser)
 
 
-def _load_url(driver, url, result):
-    """Loads the URL in a Selenium driver for an NDT test.
+def _get_os_metadata():
+    """Identifies the OS that the driver's browsers run on.
+
+    Returns:
+        An (os, os_version) tuple in the form that
+        canonicalize.os_to_shortname expects, e.g. ('Ubuntu', '14.04') or
+        ('Windows', '10.0'). OSes without a known form are identified by their
+        platform.system() and platform.release() values.
+    """
+    system = platform.system()
+    if system == 'Windows':
+        return 'Windows', _major_minor_version(platform.version())
+    elif system == 'Darwin':
+        return 'OSX', _major_minor_version(platform.mac_ver()[0])
+    elif system == 'Linux':
+        distribution, version, _ = platform.linux_distribution()
+        if distribution:
+            return distribution, version
+    return system, platform.release()
+
+
+def _major_minor_version(version):
+    return '.'.join(version.split('.')[:2])
+
+
+def _get_browser_version(driver):
+    """Reads the browser version from a Selenium driver's capabilities.
 
     Args:
-        driver: An instance of a Selenium webdriver.
-        url: The The URL of an NDT server to test against.
-        result: An instance of NdtResult.
+        driver: An instance of a Selenium webdriver browser class.
 
     Returns:
-        True if loading the URL was successful, False if otherwise.
+        The browser version string, or None if the driver does not report it.
+    """
+    capabilities = getattr(driver, 'capabilities', None)
+    if not isinstance(capabilities, dict):
+        return None
+    # W3C drivers report browserVersion; older drivers report version.
+    return capabilities.get('browserVersion') or capabilities.get('version')
+
+
+def _reset_page_state(driver):
+    """Clears page state left behind by a test so the browser can be reused.
+
+    Clears web storage for the test page's origin, deletes cookies, and then
+    navigates away from the test page so that no test UI is left running.
+
+    Args:
+        driver: An instance of a Selenium webdriver browser class.
+
+    Returns:
+        True if the page state was reset, False if otherwise.
     """
     try:
-        driver.get(url)
+        driver.execute_script(_CLEAR_STORAGE_SCRIPT)
+        driver.delete_all_cookies()
+        driver.get('about:blank')
     except exceptions.WebDriverException:
-        message = 'Failed to load test UI.'
-        result.errors.append(results.TestError(
-            datetime.datetime.now(pytz.utc), message))
         return False
     return True
 
 
-def _click_start_button(driver, result):
+def _load_url(driver, url, result, retry_policy=None):
+    """Loads the URL in a Selenium driver for an NDT test.
+
+    If a retry policy is given, a failed load is retried according to it, and
+    the number of retries and the time spent waiting before them are recorded
+    in the NdtResult.
+
+    Args:
+        driver: An instance of a Selenium webdriver.
+        url: The The URL of an NDT server to test against.
+        result: An instance of NdtResult.
+        retry_policy: A retry.RetryPolicy for failed loads (or None to not
+            retry).
+
+    Returns:
+        True if loading the URL was successful, False if otherwise.
+    """
+    if retry_policy is not None:
+        result.load_retries = 0
+        result.load_backoff_ns = 0
+    while True:
+        try:
+            driver.get(url)
+            return True
+        except exceptions.WebDriverException:
+            if (retry_policy is None or
+                    result.load_retries >= retry_policy.max_retries):
+                break
+        result.load_retries += 1
+        result.load_backoff_ns += int(retry_policy.wait(result.load_retries) *
+                                      1e9)
+    message = 'Failed to load test UI.'
+    result.errors.append(results.TestError(
+        datetime.datetime.now(pytz.utc), message))
+    return False
+
+
+def _click_start_button(driver, result, clock):
     """Clicks start test button and records start time.
 
     Clicks the start test button for an NDT test and records the start time in
@@ -117,58 +685,94 @@ def _click_start_button(driver, result):
     Args:
         driver: An instance of a Selenium webdriver browser class.
         result: An instance of an NdtResult class.
+        clock: The clock used to timestamp test phases.
+
+    Returns:
+        The monotonic clock reading, in nanoseconds, at the start of the test.
     """
     driver.find_element_by_id('websocketButton').click()
 
     start_button = driver.find_elements_by_xpath(
         "//*[contains(text(), 'Start Test')]")[0]
     start_button.click()
-    result.start_time = datetime.datetime.now(pytz.utc)
+    result.start_time = clock.now()
+    return clock.monotonic_ns()
 
 
-def _record_test_in_progress_values(result, driver, timeout):
+def _record_test_in_progress_values(result,
+                                    driver,
+                                    timeouts,
+                                    clock,
+                                    start_ns,
+                                    on_s2c_start=None):
     """Records values that are measured while the NDT test is in progress.
 
     Measures s2c_start_time, c2s_end_time, and end_time, which are stored in
     an instance of NdtResult. These times are measured while the NDT test is
     in progress.
 
+    Also records monotonic phase durations: the c2s phase lasts until the s2c
+    progress text is displayed, and the s2c phase lasts until the results are
+    displayed.
+
     Args:
         result: An instance of NdtResult.
         driver: An instance of a Selenium webdriver browser class.
-        timeout: The number of seconds that the driver will wait for
-            each element to become visible before timing out.
+        timeouts: A dictionary mapping each phase in adaptive_timeout.PHASES
+            to the number of seconds that the driver will wait for the phase
+            to end before timing out.
+        clock: The clock used to timestamp test phases.
+        start_ns: The monotonic clock reading at the start of the test.
+        on_s2c_start: A function to call with no arguments once the s2c phase
+            starts (or None).
 
     Returns:
         True if recording the measured values was successful, False if otherwise.
     """
+    # The phase being waited on, recorded as the phase that timed out if the
+    # wait times out.
+    phase = adaptive_timeout.PHASE_START
     try:
         # wait until 'Now Testing your upload speed' is displayed
         upload_speed_text = driver.find_elements_by_xpath(
             "//*[contains(text(), 'your upload speed')]")[0]
         result.c2s_result = results.NdtSingleTestResult()
-        result.c2s_result.start_time = _record_time_when_element_displayed(
-            upload_speed_text,
-            driver,
-            timeout=timeout)
-        result.c2s_result.end_time = datetime.datetime.now(pytz.utc)
+        (result.c2s_result.start_time,
+         c2s_start_ns) = _record_time_when_element_displayed(
+             upload_speed_text,
+             driver,
+             timeout=timeouts[adaptive_timeout.PHASE_START],
+             clock=clock)
+        result.c2s_result.end_time = clock.now()
+        phase = adaptive_timeout.PHASE_C2S
 
         # wait until 'Now Testing your download speed' is displayed
         download_speed_text = driver.find_elements_by_xpath(
             "//*[contains(text(), 'your download speed')]")[0]
         result.s2c_result = results.NdtSingleTestResult()
-        result.s2c_result.start_time = _record_time_when_element_displayed(
-            download_speed_text,
-            driver,
-            timeout=timeout)
+        (result.s2c_result.start_time,
+         s2c_start_ns) = _record_time_when_element_displayed(
+             download_speed_text,
+             driver,
+             timeout=timeouts[adaptive_timeout.PHASE_C2S],
+             clock=clock)
+        result.c2s_result.duration_ns = s2c_start_ns - c2s_start_ns
+        if on_s2c_start:
+            on_s2c_start()
 
         # wait until the results page appears
+        phase = adaptive_timeout.PHASE_S2C
         results_text = driver.find_element_by_id('results')
-        result.s2c_result.end_time = datetime.datetime.now(pytz.utc)
-        result.end_time = _record_time_when_element_displayed(results_text,
-                                                              driver,
-                                                              timeout=timeout)
+        result.s2c_result.end_time = clock.now()
+        result.end_time, end_ns = _record_time_when_element_displayed(
+            results_text,
+            driver,
+            timeout=timeouts[adaptive_timeout.PHASE_S2C],
+            clock=clock)
+        result.s2c_result.duration_ns = end_ns - s2c_start_ns
+        result.duration_ns = end_ns - start_ns
     except exceptions.TimeoutException:
+        result.timed_out_phase = phase
         message = 'Test did not complete within timeout period.'
         result.errors.append(results.TestError(
             datetime.datetime.now(pytz.utc), message))
@@ -176,7 +780,103 @@ def _record_test_in_progress_values(result, driver, timeout):
     return True
 
 
-def _record_time_when_element_displayed(element, driver, timeout):
+def _observe_test_in_progress_values(result,
+                                     driver,
+                                     timeouts,
+                                     clock,
+                                     start_ns,
+                                     on_s2c_start=None):
+    """Records in-progress test values using an injected MutationObserver.
+
+    Records the same values as _record_test_in_progress_values, but from
+    timestamps taken in the browser as each phase's element becomes visible,
+    rather than by polling element visibility over WebDriver. The browser
+    timestamps are converted to datetimes relative to the time the observer
+    was installed. Each phase ends when the next phase's element becomes
+    visible, so c2s ends when s2c starts and s2c ends when the results appear.
+
+    Phase durations are measured with the browser's high-resolution
+    performance.now() clock, anchored to a monotonic reading of the local
+    clock taken when the observer was installed.
+
+    If the browser cannot run the observer script, falls back to
+    _record_test_in_progress_values.
+
+    Args:
+        result: An instance of NdtResult.
+        driver: An instance of a Selenium webdriver browser class.
+        timeouts: A dictionary mapping each phase in adaptive_timeout.PHASES
+            to the number of seconds that the driver will wait for the phase
+            to end before timing out.
+        clock: The clock used to timestamp test phases.
+        start_ns: The monotonic clock reading at the start of the test.
+        on_s2c_start: A function to call with no arguments once the s2c phase
+            has started (or None). The observer reports the timeline only
+            when the test ends, so it is called then, before the metrics are
+            read.
+
+    Returns:
+        True if recording the measured values was successful, False if otherwise.
+    """
+    phase_timeouts = [timeouts[phase] for phase in adaptive_timeout.PHASES]
+    try:
+        # Give the script enough time for every phase to reach its timeout,
+        # plus a margin so that the script's own deadline fires first.
+        driver.set_script_timeout(sum(phase_timeouts) + 5)
+        installed_time = clock.now()
+        installed_ns = clock.monotonic_ns()
+        timeline = driver.execute_async_script(_PHASE_OBSERVER_SCRIPT,
+                                               [timeout * 1000
+                                                for timeout in phase_timeouts])
+    except exceptions.TimeoutException:
+        timeline = {'timed_out': True}
+    except exceptions.WebDriverException:
+        return _record_test_in_progress_values(result, driver, timeouts, clock,
+                                               start_ns, on_s2c_start)
+    if not isinstance(timeline, dict):
+        return _record_test_in_progress_values(result, driver, timeouts, clock,
+                                               start_ns, on_s2c_start)
+
+    def phase_time(phase):
+        if timeline.get(phase) is None:
+            return None, None
+        elapsed_ms = timeline[phase] - timeline['installed']
+        return (installed_time + datetime.timedelta(milliseconds=elapsed_ms),
+                installed_ns + int(round(elapsed_ms * 1e6)))
+
+    c2s_start_time, c2s_start_ns = phase_time('c2s_start')
+    s2c_start_time, s2c_start_ns = phase_time('s2c_start')
+    end_time, end_ns = phase_time('end')
+    if c2s_start_time:
+        result.c2s_result = results.NdtSingleTestResult(
+            start_time=c2s_start_time,
+            end_time=s2c_start_time,
+            duration_ns=clocks.elapsed_ns(c2s_start_ns, s2c_start_ns))
+    if s2c_start_time:
+        result.s2c_result = results.NdtSingleTestResult(
+            start_time=s2c_start_time,
+            end_time=end_time,
+            duration_ns=clocks.elapsed_ns(s2c_start_ns, end_ns))
+    result.end_time = end_time
+    result.duration_ns = clocks.elapsed_ns(start_ns, end_ns)
+    if s2c_start_time and on_s2c_start:
+        on_s2c_start()
+
+    if timeline['timed_out']:
+        if c2s_start_time is None:
+            result.timed_out_phase = adaptive_timeout.PHASE_START
+        elif s2c_start_time is None:
+            result.timed_out_phase = adaptive_timeout.PHASE_C2S
+        else:
+            result.timed_out_phase = adaptive_timeout.PHASE_S2C
+        message = 'Test did not complete within timeout period.'
+        result.errors.append(results.TestError(
+            datetime.datetime.now(pytz.utc), message))
+        return False
+    return True
+
+
+def _record_time_when_element_displayed(element, driver, timeout, clock):
     """Return the time when the specified element is displayed.
 
     The Selenium WebDriver checks whether the specified element is visible. If
@@ -188,19 +888,22 @@ def _record_time_when_element_displayed(element, driver, timeout):
         driver: An instance of a Selenium webdriver browser class.
         timeout: The number of seconds that the driver will wait for
             each element to become visible before timing out.
+        clock: The clock used to timestamp test phases.
 
     Returns:
-        A datetime object with a timezone information attribute.
+        A tuple of a datetime object with a timezone information attribute and
+        the monotonic clock reading in nanoseconds, both taken when the element
+        became visible.
 
     Raises:
         TimeoutException: If the element does not become visible before the
             timeout time passes.
     """
     ui.WebDriverWait(driver, timeout=timeout).until(EC.visibility_of(element))
-    return datetime.datetime.now(pytz.utc)
+    return clock.now(), clock.monotonic_ns()
 
 
-def _populate_metric_values(result, driver):
+def _populate_metric_values(result, driver, batch_scrape=False):
     """Populates NdtResult with metrics from page, checks values are valid.
 
     Populates the NdtResult instance with metrics from the NDT test page. Checks
@@ -210,30 +913,33 @@ def _populate_metric_values(result, driver):
     Args:
         result: An instance of NdtResult.
         driver: An instance of a Selenium webdriver browser class.
+        batch_scrape: If True, reads all metric elements in a single script
+            call, falling back to reading each element individually if the
+            script fails.
 
     Returns:
         True if populating metrics and checking their values was successful.
             False if otherwise.
     """
     try:
-        c2s_throughput = driver.find_element_by_id('upload-speed').text
-        c2s_throughput_units = driver.find_element_by_id(
-            'upload-speed-units').text
+        metric_text = None
+        if batch_scrape:
+            metric_text = _scrape_metric_text(driver)
+        if metric_text is None:
+            metric_text = {}
+            for element_id in _METRIC_ELEMENT_IDS:
+                metric_text[element_id] = driver.find_element_by_id(
+                    element_id).text
 
         result.c2s_result.throughput = _parse_throughput(
-            result.errors, c2s_throughput, c2s_throughput_units,
-            'c2s throughput')
+            result.errors, metric_text['upload-speed'],
+            metric_text['upload-speed-units'], 'c2s throughput')
 
-        s2c_throughput = driver.find_element_by_id('download-speed').text
-
-        s2c_throughput_units = driver.find_element_by_id(
-            'download-speed-units').text
         result.s2c_result.throughput = _parse_throughput(
-            result.errors, s2c_throughput, s2c_throughput_units,
-            's2c throughput')
+            result.errors, metric_text['download-speed'],
+            metric_text['download-speed-units'], 's2c throughput')
 
-        result.latency = driver.find_element_by_id('latency').text
-        result.latency = _validate_metric(result.errors, result.latency,
+        result.latency = _validate_metric(result.errors, metric_text['latency'],
                                           'latency')
     except exceptions.TimeoutException:
         message = 'Test did not complete within timeout period.'
@@ -243,6 +949,29 @@ def _populate_metric_values(result, driver):
     return True
 
 
+def _scrape_metric_text(driver):
+    """Reads the text of every metric element in a single script call.
+
+    Args:
+        driver: An instance of a Selenium webdriver browser class.
+
+    Returns:
+        A dictionary mapping each of _METRIC_ELEMENT_IDS to its element's text,
+        or None if the script failed or any element was missing.
+    """
+    try:
+        metric_text = driver.execute_script(_SCRAPE_METRICS_SCRIPT,
+                                            list(_METRIC_ELEMENT_IDS))
+    except exceptions.WebDriverException:
+        return None
+    if not isinstance(metric_text, dict):
+        return None
+    if any(metric_text.get(element_id) is None
+           for element_id in _METRIC_ELEMENT_IDS):
+        return None
+    return metric_text
+
+
 def _parse_throughput(errors, throughput, throughput_units,
                       throughput_metric_name):
     """Converts metric into a valid numeric value in Mb/s .
@@ -0,0 +1,177 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Hooks that observe the phases of a test and the WebDriver commands in them.
+
+NdtHtml5SeleniumDriver reports the start and end of each phase of a test (e.g.
+loading the client page or scraping the metrics) to its hooks, and, while any
+hooks are installed, routes every WebDriver command through
+InstrumentedWebDriver so that each command's duration is reported as well.
+"""
+
+import clocks
+import results
+
+# Phases of an NDT HTML5 test, in the order they run.
+PHASE_LOAD_URL = 'load_url'
+PHASE_CLICK_START = 'click_start'
+PHASE_TEST_IN_PROGRESS = 'test_in_progress'
+PHASE_SCRAPE_METRICS = 'scrape_metrics'
+
+# Element properties whose reading is a WebDriver command.
+_ELEMENT_COMMAND_PROPERTIES = frozenset(['text'])
+
+
+class PhaseHooks(object):
+    """Receives instrumentation events of a test. Every method is a no-op.
+
+    Subclasses override the events they are interested in. Events are
+    delivered on the thread running the test.
+    """
+
+    def phase_started(self, phase, monotonic_ns):
+        """Called when a phase starts.
+
+        Args:
+            phase: Name of the phase, e.g. PHASE_LOAD_URL.
+            monotonic_ns: Monotonic clock reading at the start of the phase.
+        """
+        pass
+
+    def phase_ended(self, phase, monotonic_ns):
+        """Called when a phase ends, whether or not it succeeded.
+
+        Args:
+            phase: Name of the phase.
+            monotonic_ns: Monotonic clock reading at the end of the phase.
+        """
+        pass
+
+    def command_completed(self, command, duration_ns):
+        """Called when a WebDriver command completes or raises an exception.
+
+        Args:
+            command: Name of the WebDriver method or element property (e.g.
+                'find_element_by_id' or 'text').
+            duration_ns: Nanoseconds the command took.
+        """
+        pass
+
+
+class SpanCollector(PhaseHooks):
+    """Records a PhaseSpan for each phase of a single test.
+
+    Commands issued outside any phase are not recorded.
+
+    Attributes:
+        spans: A list of the recorded PhaseSpans, in the order the phases
+            started.
+    """
+
+    def __init__(self):
+        self.spans = []
+        self._first_start_ns = None
+        self._start_ns = None
+
+    def phase_started(self, phase, monotonic_ns):
+        if self._first_start_ns is None:
+            self._first_start_ns = monotonic_ns
+        self._start_ns = monotonic_ns
+        self.spans.append(results.PhaseSpan(phase, monotonic_ns -
+                                            self._first_start_ns))
+
+    def phase_ended(self, phase, monotonic_ns):
+        if self._start_ns is None:
+            return
+        self.spans[-1].duration_ns = monotonic_ns - self._start_ns
+        self._start_ns = None
+
+    def command_completed(self, command, duration_ns):
+        if self._start_ns is None:
+            return
+        span = self.spans[-1]
+        span.command_counts[command] = span.command_counts.get(command, 0) + 1
+        span.command_durations_ns[command] = (
+            span.command_durations_ns.get(command, 0) + duration_ns)
+
+
+class HookDispatcher(PhaseHooks):
+    """Delivers each event to every one of a list of hooks."""
+
+    def __init__(self, hooks):
+        self._hooks = hooks
+
+    def phase_started(self, phase, monotonic_ns):
+        for hook in self._hooks:
+            hook.phase_started(phase, monotonic_ns)
+
+    def phase_ended(self, phase, monotonic_ns):
+        for hook in self._hooks:
+            hook.phase_ended(phase, monotonic_ns)
+
+    def command_completed(self, command, duration_ns):
+        for hook in self._hooks:
+            hook.command_completed(command, duration_ns)
+
+
+class InstrumentedWebDriver(object):
+    """Wraps a Selenium webdriver, timing each command issued through it.
+
+    Methods of the driver, and of the elements it finds, are timed and
+    reported to a hook's command_completed. Elements returned by the driver's
+    find methods are wrapped in the same way. Other attributes (e.g.
+    capabilities) are passed through untimed.
+    """
+
+    def __init__(self, target, hooks, clock=None):
+        """Wraps a webdriver or web element.
+
+        Args:
+            target: The Selenium webdriver or web element to wrap.
+            hooks: The PhaseHooks to report commands to.
+            clock: The clock used to time commands (or None to use the system
+                clock).
+        """
+        self._target = target
+        self._hooks = hooks
+        self._clock = clock or clocks.SystemClock()
+
+    def __getattr__(self, name):
+        if name in _ELEMENT_COMMAND_PROPERTIES:
+            return self._time_command(name, getattr, self._target, name)
+        value = getattr(self._target, name)
+        if not callable(value):
+            return value
+
+        def timed_command(*args, **kwargs):
+            return self._wrap_elements(
+                name, self._time_command(name, value, *args, **kwargs))
+
+        return timed_command
+
+    def _time_command(self, name, function, *args, **kwargs):
+        start_ns = self._clock.monotonic_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self._hooks.command_completed(name,
+                                          self._clock.monotonic_ns() - start_ns)
+
+    def _wrap_elements(self, name, value):
+        """Wraps the elements returned by a find method."""
+        if not name.startswith('find_element'):
+            return value
+        if isinstance(value, list):
+            return [InstrumentedWebDriver(element, self._hooks, self._clock)
+                    for element in value]
+        return InstrumentedWebDriver(value, self._hooks, self._clock)
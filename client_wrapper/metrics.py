@@ -0,0 +1,347 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Prometheus metrics of the tests run by a client wrapper.
+
+HarnessMetrics keeps counters and histograms of the results of the tests run
+in this process. Recording a result only updates them in memory, so it adds
+next to nothing to the test loop. The metrics are exported in the Prometheus
+text format by a background thread, either to a file for node_exporter's
+textfile collector or over HTTP for Prometheus to scrape directly.
+"""
+
+import BaseHTTPServer
+import collections
+import os
+import SocketServer
+import threading
+
+# Types of errors that tests fail with, as used in the error_type label.
+ERROR_LOAD_FAILURE = 'load_failure'
+ERROR_TIMEOUT = 'timeout'
+ERROR_ILLEGAL_METRIC = 'illegal_metric_value'
+ERROR_OTHER = 'other'
+
+ERROR_TYPES = (ERROR_LOAD_FAILURE, ERROR_TIMEOUT, ERROR_ILLEGAL_METRIC,
+               ERROR_OTHER)
+
+# Prefixes of the TestError messages of each error type.
+_ERROR_MESSAGE_PREFIXES = (
+    ('Failed to load test UI', ERROR_LOAD_FAILURE),
+    ('Test did not complete within timeout', ERROR_TIMEOUT),
+    ('illegal value shown for', ERROR_ILLEGAL_METRIC),)
+
+# Upper bounds of the histogram buckets for durations, in seconds.
+DURATION_BUCKETS_SECONDS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0,
+                            30.0, 60.0)
+
+# Upper bounds of the histogram buckets for throughputs, in Mbps.
+THROUGHPUT_BUCKETS_MBPS = (0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0,
+                           500.0, 1000.0)
+
+# Content type of the Prometheus text exposition format.
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# How often the HTTP server's thread checks whether it has been stopped.
+_POLL_INTERVAL_SECONDS = 0.1
+
+_NANOSECONDS_PER_SECOND = 1e9
+
+
+def classify_error(message):
+    """Returns the error type of a TestError message, e.g. ERROR_TIMEOUT."""
+    for prefix, error_type in _ERROR_MESSAGE_PREFIXES:
+        if message.startswith(prefix):
+            return error_type
+    return ERROR_OTHER
+
+
+class Histogram(object):
+    """Counts of observed values in buckets, as a Prometheus histogram.
+
+    Attributes:
+        buckets: The upper bounds of the buckets, in increasing order.
+        bucket_counts: The number of observed values in each bucket (not
+            cumulative).
+        count: The number of observed values.
+        sum: The sum of the observed values.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                return
+
+
+class HarnessMetrics(object):
+    """Counters and histograms of the results of NDT tests.
+
+    The metrics are safe to record and format from different threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tests = 0
+        self._failed_tests = collections.Counter()
+        self._browser_launch_seconds = Histogram(DURATION_BUCKETS_SECONDS)
+        # Histograms of phase durations and throughputs, by label value.
+        self._phase_seconds = {}
+        self._throughputs_mbps = {}
+
+    def record_result(self, result):
+        """Adds a test's result to the metrics.
+
+        A test with errors is counted as failed once for each type of error
+        it has.
+
+        Args:
+            result: NdtResult of the test.
+        """
+        with self._lock:
+            self._tests += 1
+            for error_type in set(classify_error(error.message)
+                                  for error in result.errors):
+                self._failed_tests[error_type] += 1
+            if result.browser_launch_ns is not None:
+                self._browser_launch_seconds.observe(result.browser_launch_ns /
+                                                     _NANOSECONDS_PER_SECOND)
+            for span in result.spans or []:
+                if span.duration_ns is not None:
+                    self._observe(self._phase_seconds, span.phase,
+                                  DURATION_BUCKETS_SECONDS,
+                                  span.duration_ns / _NANOSECONDS_PER_SECOND)
+            for direction, single_result in (('c2s', result.c2s_result),
+                                             ('s2c', result.s2c_result)):
+                if single_result is None:
+                    continue
+                if single_result.duration_ns is not None:
+                    self._observe(self._phase_seconds, direction,
+                                  DURATION_BUCKETS_SECONDS,
+                                  single_result.duration_ns /
+                                  _NANOSECONDS_PER_SECOND)
+                if single_result.throughput is not None:
+                    self._observe(self._throughputs_mbps, direction,
+                                  THROUGHPUT_BUCKETS_MBPS,
+                                  single_result.throughput)
+
+    def format_text(self):
+        """Formats the metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            _append_header(lines, 'ndt_tests_total', 'counter',
+                           'Number of NDT tests run.')
+            lines.append('ndt_tests_total %d' % self._tests)
+            _append_header(lines, 'ndt_tests_failed_total', 'counter',
+                           'Number of NDT tests that failed, by error type.')
+            for error_type in ERROR_TYPES:
+                lines.append('ndt_tests_failed_total{error_type="%s"} %d' %
+                             (error_type, self._failed_tests[error_type]))
+            _append_header(lines, 'ndt_browser_launch_seconds', 'histogram',
+                           'Time taken to launch a browser for a test.')
+            _append_histogram(lines, 'ndt_browser_launch_seconds', '',
+                              self._browser_launch_seconds)
+            _append_header(lines, 'ndt_phase_duration_seconds', 'histogram',
+                           'Duration of each phase of a test.')
+            for phase in sorted(self._phase_seconds):
+                _append_histogram(lines, 'ndt_phase_duration_seconds',
+                                  'phase="%s",' % phase,
+                                  self._phase_seconds[phase])
+            _append_header(lines, 'ndt_throughput_mbps', 'histogram',
+                           'Throughput measured by a test, by direction.')
+            for direction in sorted(self._throughputs_mbps):
+                _append_histogram(lines, 'ndt_throughput_mbps',
+                                  'direction="%s",' % direction,
+                                  self._throughputs_mbps[direction])
+        return '\n'.join(lines) + '\n'
+
+    def _observe(self, histograms, label_value, buckets, value):
+        histogram = histograms.get(label_value)
+        if histogram is None:
+            histogram = Histogram(buckets)
+            histograms[label_value] = histogram
+        histogram.observe(value)
+
+
+class MetricsSink(object):
+    """Result sink that records each result in HarnessMetrics.
+
+    The sink owns the exporters of the metrics: it starts them when created
+    and stops them when closed.
+    """
+
+    def __init__(self, harness_metrics, exporters):
+        """Creates a sink and starts its exporters.
+
+        Args:
+            harness_metrics: HarnessMetrics to record results in.
+            exporters: A list of exporters (e.g. TextfileExporter) of
+                harness_metrics.
+        """
+        self._metrics = harness_metrics
+        self._exporters = exporters
+        for exporter in self._exporters:
+            exporter.start()
+
+    def write(self, result):
+        self._metrics.record_result(result)
+
+    def close(self):
+        for exporter in self._exporters:
+            exporter.stop()
+
+
+class TextfileExporter(object):
+    """Periodically writes metrics to a file, on a background thread.
+
+    The file is replaced atomically, so a reader such as node_exporter's
+    textfile collector never sees a partially written file.
+    """
+
+    def __init__(self, harness_metrics, path, interval=15):
+        """Creates an exporter. Nothing is written until it is started.
+
+        Args:
+            harness_metrics: HarnessMetrics to export.
+            path: Path of the file to write. The file name must end in .prom
+                for node_exporter to read it.
+            interval: Number of seconds between writes.
+        """
+        self._metrics = harness_metrics
+        self._path = path
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._write_periodically)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread and writes the final metrics."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self.write()
+
+    def write(self):
+        """Writes the current metrics to the file."""
+        temp_path = self._path + '.tmp'
+        with open(temp_path, 'w') as metrics_file:
+            metrics_file.write(self._metrics.format_text())
+        os.rename(temp_path, self._path)
+
+    def _write_periodically(self):
+        while not self._stopped.is_set():
+            self.write()
+            self._stopped.wait(self._interval)
+
+
+class HttpExporter(object):
+    """Serves metrics over HTTP at /metrics, on a background thread."""
+
+    def __init__(self, harness_metrics, host='', port=0):
+        """Creates an exporter. The server does not listen until started.
+
+        Args:
+            harness_metrics: HarnessMetrics to export.
+            host: Host address to listen on ('' for all addresses).
+            port: Port to listen on, or 0 to choose any free port.
+        """
+        self._metrics = harness_metrics
+        self._address = (host, port)
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self):
+        """The port the exporter listens on, once started."""
+        return self._server.server_address[1]
+
+    def start(self):
+        self._server = _ThreadingHttpServer(self._address, _MetricsHandler)
+        self._server.harness_metrics = self._metrics
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={'poll_interval': _POLL_INTERVAL_SECONDS})
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops serving requests and closes the listening socket."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+
+
+class _ThreadingHttpServer(SocketServer.ThreadingMixIn,
+                           BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class _MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.harness_metrics.format_text()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        # Scrapes are not logged, so they do not clutter the test output.
+        pass
+
+
+def _append_header(lines, name, metric_type, help_text):
+    lines.append('# HELP %s %s' % (name, help_text))
+    lines.append('# TYPE %s %s' % (name, metric_type))
+
+
+def _append_histogram(lines, name, labels, histogram):
+    """Appends the samples of a histogram.
+
+    Args:
+        lines: List of lines to append to.
+        name: Name of the histogram metric.
+        labels: Labels of the histogram, each followed by a comma (e.g.
+            'phase="c2s",'), or '' for none.
+        histogram: The Histogram to append.
+    """
+    cumulative_count = 0
+    for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+        cumulative_count += count
+        lines.append('%s_bucket{%sle="%r"} %d' %
+                     (name, labels, bound, cumulative_count))
+    lines.append('%s_bucket{%sle="+Inf"} %d' % (name, labels, histogram.count))
+    other_labels = '{%s}' % labels.rstrip(',') if labels else ''
+    lines.append('%s_sum%s %r' % (name, other_labels, histogram.sum))
+    lines.append('%s_count%s %d' % (name, other_labels, histogram.count))
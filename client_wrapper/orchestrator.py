@@ -0,0 +1,313 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Runs many NDT test sessions concurrently from a single process.
+
+An Orchestrator runs tests against any number of NDT servers (targets) on a
+bounded pool of worker threads. WebDriver calls block on network I/O to the
+browsers, so threads let one controller process drive many browsers at once.
+Each worker keeps one driver per target, so a driver's browser session can be
+reused across that worker's tests against the same target.
+
+Completed results are passed to a callback on the thread that called run(), in
+the order they complete. Results wait for the callback in a bounded queue: when
+the callback (e.g. a result sink) falls behind, workers block until it catches
+up rather than buffering results without limit.
+"""
+
+import Queue
+import threading
+
+import clocks
+import html5_driver
+
+# How often, in seconds, waiting threads check whether the run has stopped.
+_POLL_INTERVAL_SECONDS = 0.1
+
+_NANOSECONDS_PER_SECOND = 1e9
+
+
+class Completion(object):
+    """Outcome of a single test run by an Orchestrator.
+
+    Attributes:
+        index: Position of the test's target in the list passed to run().
+        url: URL of the NDT server the test ran against.
+        result: The NdtResult of the test, or None if the test raised an
+            exception.
+        error: The exception the test raised, or None if it completed.
+    """
+
+    __slots__ = ('index', 'url', 'result', 'error')
+
+    def __init__(self, index, url, result=None, error=None):
+        self.index = index
+        self.url = url
+        self.result = result
+        self.error = error
+
+
+class RunSummary(object):
+    """Counts of the tests in an Orchestrator run.
+
+    Attributes:
+        completed: Number of tests whose results were passed to the callback.
+        failed: Number of completions passed to the callback whose test
+            raised an exception (included in completed).
+        cancelled: Number of tests that never started because the run
+            stopped early.
+        abandoned: Number of tests that had started when the run stopped but
+            whose results were never passed to the callback.
+        timed_out: True if the run was stopped by its timeout.
+    """
+
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.abandoned = 0
+        self.timed_out = False
+
+
+class Orchestrator(object):
+    """Runs NDT tests concurrently on a bounded pool of worker threads."""
+
+    def __init__(self,
+                 driver_factory,
+                 max_workers,
+                 max_concurrent_per_target=None,
+                 max_pending_results=None,
+                 timeout=None,
+                 close_timeout=30,
+                 clock=None):
+        """Creates an orchestrator.
+
+        Args:
+            driver_factory: A function that takes the URL of an NDT server and
+                returns a new NDT client driver (an object with perform_test
+                and close methods) that tests against it.
+            max_workers: The maximum number of tests that run at once.
+            max_concurrent_per_target: The maximum number of tests that may
+                run at once against any one URL (or None for no limit beyond
+                max_workers).
+            max_pending_results: The maximum number of completed results that
+                may wait for the callback before workers block (or None to
+                allow one per worker).
+            timeout: The number of seconds after which a run is stopped (or
+                None to run until every test completes).
+            close_timeout: The number of seconds that run() waits, once the
+                run has ended, for worker threads to finish any abandoned
+                tests and close their drivers.
+            clock: The clock used to enforce the timeouts (or None to use the
+                system clock).
+        """
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        if (max_concurrent_per_target is not None and
+                max_concurrent_per_target < 1):
+            raise ValueError('max_concurrent_per_target must be at least 1')
+        self._driver_factory = driver_factory
+        self._max_workers = max_workers
+        self._max_concurrent_per_target = max_concurrent_per_target
+        self._max_pending_results = max_pending_results or max_workers
+        self._timeout = timeout
+        self._close_timeout = close_timeout
+        self._clock = clock or clocks.SystemClock()
+
+    def run(self, urls, callback):
+        """Runs one test against each URL, passing each outcome to callback.
+
+        When the timeout expires, tests that have not started are cancelled,
+        and tests that have started are abandoned: WebDriver calls cannot be
+        interrupted, so worker threads finish their current tests, close their
+        drivers and exit, but the results are discarded. If the callback raises an exception, the run
+        stops in the same way and the exception is re-raised.
+
+        A test that raises FailureBudgetExhaustedError also stops the run in
+        the same way, because its NDT server is unreachable, and the error is
+        re-raised.
+
+        Before returning, run() waits up to close_timeout seconds for the
+        worker threads to close their drivers, so that browsers are not left
+        running if the process exits.
+
+        Args:
+            urls: A list of URLs of NDT servers, one per test. A URL may be
+                repeated to run several tests against it.
+            callback: A function called with the Completion of each test, on
+                the calling thread, in the order the tests complete.
+
+        Returns:
+            A RunSummary of the run.
+        """
+        run = _Run(self._driver_factory, urls, self._max_workers,
+                   self._max_concurrent_per_target, self._max_pending_results)
+        summary = RunSummary()
+        deadline_ns = None
+        if self._timeout is not None:
+            deadline_ns = (self._clock.monotonic_ns() + int(
+                self._timeout * _NANOSECONDS_PER_SECOND))
+        run.start()
+        try:
+            while summary.completed < len(urls):
+                if run.error is not None:
+                    break
+                if (deadline_ns is not None and
+                        self._clock.monotonic_ns() >= deadline_ns):
+                    summary.timed_out = True
+                    break
+                completion = run.next_completion()
+                if completion is None:
+                    if run.finished():
+                        break
+                    continue
+                summary.completed += 1
+                if completion.error is not None:
+                    summary.failed += 1
+                callback(completion)
+            if run.error is not None:
+                raise run.error
+        finally:
+            run.stop()
+            run.join(self._clock, self._close_timeout)
+        summary.cancelled = len(urls) - run.started
+        summary.abandoned = run.started - summary.completed
+        return summary
+
+
+class _Run(object):
+    """State shared by the worker threads of one Orchestrator run.
+
+    Attributes:
+        started: Number of tests that have started.
+        error: The error that stopped the run, or None.
+    """
+
+    def __init__(self, driver_factory, urls, max_workers,
+                 max_concurrent_per_target, max_pending_results):
+        self._driver_factory = driver_factory
+        self._jobs = iter(enumerate(urls))
+        self._jobs_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._completions = Queue.Queue(max_pending_results)
+        self._semaphores = {}
+        if max_concurrent_per_target:
+            self._semaphores = {
+                url: threading.BoundedSemaphore(max_concurrent_per_target)
+                for url in set(urls)
+            }
+        self._max_workers = max_workers
+        self._threads = []
+        self.started = 0
+        self.error = None
+
+    def start(self):
+        for _ in xrange(self._max_workers):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stops the run. No test starts once this returns."""
+        with self._jobs_lock:
+            self._stopped.set()
+
+    def join(self, clock, timeout):
+        """Waits up to timeout seconds, in total, for every worker to exit."""
+        deadline_ns = clock.monotonic_ns() + int(timeout *
+                                                 _NANOSECONDS_PER_SECOND)
+        for thread in self._threads:
+            remaining_ns = deadline_ns - clock.monotonic_ns()
+            thread.join(max(0, remaining_ns / _NANOSECONDS_PER_SECOND))
+
+    def finished(self):
+        """Returns whether every worker has exited and every result is read."""
+        return (not any(thread.is_alive() for thread in self._threads) and
+                self._completions.empty())
+
+    def next_completion(self):
+        """Waits briefly for the next completion, returning None if none."""
+        try:
+            return self._completions.get(timeout=_POLL_INTERVAL_SECONDS)
+        except Queue.Empty:
+            return None
+
+    def _next_job(self):
+        with self._jobs_lock:
+            if self._stopped.is_set():
+                return None
+            return next(self._jobs, None)
+
+    def _work(self):
+        """Runs tests until there are none left, then closes its drivers."""
+        drivers = {}
+        try:
+            while True:
+                job = self._next_job()
+                if job is None:
+                    return
+                index, url = job
+                semaphore = self._semaphores.get(url)
+                if semaphore is not None:
+                    semaphore.acquire()
+                try:
+                    with self._jobs_lock:
+                        if self._stopped.is_set():
+                            return
+                        self.started += 1
+                    completion = self._perform_test(drivers, index, url)
+                finally:
+                    if semaphore is not None:
+                        semaphore.release()
+                if completion is None:
+                    return
+                self._put_completion(completion)
+        finally:
+            for driver in drivers.itervalues():
+                driver.close()
+
+    def _perform_test(self, drivers, index, url):
+        try:
+            driver = drivers.get(url)
+            if driver is None:
+                driver = self._driver_factory(url)
+                drivers[url] = driver
+            return Completion(index, url, result=driver.perform_test())
+        except html5_driver.FailureBudgetExhaustedError as e:
+            # A new driver would reset the count of failures, so the run
+            # stops instead.
+            with self._jobs_lock:
+                if self.error is None:
+                    self.error = e
+                self._stopped.set()
+            return None
+        except Exception as e:  # pylint: disable=broad-except
+            # The driver may be unusable, so the next test gets a new one.
+            driver = drivers.pop(url, None)
+            if driver is not None:
+                driver.close()
+            return Completion(index, url, error=e)
+
+    def _put_completion(self, completion):
+        """Queues a completion, blocking while the queue is full.
+
+        The completion is dropped if the run stops while waiting.
+        """
+        while not self._stopped.is_set():
+            try:
+                self._completions.put(completion,
+                                      timeout=_POLL_INTERVAL_SECONDS)
+                return
+            except Queue.Full:
+                pass
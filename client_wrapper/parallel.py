@@ -0,0 +1,135 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Runs NDT test iterations in parallel across a pool of worker processes.
+
+Each worker process owns its own NDT client driver, created once when the
+worker starts. Results are yielded in iteration order, regardless of the order
+in which the workers complete them.
+"""
+
+import multiprocessing
+from multiprocessing import util
+import threading
+
+# Per-process state of a pool worker, populated by _init_worker.
+_worker_driver = None
+_worker_semaphore = None
+_worker_stopped = None
+
+
+def create_url_semaphores(urls, max_concurrent_per_url):
+    """Creates semaphores limiting concurrent tests against each URL.
+
+    The semaphores must be created before the worker pool so that they are
+    shared by all worker processes.
+
+    Args:
+        urls: A list of URLs of NDT servers that workers will test against.
+        max_concurrent_per_url: The maximum number of tests that may run
+            concurrently against any one URL.
+
+    Returns:
+        A dictionary mapping each URL to a process-shared semaphore.
+    """
+    return {url: multiprocessing.BoundedSemaphore(max_concurrent_per_url)
+            for url in set(urls)}
+
+
+def run_iterations(driver_factory,
+                   url,
+                   iterations,
+                   workers,
+                   url_semaphores=None,
+                   close_timeout=60):
+    """Runs NDT test iterations across a pool of worker processes.
+
+    If the run is aborted (e.g. a test raises an exception, or the caller
+    stops iterating), workers skip the tests that have not started, and the
+    pool waits for them to finish their current tests and close their drivers.
+    Workers still running after close_timeout seconds are killed.
+
+    Args:
+        driver_factory: A picklable callable that takes no arguments and
+            returns an NDT client driver (an object with perform_test and
+            close methods). Each worker process calls it once.
+        url: The URL of the NDT server that the drivers test against.
+        iterations: The total number of tests to run.
+        workers: The number of worker processes to run tests in.
+        url_semaphores: An optional dictionary, as returned by
+            create_url_semaphores, limiting concurrent tests per URL.
+        close_timeout: The number of seconds to wait for workers to close
+            their drivers after the run is aborted.
+
+    Yields:
+        The NdtResult of each iteration, in iteration order.
+    """
+    semaphore = url_semaphores.get(url) if url_semaphores else None
+    stopped = multiprocessing.Event()
+    pool = multiprocessing.Pool(workers,
+                                initializer=_init_worker,
+                                initargs=(driver_factory, semaphore, stopped))
+    completed = False
+    try:
+        for result in pool.imap(_run_iteration, xrange(iterations)):
+            yield result
+        completed = True
+    finally:
+        if completed:
+            pool.close()
+            pool.join()
+        else:
+            stopped.set()
+            _close_pool(pool, close_timeout)
+
+
+def _close_pool(pool, timeout):
+    """Shuts down a pool, letting its workers close their drivers.
+
+    Workers close their drivers as they exit (see _init_worker), which they
+    do only if the pool is closed rather than terminated. So the pool is
+    terminated only if its workers do not exit within timeout seconds.
+    """
+    pool.close()
+    joiner = threading.Thread(target=pool.join)
+    joiner.daemon = True
+    joiner.start()
+    joiner.join(timeout)
+    if joiner.is_alive():
+        pool.terminate()
+        joiner.join()
+
+
+def _init_worker(driver_factory, semaphore, stopped=None):
+    """Creates the driver that a worker process uses for all its tests."""
+    global _worker_driver, _worker_semaphore, _worker_stopped
+    _worker_driver = driver_factory()
+    _worker_semaphore = semaphore
+    _worker_stopped = stopped
+    # Close the driver (e.g. its persistent browser session) when the pool
+    # shuts the worker down.
+    util.Finalize(_worker_driver, _worker_driver.close, exitpriority=10)
+
+
+def _run_iteration(_):
+    """Runs a single test iteration in a worker process.
+
+    Returns:
+        The NdtResult of the test, or None if the run has been aborted.
+    """
+    if _worker_stopped is not None and _worker_stopped.is_set():
+        return None
+    if _worker_semaphore is None:
+        return _worker_driver.perform_test()
+    with _worker_semaphore:
+        return _worker_driver.perform_test()
@@ -0,0 +1,200 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Profiles each iteration of a client wrapper run.
+
+Each iteration runs under its own cProfile profiler, whose stats are saved to a
+separate file and merged into a profile of the whole run. The files can be
+read with the pstats module or a viewer such as snakeviz.
+
+cProfile measures where the harness spends CPU time, but most of a test's
+wall-clock time is spent waiting on WebDriver calls to the browser. To show
+which calls the waiting is in, a sampler thread can also record the stack of
+the thread running the test at regular intervals. Sampled stacks are saved in
+the folded format read by flame graph tools, one stack per line followed by
+its number of samples.
+"""
+
+import collections
+import cProfile
+import os
+import pstats
+import StringIO
+import sys
+import threading
+
+# Names of the files that IterationProfiler writes.
+ITERATION_STATS_FILENAME_FORMAT = 'iteration-%04d.prof'
+AGGREGATE_STATS_FILENAME = 'aggregate.prof'
+STACK_SAMPLES_FILENAME = 'wall_clock_stacks.txt'
+
+
+class IterationProfiler(object):
+    """Profiles iterations, saving their stats to an output directory.
+
+    Attributes:
+        iterations: The number of iterations profiled.
+    """
+
+    def __init__(self, output_dir, sample_interval=None):
+        """Creates a profiler.
+
+        Args:
+            output_dir: Directory to write stats files to. It is created if it
+                does not exist.
+            sample_interval: Number of seconds between samples of the
+                wall-clock stack of each iteration (or None to not sample
+                stacks).
+        """
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+        self._output_dir = output_dir
+        self._sample_interval = sample_interval
+        self._aggregate_stats = None
+        self._stack_samples = collections.Counter()
+        self.iterations = 0
+
+    def profile(self, function, *args, **kwargs):
+        """Calls a function as a profiled iteration.
+
+        Returns:
+            The function's return value.
+        """
+        profiler = cProfile.Profile()
+        sampler = None
+        if self._sample_interval:
+            sampler = _StackSampler(threading.current_thread().ident,
+                                    self._sample_interval)
+            sampler.start()
+        try:
+            return profiler.runcall(function, *args, **kwargs)
+        finally:
+            if sampler:
+                sampler.stop()
+                self._stack_samples.update(sampler.samples)
+            self.iterations += 1
+            path = os.path.join(self._output_dir,
+                                ITERATION_STATS_FILENAME_FORMAT %
+                                self.iterations)
+            profiler.dump_stats(path)
+            if self._aggregate_stats is None:
+                self._aggregate_stats = pstats.Stats(path)
+            else:
+                self._aggregate_stats.add(path)
+
+    def finish(self):
+        """Writes the profile of the whole run and any sampled stacks."""
+        if self._aggregate_stats is not None:
+            self._aggregate_stats.dump_stats(os.path.join(
+                self._output_dir, AGGREGATE_STATS_FILENAME))
+        if self._stack_samples:
+            with open(
+                    os.path.join(self._output_dir, STACK_SAMPLES_FILENAME),
+                    'w') as samples_file:
+                for stack, count in sorted(self._stack_samples.iteritems()):
+                    samples_file.write('%s %d\n' % (stack, count))
+
+    def format_report(self, top_n=20):
+        """Formats a report of the functions that took the most time.
+
+        Args:
+            top_n: The number of functions to list in each section.
+
+        Returns:
+            The report, as a string.
+        """
+        if self._aggregate_stats is None:
+            return 'no iterations profiled\n'
+        report = StringIO.StringIO()
+        report.write('top %d functions by cumulative time over %d '
+                     'iterations:\n' % (top_n, self.iterations))
+        self._aggregate_stats.stream = report
+        self._aggregate_stats.sort_stats('cumulative').print_stats(top_n)
+        if self._stack_samples:
+            leaf_samples = collections.Counter()
+            for stack, count in self._stack_samples.iteritems():
+                leaf_samples[stack.rsplit(';', 1)[-1]] += count
+            total = sum(leaf_samples.itervalues())
+            report.write('top %d functions by wall-clock samples (%d total):\n'
+                         % (top_n, total))
+            for function, count in leaf_samples.most_common(top_n):
+                report.write('%6.1f%%  %s\n' % (100.0 * count / total,
+                                                function))
+        return report.getvalue()
+
+
+class ProfiledDriver(object):
+    """Wraps an NDT client driver, profiling each call to perform_test.
+
+    Other attributes of the driver (e.g. close) are passed through.
+    """
+
+    def __init__(self, driver, profiler):
+        """Wraps a driver.
+
+        Args:
+            driver: The NDT client driver to wrap.
+            profiler: The IterationProfiler to profile tests with.
+        """
+        self._driver = driver
+        self._profiler = profiler
+
+    def perform_test(self):
+        return self._profiler.profile(self._driver.perform_test)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+class _StackSampler(object):
+    """Samples the stack of a thread at regular intervals, on a thread.
+
+    Attributes:
+        samples: A Counter of how many times each stack was sampled. Each
+            stack is a string of the frames from outermost to innermost,
+            separated by semicolons, where each frame is formatted as
+            function (file:line).
+    """
+
+    def __init__(self, thread_id, interval):
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample_until_stopped)
+        self._thread.daemon = True
+        self.samples = collections.Counter()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _sample_until_stopped(self):
+        while not self._stopped.wait(self._interval):
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            frame = frames.get(self._thread_id)
+            if frame is not None:
+                self.samples[_format_stack(frame)] += 1
+
+
+def _format_stack(frame):
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append('%s (%s:%d)' %
+                      (code.co_name, os.path.basename(code.co_filename),
+                       frame.f_lineno))
+        frame = frame.f_back
+    return ';'.join(reversed(frames))
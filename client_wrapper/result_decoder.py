@@ -0,0 +1,223 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import json
+
+import pytz
+
+import results
+
+
+class Error(Exception):
+    pass
+
+
+class DecodeError(Error):
+    """Indicates that an encoded NDT result is malformed."""
+    pass
+
+
+class NdtResultDecoder(json.JSONDecoder):
+    """Decodes JSON produced by NdtResultEncoder into an NdtResult instance.
+
+    The decoder reverses the encoder's flattening of the c2s and s2c results,
+    so the decoded NdtResult has NdtSingleTestResult and TestError children.
+    Fields absent from the JSON (e.g. in results encoded by older versions of
+    the encoder) are decoded as None.
+    """
+
+    def decode(self, s):
+        """Decodes a JSON string into an NdtResult.
+
+        Args:
+            s: A string containing a single JSON-encoded NdtResult.
+
+        Returns:
+            The decoded NdtResult instance.
+
+        Raises:
+            DecodeError: If the encoded result is malformed.
+        """
+        try:
+            result_dict = json.JSONDecoder.decode(self, s)
+        except ValueError as e:
+            raise DecodeError('Invalid JSON for NDT result: %s' % e)
+        return decode_result_dict(result_dict)
+
+
+def decode_jsonl(lines):
+    """Decodes NdtResults from JSONL, one result per line.
+
+    Results are decoded lazily, so arbitrarily large files can be processed
+    in constant memory. Blank lines are skipped.
+
+    Args:
+        lines: An iterable of lines, such as a file object opened on a JSONL
+            file written by JsonlResultSink.
+
+    Yields:
+        The NdtResult decoded from each line.
+
+    Raises:
+        DecodeError: If any line is not a valid encoded result.
+    """
+    decoder = NdtResultDecoder()
+    for line in lines:
+        if line.strip():
+            yield decoder.decode(line)
+
+
+def decode_result_dict(result_dict):
+    """Converts an NdtResult's JSON object representation into an NdtResult.
+
+    Args:
+        result_dict: A dictionary produced by parsing an NdtResultEncoder
+            output string as JSON.
+
+    Returns:
+        The decoded NdtResult instance.
+
+    Raises:
+        DecodeError: If the dictionary is not a valid encoded result.
+    """
+    if not isinstance(result_dict, dict):
+        raise DecodeError('Encoded NDT result must be a JSON object')
+    get = result_dict.get
+    result = results.NdtResult(
+        start_time=_decode_time(get('start_time')),
+        end_time=_decode_time(get('end_time')),
+        errors=[_decode_error(error) for error in get('errors') or []],
+        c2s_result=_decode_single_test_result(result_dict, 'c2s_'),
+        s2c_result=_decode_single_test_result(result_dict, 's2c_'),
+        latency=get('latency'),
+        duration_ns=_decode_duration(get('duration_ms')))
+    result.client = get('client')
+    result.client_version = get('client_version')
+    result.os = get('os')
+    result.os_version = get('os_version')
+    result.browser = get('browser')
+    result.browser_version = get('browser_version')
+    result.browser_launch_ns = _decode_duration(get('browser_launch_ms'))
+    result.load_retries = get('load_retries')
+    result.load_backoff_ns = _decode_duration(get('load_backoff_ms'))
+    result.phase_timeouts_ns = _decode_phase_timeouts(get('phase_timeouts_ms'))
+    result.timed_out_phase = get('timed_out_phase')
+    spans = get('spans')
+    if spans is not None:
+        result.spans = [_decode_span(span) for span in spans]
+    return result
+
+
+def _decode_single_test_result(result_dict, prefix):
+    """Extracts a flattened NdtSingleTestResult from an encoded NdtResult.
+
+    Args:
+        result_dict: The dictionary representation of an encoded NdtResult.
+        prefix: The prefix of the single test result's fields, e.g. 'c2s_'.
+
+    Returns:
+        The decoded NdtSingleTestResult, or None if all of its fields are null.
+    """
+    start_time = result_dict.get(prefix + 'start_time')
+    end_time = result_dict.get(prefix + 'end_time')
+    duration_ms = result_dict.get(prefix + 'duration_ms')
+    throughput = result_dict.get(prefix + 'throughput')
+    if (start_time is None and end_time is None and duration_ms is None and
+            throughput is None):
+        return None
+    return results.NdtSingleTestResult(
+        throughput=throughput,
+        start_time=_decode_time(start_time),
+        end_time=_decode_time(end_time),
+        duration_ns=_decode_duration(duration_ms))
+
+
+def _decode_error(error_dict):
+    try:
+        return results.TestError(
+            _decode_time(error_dict['timestamp']), error_dict['message'])
+    except (KeyError, TypeError):
+        raise DecodeError('Invalid encoded test error: %r' % (error_dict,))
+
+
+def _decode_phase_timeouts(phase_timeouts_ms):
+    if phase_timeouts_ms is None:
+        return None
+    try:
+        return {
+            phase: _decode_duration(timeout_ms)
+            for phase, timeout_ms in phase_timeouts_ms.iteritems()
+        }
+    except (AttributeError, TypeError):
+        raise DecodeError('Invalid encoded phase timeouts: %r' %
+                          (phase_timeouts_ms,))
+
+
+def _decode_span(span_dict):
+    try:
+        commands = span_dict['commands']
+        return results.PhaseSpan(
+            span_dict['phase'],
+            _decode_duration(span_dict['start_offset_ms']),
+            duration_ns=_decode_duration(span_dict['duration_ms']),
+            command_counts={
+                command: stats['count']
+                for command, stats in commands.iteritems()
+            },
+            command_durations_ns={
+                command: _decode_duration(stats['duration_ms'])
+                for command, stats in commands.iteritems()
+            })
+    except (AttributeError, KeyError, TypeError):
+        raise DecodeError('Invalid encoded phase span: %r' % (span_dict,))
+
+
+def _decode_duration(duration_ms):
+    if duration_ms is None:
+        return None
+    return int(round(duration_ms * 1e6))
+
+
+def _decode_time(timestamp):
+    """Parses a timestamp in the encoder's %Y-%m-%dT%H:%M:%S.%fZ format.
+
+    The format has fixed field widths, so the fields are sliced out directly,
+    which is much faster than datetime.strptime.
+
+    Args:
+        timestamp: A timestamp string (e.g. "2016-02-26T15:51:23.452234Z") or
+            None.
+
+    Returns:
+        A UTC datetime, or None if timestamp is None.
+
+    Raises:
+        DecodeError: If the timestamp is not in the expected format.
+    """
+    if timestamp is None:
+        return None
+    if (not isinstance(timestamp, basestring) or len(timestamp) != 27 or
+            timestamp[4] != '-' or timestamp[7] != '-' or
+            timestamp[10] != 'T' or timestamp[13] != ':' or
+            timestamp[16] != ':' or timestamp[19] != '.' or
+            timestamp[26] != 'Z'):
+        raise DecodeError('Unrecognized timestamp format: %s' % timestamp)
+    try:
+        return datetime.datetime(
+            int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+            int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19]),
+            int(timestamp[20:26]), pytz.utc)
+    except ValueError:
+        raise DecodeError('Unrecognized timestamp format: %s' % timestamp)
@@ -0,0 +1,81 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import result_encoder
+
+# Size of the in-memory write buffer for the output file. Results are small
+# (well under 1 KB encoded), so this holds many results between flushes.
+_BUFFER_SIZE = 64 * 1024
+
+
+class JsonlResultSink(object):
+    """Appends NdtResults to a file as they complete, one JSON line each.
+
+    Each result is encoded as soon as it is written and no results are kept in
+    memory, so memory use does not grow with the number of results. Writes are
+    buffered; the buffer is flushed to the OS every flush_interval results and
+    synced to disk every fsync_interval results, bounding how many results a
+    crash can lose.
+    """
+
+    def __init__(self, path, flush_interval=1, fsync_interval=None):
+        """Opens a JSONL sink that appends to the given path.
+
+        Args:
+            path: Path of the output file. Results are appended if it already
+                exists.
+            flush_interval: Number of results to buffer before flushing them
+                to the OS (or None to flush only when the sink is closed).
+            fsync_interval: Number of results to write between syncs to disk
+                (or None to sync only when the sink is closed).
+        """
+        self._file = open(path, 'ab', _BUFFER_SIZE)
+        self._encoder = result_encoder.NdtResultEncoder()
+        self._flush_interval = flush_interval
+        self._fsync_interval = fsync_interval
+        self._results_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, result):
+        """Encodes a result and appends it to the output file.
+
+        Args:
+            result: NdtResult instance to write.
+        """
+        self._file.write(self._encoder.encode(result) + '\n')
+        self._results_written += 1
+        if (self._fsync_interval and
+                self._results_written % self._fsync_interval == 0):
+            self._sync()
+        elif (self._flush_interval and
+              self._results_written % self._flush_interval == 0):
+            self._file.flush()
+
+    def close(self):
+        """Flushes and syncs any buffered results and closes the file."""
+        if self._file.closed:
+            return
+        self._sync()
+        self._file.close()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
@@ -0,0 +1,242 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import errno
+import os
+import tempfile
+
+import filename
+import result_encoder
+
+# Output layouts for ResultFileStore.
+LAYOUT_FLAT = 'flat'
+LAYOUT_SHARDED = 'sharded'
+
+# Name of the index file in each directory of result files.
+INDEX_FILENAME = 'index.txt'
+
+# Permissions of result and index files, before the umask is applied.
+_FILE_MODE = 0644
+
+
+def _read_umask():
+    # The umask can only be read by setting it, so it is read once, before
+    # any threads write results.
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _read_umask()
+
+
+class ResultFileStore(object):
+    """Writes each NdtResult to its own JSON file under a root directory.
+
+    In the flat layout, result files are written directly to the root
+    directory. In the sharded layout, each is written to an os/browser/YYYY/
+    MM/DD/ subdirectory (e.g. win10/chrome49/2016/02/26/), which keeps
+    directories small enough to list and back up quickly.
+
+    Result files are written atomically, and are never overwritten: when two
+    results (e.g. from parallel workers) have the same filename, which happens
+    when they start in the same second, later results get a numbered suffix
+    (e.g. ...-results-1.json). This holds across processes, so several stores
+    may write to the same root directory at once.
+
+    Each directory of result files has an append-only index listing its result
+    files in the order they were written, so that the results for a platform
+    and date can be found without walking the directory tree. A file is added
+    to the index only once it is completely written.
+    """
+
+    def __init__(self, root_dir, layout=LAYOUT_SHARDED, fsync=True):
+        """Creates a store that writes result files under root_dir.
+
+        Args:
+            root_dir: Directory to write result files under. It is created if
+                it does not exist.
+            layout: LAYOUT_FLAT or LAYOUT_SHARDED.
+            fsync: If True, each result file is synced to disk before it is
+                given its final name.
+        """
+        if layout not in (LAYOUT_FLAT, LAYOUT_SHARDED):
+            raise ValueError('Invalid result file layout: %s' % layout)
+        self._root_dir = root_dir
+        self._layout = layout
+        self._fsync = fsync
+        self._encoder = result_encoder.NdtResultEncoder()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, result):
+        """Writes a result to a new file and adds the file to its index.
+
+        Args:
+            result: NdtResult instance to write.
+
+        Returns:
+            The path of the new result file.
+
+        Raises:
+            FilenameCreationError: If the result's filename cannot be created
+                from its metadata.
+        """
+        result_filename = filename.create_result_filename(result)
+        if self._layout == LAYOUT_SHARDED:
+            result_dir = os.path.join(self._root_dir,
+                                      *filename.create_result_shard(result))
+        else:
+            result_dir = self._root_dir
+        _make_dirs(result_dir)
+
+        temp_path = self._write_temp_file(result_dir, result)
+        try:
+            result_path = _reserve_path(result_dir, result_filename)
+            _replace(temp_path, result_path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+        _append_to_index(result_dir, os.path.basename(result_path))
+        return result_path
+
+    def close(self):
+        """Closes the store. Every result is already on disk once written."""
+        pass
+
+    def lookup(self, os_shortname, browser, date):
+        """Finds the result files for a platform and date from the index.
+
+        Args:
+            os_shortname: OS shortname (e.g. 'win10').
+            browser: Canonical browser name (e.g. 'chrome49').
+            date: Date (in the results' start time zone) of the results to
+                find.
+
+        Returns:
+            A list of paths of the matching result files, in the order they
+            were written.
+        """
+        shard = (os_shortname, browser, '%04d' % date.year, '%02d' % date.month,
+                 '%02d' % date.day)
+        if self._layout == LAYOUT_SHARDED:
+            result_dir = os.path.join(self._root_dir, *shard)
+        else:
+            result_dir = self._root_dir
+        try:
+            with open(os.path.join(result_dir, INDEX_FILENAME)) as index_file:
+                result_filenames = index_file.read().splitlines()
+        except IOError as e:
+            if e.errno == errno.ENOENT:
+                return []
+            raise
+        if self._layout == LAYOUT_FLAT:
+            prefix = '%s-%s-' % (os_shortname, browser)
+            date_string = '-%s-%s-%sT' % shard[2:]
+            result_filenames = [
+                name
+                for name in result_filenames
+                if name.startswith(prefix) and date_string in name
+            ]
+        return [os.path.join(result_dir, name) for name in result_filenames]
+
+    def _write_temp_file(self, result_dir, result):
+        """Writes an encoded result to a new hidden temporary file.
+
+        Returns:
+            The path of the temporary file.
+        """
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp',
+                                         prefix='.',
+                                         dir=result_dir)
+        try:
+            # mkstemp creates files readable only by their owner, and the
+            # temporary file becomes the result file.
+            os.chmod(temp_path, _FILE_MODE & ~_UMASK)
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(self._encoder.encode(result))
+                if self._fsync:
+                    temp_file.flush()
+                    os.fsync(temp_file.fileno())
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return temp_path
+
+
+def _make_dirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        # Another writer may have created the directory concurrently.
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def _reserve_path(result_dir, result_filename):
+    """Claims an unused path for a result file.
+
+    The path is claimed by exclusively creating an empty file there, so no
+    other writer can claim the same path.
+
+    Args:
+        result_dir: Directory to create the result file in.
+        result_filename: Preferred filename of the result file.
+
+    Returns:
+        The claimed path: result_filename in result_dir if that file did not
+        already exist, otherwise the same name with the lowest numbered suffix
+        not already in use.
+    """
+    base, extension = os.path.splitext(result_filename)
+    suffix = 0
+    while True:
+        if suffix:
+            candidate = '%s-%d%s' % (base, suffix, extension)
+        else:
+            candidate = result_filename
+        path = os.path.join(result_dir, candidate)
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                             _FILE_MODE))
+            return path
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        suffix += 1
+
+
+def _replace(source, destination):
+    """Atomically renames source over the existing destination file."""
+    if os.name == 'nt':
+        # Windows cannot rename over an existing file. The reserved file is
+        # empty, so removing it first loses nothing.
+        os.remove(destination)
+    os.rename(source, destination)
+
+
+def _append_to_index(result_dir, result_filename):
+    # Each entry is added with a single write to a file opened in append mode,
+    # so entries from concurrent writers are never interleaved.
+    fd = os.open(
+        os.path.join(result_dir, INDEX_FILENAME), os.O_WRONLY | os.O_APPEND
+        | os.O_CREAT, _FILE_MODE)
+    try:
+        os.write(fd, result_filename + '\n')
+    finally:
+        os.close(fd)
@@ -0,0 +1,410 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Columnar storage of NDT results for bulk analysis.
+
+A ResultTable stores each field of many NdtResults in a contiguous NumPy array,
+so that analysis can use vectorized operations rather than looping over result
+objects. This module requires NumPy, which the client wrapper itself does not.
+"""
+
+import array
+import datetime
+
+import numpy
+import pytz
+
+import result_decoder
+import results
+
+# Value of a time or duration column when the value is missing. This is the
+# bit pattern of NumPy's NaT, so time columns can be viewed as datetime64[ns].
+MISSING_INT = numpy.iinfo(numpy.int64).min
+
+# Code of a categorical column when the value is None.
+MISSING_CODE = -1
+
+# Columns of float64 values, with NaN for missing values.
+FLOAT_COLUMNS = ('c2s_throughput', 's2c_throughput', 'latency')
+
+# Columns of int64 times (in nanoseconds since the Unix epoch) and durations
+# (in nanoseconds), with MISSING_INT for missing values.
+TIME_COLUMNS = ('start_time', 'end_time', 'c2s_start_time', 'c2s_end_time',
+                's2c_start_time', 's2c_end_time')
+DURATION_COLUMNS = ('duration_ns', 'c2s_duration_ns', 's2c_duration_ns',
+                    'browser_launch_ns', 'load_backoff_ns')
+
+# Columns of int64 counts, with MISSING_INT for missing values.
+COUNT_COLUMNS = ('load_retries',)
+
+# Columns of int32 codes into a per-column list of categories, with
+# MISSING_CODE for None.
+CATEGORICAL_COLUMNS = ('os', 'os_version', 'browser', 'browser_version',
+                       'client', 'client_version', 'timed_out_phase')
+
+# Columns of arbitrary per-row values (e.g. each row's list of PhaseSpans), as
+# NumPy object arrays.
+OBJECT_COLUMNS = ('phase_timeouts_ns', 'spans')
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+_NAIVE_EPOCH = datetime.datetime(1970, 1, 1)
+
+# Number of rows an _Int64Buffer has room for when it is created.
+_INITIAL_BUFFER_CAPACITY = 1024
+
+
+class ResultTable(object):
+    """Column-oriented table of NDT results.
+
+    Numeric columns are available by name as NumPy arrays, e.g.
+    table['c2s_throughput']. Categorical columns (see CATEGORICAL_COLUMNS) are
+    stored as integer codes, available through codes() and categories(), or
+    decoded through values(). Each row's error count is in the int32
+    'error_count' column, and the errors themselves are kept so that rows can
+    be converted back to NdtResults with every field intact.
+    """
+
+    def __init__(self, columns, categories, errors):
+        """Creates a table from already-built columns.
+
+        Most callers should use from_results or from_jsonl instead.
+
+        Args:
+            columns: A dictionary mapping every column name to a NumPy array.
+                All arrays must have the same length.
+            categories: A dictionary mapping each categorical column name to
+                the list of values its codes refer to.
+            errors: A NumPy object array holding each row's list of TestErrors.
+        """
+        self._columns = columns
+        self._categories = categories
+        self._errors = errors
+
+    @classmethod
+    def from_results(cls, ndt_results):
+        """Builds a table from NdtResult instances.
+
+        Args:
+            ndt_results: An iterable of NdtResult instances.
+
+        Returns:
+            A ResultTable with one row per result.
+        """
+        builder = _TableBuilder()
+        for result in ndt_results:
+            builder.append(result)
+        return builder.build()
+
+    @classmethod
+    def from_jsonl(cls, lines):
+        """Builds a table from encoded results, one JSON result per line.
+
+        Results are decoded and added to the table one at a time, so the
+        results are never all held in memory as objects.
+
+        Args:
+            lines: An iterable of lines, such as a file object opened on a
+                JSONL file written by JsonlResultSink.
+
+        Returns:
+            A ResultTable with one row per result.
+        """
+        return cls.from_results(result_decoder.decode_jsonl(lines))
+
+    def __len__(self):
+        return len(self._errors)
+
+    def __getitem__(self, column):
+        return self._columns[column]
+
+    def codes(self, column):
+        """Returns the int32 codes of a categorical column."""
+        return self._columns[column]
+
+    def categories(self, column):
+        """Returns the list of values a categorical column's codes index."""
+        return self._categories[column]
+
+    def values(self, column):
+        """Returns a categorical column's values as a NumPy object array."""
+        lookup = numpy.array(self._categories[column] + [None], dtype=object)
+        # MISSING_CODE (-1) indexes the trailing None.
+        return lookup[self._columns[column]]
+
+    def equals(self, column, value):
+        """Returns a boolean mask of rows whose categorical value matches.
+
+        Args:
+            column: Name of a categorical column (e.g. 'browser').
+            value: The value to match (e.g. 'firefox'), or None.
+
+        Returns:
+            A NumPy boolean array with one element per row.
+        """
+        if value is None:
+            code = MISSING_CODE
+        elif value in self._categories[column]:
+            code = self._categories[column].index(value)
+        else:
+            return numpy.zeros(len(self), dtype=bool)
+        return self._columns[column] == code
+
+    def filter(self, mask):
+        """Returns a new table containing only the selected rows.
+
+        Args:
+            mask: A NumPy boolean array with one element per row, or an array
+                of row indices.
+
+        Returns:
+            A ResultTable of the selected rows, sharing category lists with
+            this table.
+        """
+        columns = {name: column[mask]
+                   for name, column in self._columns.iteritems()}
+        return ResultTable(columns, self._categories, self._errors[mask])
+
+    def group_by(self, *args):
+        """Splits the table into groups of rows with equal categorical values.
+
+        Args:
+            *args: One or more categorical column names (e.g. 'os',
+                'browser').
+
+        Returns:
+            A dictionary mapping each distinct value (or, for multiple
+            columns, each distinct tuple of values) to a ResultTable of the
+            rows with that value.
+        """
+        columns = args
+        # Combine the columns' codes into a single code per row, shifting
+        # codes by one so that MISSING_CODE maps to zero.
+        combined = numpy.zeros(len(self), dtype=numpy.int64)
+        for column in columns:
+            radix = len(self._categories[column]) + 1
+            combined = combined * radix + (self._columns[column] + 1)
+        keys, inverse = numpy.unique(combined, return_inverse=True)
+
+        groups = {}
+        for group_index in xrange(len(keys)):
+            rows = numpy.flatnonzero(inverse == group_index)
+            first_row = rows[0]
+            values = tuple(self._category_value(column, first_row)
+                           for column in columns)
+            key = values[0] if len(columns) == 1 else values
+            groups[key] = self.filter(rows)
+        return groups
+
+    def row(self, index):
+        """Converts a single row back into an NdtResult.
+
+        Times are returned as UTC datetimes.
+
+        Args:
+            index: Index of the row to convert.
+
+        Returns:
+            An NdtResult equivalent to the one the row was built from.
+        """
+        column = lambda name: self._columns[name][index]
+        result = results.NdtResult(
+            start_time=_ns_to_time(column('start_time')),
+            end_time=_ns_to_time(column('end_time')),
+            errors=list(self._errors[index]),
+            c2s_result=self._single_test_result(index, 'c2s_'),
+            s2c_result=self._single_test_result(index, 's2c_'),
+            latency=_to_float(column('latency')),
+            duration_ns=_to_int(column('duration_ns')))
+        result.browser_launch_ns = _to_int(column('browser_launch_ns'))
+        result.load_backoff_ns = _to_int(column('load_backoff_ns'))
+        result.load_retries = _to_int(column('load_retries'))
+        for name in CATEGORICAL_COLUMNS:
+            setattr(result, name, self._category_value(name, index))
+        for name in OBJECT_COLUMNS:
+            setattr(result, name, column(name))
+        return result
+
+    def to_results(self):
+        """Converts every row back into an NdtResult.
+
+        Returns:
+            A list of NdtResult instances, in row order.
+        """
+        return [self.row(index) for index in xrange(len(self))]
+
+    def _category_value(self, column, index):
+        code = self._columns[column][index]
+        if code == MISSING_CODE:
+            return None
+        return self._categories[column][code]
+
+    def _single_test_result(self, index, prefix):
+        start_time = self._columns[prefix + 'start_time'][index]
+        end_time = self._columns[prefix + 'end_time'][index]
+        duration_ns = self._columns[prefix + 'duration_ns'][index]
+        throughput = self._columns[prefix + 'throughput'][index]
+        if (start_time == MISSING_INT and end_time == MISSING_INT and
+                duration_ns == MISSING_INT and numpy.isnan(throughput)):
+            return None
+        return results.NdtSingleTestResult(throughput=_to_float(throughput),
+                                           start_time=_ns_to_time(start_time),
+                                           end_time=_ns_to_time(end_time),
+                                           duration_ns=_to_int(duration_ns))
+
+
+class _TableBuilder(object):
+    """Accumulates NdtResults into compact column buffers."""
+
+    def __init__(self):
+        self._buffers = {}
+        for name in FLOAT_COLUMNS:
+            self._buffers[name] = array.array('d')
+        for name in TIME_COLUMNS + DURATION_COLUMNS + COUNT_COLUMNS:
+            self._buffers[name] = _Int64Buffer()
+        for name in CATEGORICAL_COLUMNS + ('error_count',):
+            self._buffers[name] = array.array('i')
+        for name in OBJECT_COLUMNS:
+            self._buffers[name] = []
+        self._category_codes = {name: {} for name in CATEGORICAL_COLUMNS}
+        self._errors = []
+
+    def append(self, result):
+        """Adds a result to the table as a new row."""
+        buffers = self._buffers
+        for prefix, single_result in (('c2s_', result.c2s_result),
+                                      ('s2c_', result.s2c_result)):
+            if single_result is None:
+                single_result = results.NdtSingleTestResult()
+            buffers[prefix + 'throughput'].append(_from_float(
+                single_result.throughput))
+            buffers[prefix + 'start_time'].append(_time_to_ns(
+                single_result.start_time))
+            buffers[prefix + 'end_time'].append(_time_to_ns(
+                single_result.end_time))
+            buffers[prefix + 'duration_ns'].append(_from_int(
+                single_result.duration_ns))
+        buffers['latency'].append(_from_float(result.latency))
+        buffers['start_time'].append(_time_to_ns(result.start_time))
+        buffers['end_time'].append(_time_to_ns(result.end_time))
+        buffers['duration_ns'].append(_from_int(result.duration_ns))
+        buffers['browser_launch_ns'].append(_from_int(result.browser_launch_ns))
+        buffers['load_backoff_ns'].append(_from_int(result.load_backoff_ns))
+        buffers['load_retries'].append(_from_int(result.load_retries))
+        for name in CATEGORICAL_COLUMNS:
+            buffers[name].append(self._encode_category(name, getattr(result,
+                                                                     name)))
+        for name in OBJECT_COLUMNS:
+            buffers[name].append(getattr(result, name))
+        buffers['error_count'].append(len(result.errors))
+        self._errors.append(result.errors)
+
+    def build(self):
+        """Returns a ResultTable of all the appended results."""
+        columns = {}
+        for name in FLOAT_COLUMNS:
+            columns[name] = numpy.frombuffer(self._buffers[name],
+                                             dtype=numpy.float64).copy()
+        for name in TIME_COLUMNS + DURATION_COLUMNS + COUNT_COLUMNS:
+            columns[name] = self._buffers[name].to_array()
+        for name in CATEGORICAL_COLUMNS + ('error_count',):
+            columns[name] = numpy.frombuffer(self._buffers[name],
+                                             dtype=numpy.int32).copy()
+        for name in OBJECT_COLUMNS:
+            columns[name] = _object_array(self._buffers[name])
+        categories = {}
+        for name, codes in self._category_codes.iteritems():
+            categories[name] = sorted(codes, key=codes.get)
+        return ResultTable(columns, categories, _object_array(self._errors))
+
+    def _encode_category(self, column, value):
+        if value is None:
+            return MISSING_CODE
+        codes = self._category_codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = len(codes)
+            codes[value] = code
+        return code
+
+
+class _Int64Buffer(object):
+    """Growable buffer of int64 values.
+
+    The array module has no fixed-size 64-bit integer typecode, and its C long
+    is only 32 bits wide on some platforms (e.g. Windows). Values are instead
+    kept in a NumPy int64 array whose capacity doubles as it fills, so that
+    epoch nanoseconds, which exceed the 53 bits a double holds exactly, are
+    stored exactly on every platform.
+    """
+
+    def __init__(self):
+        self._values = numpy.empty(_INITIAL_BUFFER_CAPACITY, dtype=numpy.int64)
+        self._length = 0
+
+    def append(self, value):
+        if self._length == len(self._values):
+            values = numpy.empty(2 * len(self._values), dtype=numpy.int64)
+            values[:self._length] = self._values
+            self._values = values
+        self._values[self._length] = value
+        self._length += 1
+
+    def to_array(self):
+        """Returns a copy of the appended values as a NumPy int64 array."""
+        return self._values[:self._length].copy()
+
+
+def _object_array(values):
+    """Returns a one-dimensional NumPy object array of a list's values."""
+    # Values are assigned one at a time, since NumPy would treat values that
+    # are themselves equal-length lists (e.g. lists of spans) as an extra
+    # dimension.
+    objects = numpy.empty(len(values), dtype=object)
+    for index, value in enumerate(values):
+        objects[index] = value
+    return objects
+
+
+def _time_to_ns(time):
+    """Converts a datetime to nanoseconds since the epoch.
+
+    Naive datetimes are assumed to be in UTC.
+    """
+    if time is None:
+        return MISSING_INT
+    epoch = _NAIVE_EPOCH if time.tzinfo is None else _EPOCH
+    delta = time - epoch
+    return ((delta.days * 86400 + delta.seconds) * 1000000 +
+            delta.microseconds) * 1000
+
+
+def _ns_to_time(ns):
+    if ns == MISSING_INT:
+        return None
+    return _EPOCH + datetime.timedelta(microseconds=int(ns) // 1000)
+
+
+def _from_int(value):
+    return MISSING_INT if value is None else value
+
+
+def _to_int(value):
+    return None if value == MISSING_INT else int(value)
+
+
+def _from_float(value):
+    return numpy.nan if value is None else value
+
+
+def _to_float(value):
+    return None if numpy.isnan(value) else float(value)
@@ -13,7 +13,26 @@
 # limitations under the License.
 
 
-class NdtSingleTestResult(object):
+class _SlottedObject(object):
+    """Base class for compact result objects that store fields in slots.
+
+    Slots avoid the memory overhead of a per-instance __dict__, which matters
+    when large numbers of results are loaded for analysis. Subclasses list
+    their fields in __slots__. This class makes slotted objects picklable with
+    any pickle protocol.
+    """
+
+    __slots__ = ()
+
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __setstate__(self, state):
+        for field, value in zip(self.__slots__, state):
+            setattr(self, field, value)
+
+
+class NdtSingleTestResult(_SlottedObject):
     """Result of a single NDT test.
 
     Attributes:
@@ -22,15 +41,24 @@ class NdtSingleTestResult(object):
             never began).
         end_time: The datetime when the test competed (or None if the test
             never completed).
+        duration_ns: The duration of the test in nanoseconds, as measured by a
+            monotonic clock (or None if the test never completed).
     """
 
-    def __init__(self, throughput=None, start_time=None, end_time=None):
+    __slots__ = ('throughput', 'start_time', 'end_time', 'duration_ns')
+
+    def __init__(self,
+                 throughput=None,
+                 start_time=None,
+                 end_time=None,
+                 duration_ns=None):
         self.throughput = throughput
         self.start_time = start_time
         self.end_time = end_time
+        self.duration_ns = duration_ns
 
 
-class TestError(object):
+class TestError(_SlottedObject):
     """Log message of an error encountered in the test.
 
     Attributes:
@@ -38,12 +66,47 @@ class TestError(object):
         message: String message describing the error.
     """
 
+    __slots__ = ('timestamp', 'message')
+
     def __init__(self, timestamp, message):
         self.timestamp = timestamp
         self.message = message
 
 
-class NdtResult(object):
+class PhaseSpan(_SlottedObject):
+    """Timing of one phase of a test, and of the WebDriver commands in it.
+
+    Attributes:
+        phase: Name of the phase (e.g. "load_url").
+        start_offset_ns: Nanoseconds from the start of the test's first phase
+            to the start of this phase, as measured by a monotonic clock.
+        duration_ns: The duration of the phase in nanoseconds, as measured by
+            a monotonic clock.
+        command_counts: A dictionary mapping the name of each WebDriver
+            command issued during the phase (e.g. "find_element_by_id") to
+            the number of times it was issued.
+        command_durations_ns: A dictionary mapping the name of each WebDriver
+            command issued during the phase to the total nanoseconds spent in
+            it.
+    """
+
+    __slots__ = ('phase', 'start_offset_ns', 'duration_ns', 'command_counts',
+                 'command_durations_ns')
+
+    def __init__(self,
+                 phase,
+                 start_offset_ns,
+                 duration_ns=None,
+                 command_counts=None,
+                 command_durations_ns=None):
+        self.phase = phase
+        self.start_offset_ns = start_offset_ns
+        self.duration_ns = duration_ns
+        self.command_counts = command_counts or {}
+        self.command_durations_ns = command_durations_ns or {}
+
+
+class NdtResult(_SlottedObject):
     """Represents the results of a complete NDT HTML5 client test.
 
     Attributes:
@@ -51,8 +114,12 @@ class NdtResult(object):
             the driver pushed the 'Start Test' button).
         end_time: The datetime at which the tests completed (i.e. the time the
             results page loaded).
+        duration_ns: The nanoseconds between start_time and end_time, as
+            measured by a monotonic clock (or None if the tests did not
+            complete).
         errors: A list of TestError objects representing any errors encountered
             during the tests (or an empty list if all tests were successful).
+            Each result gets its own list if none is given.
         c2s_result: The NdtSingleResult for the c2s (upload) test (or None if no
             result was recorded).
         s2c_result: The NdtSingleResult for the s2c (download) test (or None if
@@ -63,25 +130,60 @@ class NdtResult(object):
         os_version: OS version string (e.g. "10.0").
         client: Shortname of the NDT client (e.g. "ndt_js").
         client_version: Version string of the NDT client (e.g. "4.0.1").
+        browser: Name of the browser in which the test ran (e.g. "firefox"),
+            or None for non-browser clients.
+        browser_version: Version string of the browser (e.g. "49.0.2623").
+        browser_launch_ns: Nanoseconds taken to launch the browser for the
+            test, as measured by a monotonic clock (or None if the test reused
+            an already running browser).
+        load_retries: The number of times loading the NDT client page was
+            retried after failing (or None if load retries are not enabled).
+        load_backoff_ns: Total nanoseconds spent waiting before retries of
+            loading the NDT client page (or None if load retries are not
+            enabled).
+        phase_timeouts_ns: A dictionary mapping each phase that the driver
+            waited on (e.g. "c2s") to the timeout applied to it, in
+            nanoseconds (or None if the test did not reach those phases).
+        timed_out_phase: The phase (e.g. "c2s") that the driver stopped
+            waiting on because it timed out (or None if no phase timed out).
+        spans: A list of PhaseSpan objects timing each phase of the test, in
+            the order the phases started (or None if spans were not
+            collected).
     """
 
+    __slots__ = ('start_time', 'end_time', 'duration_ns', 'c2s_result',
+                 's2c_result', 'errors', 'latency', 'os', 'os_version',
+                 'client', 'client_version', 'browser', 'browser_version',
+                 'browser_launch_ns', 'load_retries', 'load_backoff_ns',
+                 'phase_timeouts_ns', 'timed_out_phase', 'spans')
+
     def __init__(self,
                  start_time=None,
                  end_time=None,
-                 errors=[],
+                 errors=None,
                  c2s_result=None,
                  s2c_result=None,
-                 latency=None):
+                 latency=None,
+                 duration_ns=None):
         self.start_time = start_time
         self.end_time = end_time
+        self.duration_ns = duration_ns
         self.c2s_result = c2s_result
         self.s2c_result = s2c_result
-        self.errors = errors
+        self.errors = errors if errors is not None else []
         self.latency = latency
         self.os = None
         self.os_version = None
         self.client = None
         self.client_version = None
+        self.browser = None
+        self.browser_version = None
+        self.browser_launch_ns = None
+        self.load_retries = None
+        self.load_backoff_ns = None
+        self.phase_timeouts_ns = None
+        self.timed_out_phase = None
+        self.spans = None
 
     def __str__(self):
         return 'NDT Results:\n Start Time: %s,\n End Time: %s'\
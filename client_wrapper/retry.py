@@ -0,0 +1,96 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Policy for retrying failed operations with exponential backoff.
+
+The wait before each retry grows exponentially, up to a maximum, so that a
+briefly unreachable server is retried quickly while one that stays down is not
+hammered. Each wait is shortened by a random fraction (jitter) so that many
+clients that failed at the same moment do not all retry at the same moment.
+"""
+
+import random
+import time
+
+
+class RetryPolicy(object):
+    """How many times to retry a failed operation, and how long to wait.
+
+    Attributes:
+        max_retries: The maximum number of retries after the first attempt.
+    """
+
+    def __init__(self,
+                 max_retries=0,
+                 initial_backoff=1.0,
+                 backoff_multiplier=2.0,
+                 max_backoff=30.0,
+                 jitter=0.5,
+                 sleep=None,
+                 random_source=None):
+        """Creates a retry policy.
+
+        Args:
+            max_retries: The maximum number of retries after the first
+                attempt.
+            initial_backoff: The number of seconds to wait before the first
+                retry, before jitter is applied.
+            backoff_multiplier: The factor by which the wait grows with each
+                retry.
+            max_backoff: The maximum number of seconds to wait before a
+                retry, before jitter is applied.
+            jitter: The maximum fraction by which each wait is randomly
+                shortened, from 0 (no jitter) to 1.
+            sleep: A function that waits for a number of seconds (or None to
+                use time.sleep).
+            random_source: A random.Random used to choose the jitter of each
+                wait (or None to create one).
+        """
+        if max_retries < 0:
+            raise ValueError('max_retries must not be negative')
+        if initial_backoff < 0 or max_backoff < 0:
+            raise ValueError('backoff must not be negative')
+        if backoff_multiplier < 1:
+            raise ValueError('backoff_multiplier must be at least 1')
+        if not 0 <= jitter <= 1:
+            raise ValueError('jitter must be between 0 and 1')
+        self.max_retries = max_retries
+        self._initial_backoff = initial_backoff
+        self._backoff_multiplier = backoff_multiplier
+        self._max_backoff = max_backoff
+        self._jitter = jitter
+        self._sleep = sleep or time.sleep
+        self._random = random_source or random.Random()
+
+    def backoff(self, retry):
+        """Returns the number of seconds to wait before a retry.
+
+        Args:
+            retry: The number of the retry, starting from 1.
+        """
+        backoff = min(self._max_backoff, self._initial_backoff *
+                      self._backoff_multiplier**(retry - 1))
+        return backoff * (1 - self._jitter * self._random.random())
+
+    def wait(self, retry):
+        """Waits before a retry.
+
+        Args:
+            retry: The number of the retry, starting from 1.
+
+        Returns:
+            The number of seconds waited.
+        """
+        backoff = self.backoff(retry)
+        self._sleep(backoff)
+        return backoff
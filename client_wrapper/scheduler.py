@@ -0,0 +1,146 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Runs a task repeatedly on a fixed cadence.
+
+Runs are scheduled in fixed slots, one every interval from when the scheduler
+starts, so the cadence does not drift with the time each run takes. Each run
+starts at a random offset into its slot, so that many clients on the same
+cadence do not all test at once.
+
+A run that takes longer than an interval overruns into the following slots.
+The scheduler then either skips the slots whose start time has passed, or
+queues them and runs them back to back until it has caught up.
+"""
+
+import random
+import threading
+
+import clocks
+
+# Ways of handling slots whose start time passes while a run is in progress.
+OVERRUN_SKIP = 'skip'
+OVERRUN_QUEUE = 'queue'
+
+_NANOSECONDS_PER_SECOND = 1000000000
+
+
+class Scheduler(object):
+    """Runs a task on a fixed cadence with random jitter.
+
+    Attributes:
+        runs: The number of times the task has run.
+        skipped_runs: The number of slots in which the task did not run
+            because an earlier run overran.
+    """
+
+    def __init__(self,
+                 interval,
+                 jitter=0,
+                 overrun_policy=OVERRUN_SKIP,
+                 max_queued_runs=1,
+                 clock=None,
+                 sleep=None,
+                 random_source=None):
+        """Creates a scheduler.
+
+        Args:
+            interval: The number of seconds between the starts of consecutive
+                slots.
+            jitter: The maximum number of seconds that each run is delayed
+                from the start of its slot. Must be less than interval.
+            overrun_policy: OVERRUN_SKIP to skip slots that passed during an
+                overrunning run, or OVERRUN_QUEUE to run them as soon as
+                possible.
+            max_queued_runs: With OVERRUN_QUEUE, the maximum number of passed
+                slots to catch up on. Older passed slots are skipped.
+            clock: The clock that runs are scheduled by (or None to use the
+                system clock).
+            sleep: A function that waits for a number of seconds (or None to
+                wait in a way that stop() interrupts).
+            random_source: A random.Random used to choose the jitter of each
+                run (or None to create one).
+        """
+        if interval <= 0:
+            raise ValueError('interval must be positive')
+        if not 0 <= jitter < interval:
+            raise ValueError('jitter must be at least 0 and less than interval')
+        if overrun_policy not in (OVERRUN_SKIP, OVERRUN_QUEUE):
+            raise ValueError('Invalid overrun policy: %s' % overrun_policy)
+        if max_queued_runs < 0:
+            raise ValueError('max_queued_runs must not be negative')
+        self._interval_ns = int(interval * _NANOSECONDS_PER_SECOND)
+        self._jitter = jitter
+        self._overrun_policy = overrun_policy
+        self._max_queued_runs = max_queued_runs
+        self._clock = clock or clocks.SystemClock()
+        self._stopped = threading.Event()
+        self._sleep = sleep or self._stopped.wait
+        self._random = random_source or random.Random()
+        self.runs = 0
+        self.skipped_runs = 0
+
+    def run(self, task, max_runs=None):
+        """Runs the task in each slot until stopped.
+
+        Exceptions raised by the task stop the scheduler and are re-raised.
+
+        Args:
+            task: A function to call with no arguments in each slot.
+            max_runs: The number of runs after which to return (or None to
+                run until stop() is called).
+        """
+        start_ns = self._clock.monotonic_ns()
+        slot = 0
+        queued = False
+        while not self._stopped.is_set():
+            if max_runs is not None and self.runs >= max_runs:
+                return
+            if not queued:
+                run_ns = (start_ns + slot * self._interval_ns +
+                          int(self._random.uniform(0, self._jitter) *
+                              _NANOSECONDS_PER_SECOND))
+                wait_ns = run_ns - self._clock.monotonic_ns()
+                if wait_ns > 0:
+                    self._sleep(wait_ns / float(_NANOSECONDS_PER_SECOND))
+                    if self._stopped.is_set():
+                        return
+            task()
+            self.runs += 1
+            slot, queued = self._next_slot(start_ns, slot)
+
+    def stop(self):
+        """Stops the scheduler once any run in progress completes."""
+        self._stopped.set()
+
+    def _next_slot(self, start_ns, slot):
+        """Chooses the slot to run next, after a run in the given slot.
+
+        Returns:
+            A tuple of the next slot to run in and whether that slot's start
+            time has already passed, i.e. whether it is a queued run that
+            should start immediately.
+        """
+        # The latest slot whose start time has passed.
+        current_slot = (
+            self._clock.monotonic_ns() - start_ns) // self._interval_ns
+        if current_slot <= slot:
+            return slot + 1, False
+        if self._overrun_policy == OVERRUN_SKIP:
+            self.skipped_runs += current_slot - slot
+            return current_slot + 1, False
+        next_slot = max(slot + 1, current_slot - self._max_queued_runs + 1)
+        self.skipped_runs += next_slot - slot - 1
+        if next_slot > current_slot:
+            return next_slot, False
+        return next_slot, True
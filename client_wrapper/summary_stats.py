@@ -0,0 +1,376 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Streaming summary statistics over NDT results.
+
+Statistics are computed incrementally, in memory that does not grow with the
+number of results: moments with Welford's algorithm and quantiles with a
+DDSketch-style logarithmically bucketed sketch. Every summary can be merged
+with another, so summaries of separate runs or hosts can be combined into a
+single summary with the same accuracy.
+"""
+
+import math
+
+# Quantiles included in summary reports.
+REPORT_QUANTILES = (0.5, 0.9, 0.99)
+
+# Metrics summarized by ResultSummary, in report order.
+METRICS = ('c2s_throughput', 's2c_throughput', 'latency')
+
+# Smallest value the sketch assigns to a logarithmic bucket. Metrics of NDT
+# results are far larger than this, so smaller values are treated as zero.
+_MIN_BUCKETED_VALUE = 1e-9
+
+
+class Error(Exception):
+    pass
+
+
+class IncompatibleSketchError(Error):
+    """Indicates an attempt to merge sketches with different parameters."""
+    pass
+
+
+class RunningStats(object):
+    """Count, mean, variance, min and max of a stream of values."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.min = None
+        self.max = None
+        # Sum of squared differences from the mean.
+        self._m2 = 0.0
+
+    def add(self, value):
+        """Adds a value to the statistics, using Welford's algorithm."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Adds the values summarized by other RunningStats to these stats.
+
+        Uses the parallel algorithm of Chan et al., so the merged statistics
+        equal those of a single stream containing both sets of values.
+
+        Args:
+            other: RunningStats to merge into this instance.
+        """
+        if not other.count:
+            return
+        if not self.count:
+            self.count = other.count
+            self.mean = other.mean
+            self._m2 = other._m2
+            self.min = other.min
+            self.max = other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        """Sample variance of the values, or None for fewer than two values."""
+        if self.count < 2:
+            return None
+        return self._m2 / (self.count - 1)
+
+    @property
+    def stddev(self):
+        """Sample standard deviation, or None for fewer than two values."""
+        variance = self.variance
+        if variance is None:
+            return None
+        return math.sqrt(variance)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self._m2,
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, stats_dict):
+        stats = cls()
+        stats.count = stats_dict['count']
+        stats.mean = stats_dict['mean']
+        stats._m2 = stats_dict['m2']
+        stats.min = stats_dict['min']
+        stats.max = stats_dict['max']
+        return stats
+
+
+class QuantileSketch(object):
+    """Mergeable quantile sketch of non-negative values.
+
+    Values are counted in buckets whose bounds grow geometrically, so any
+    quantile estimate is within relative_accuracy of a value in the stream
+    (e.g. within 1% for the default accuracy). If the number of buckets would
+    exceed max_buckets, the lowest buckets are combined, which loses accuracy
+    only for the lowest quantiles.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        """Creates an empty sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of quantile estimates,
+                between 0 and 1.
+            max_buckets: Maximum number of buckets the sketch may hold.
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative_accuracy must be between 0 and 1')
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.count = 0
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        # Count of values too close to zero to bucket logarithmically.
+        self._zero_count = 0
+        # Maps a bucket's index to the count of values in that bucket. Bucket i
+        # holds values in (gamma^(i-1), gamma^i].
+        self._buckets = {}
+
+    def add(self, value):
+        """Adds a value to the sketch.
+
+        Args:
+            value: A non-negative number.
+
+        Raises:
+            ValueError: If value is negative.
+        """
+        if value < 0:
+            raise ValueError('QuantileSketch values must be non-negative: %r' %
+                             value)
+        self.count += 1
+        if value < _MIN_BUCKETED_VALUE:
+            self._zero_count += 1
+            return
+        index = int(math.ceil(math.log(value) / self._log_gamma))
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        if len(self._buckets) > self.max_buckets:
+            self._collapse_lowest_buckets()
+
+    def merge(self, other):
+        """Adds the values summarized by another sketch to this sketch.
+
+        Args:
+            other: A QuantileSketch with the same relative accuracy.
+
+        Raises:
+            IncompatibleSketchError: If the sketches' accuracies differ.
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise IncompatibleSketchError(
+                'Cannot merge sketches with relative accuracies %r and %r' %
+                (self.relative_accuracy, other.relative_accuracy))
+        self.count += other.count
+        self._zero_count += other._zero_count
+        for index, count in other._buckets.iteritems():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        if len(self._buckets) > self.max_buckets:
+            self._collapse_lowest_buckets()
+
+    def quantile(self, q):
+        """Estimates the value at quantile q of the sketched values.
+
+        Args:
+            q: The quantile, between 0 and 1 (e.g. 0.99 for the 99th
+                percentile).
+
+        Returns:
+            The estimated value, or None if the sketch is empty.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError('Quantile must be between 0 and 1: %r' % q)
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        cumulative_count = self._zero_count
+        if cumulative_count > rank:
+            return 0.0
+        for index in sorted(self._buckets):
+            cumulative_count += self._buckets[index]
+            if cumulative_count > rank:
+                # Midpoint (in relative terms) of the bucket's bounds.
+                return 2 * self._gamma**index / (self._gamma + 1)
+        return 2 * self._gamma**max(self._buckets) / (self._gamma + 1)
+
+    def _collapse_lowest_buckets(self):
+        indexes = sorted(self._buckets)
+        excess = len(indexes) - self.max_buckets
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self._buckets[target] += self._buckets.pop(index)
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'max_buckets': self.max_buckets,
+            'zero_count': self._zero_count,
+            # JSON object keys must be strings.
+            'buckets': {str(index): count
+                        for index, count in self._buckets.iteritems()}
+        }
+
+    @classmethod
+    def from_dict(cls, sketch_dict):
+        sketch = cls(relative_accuracy=sketch_dict['relative_accuracy'],
+                     max_buckets=sketch_dict['max_buckets'])
+        sketch._zero_count = sketch_dict['zero_count']
+        sketch._buckets = {int(index): count
+                           for index, count in sketch_dict['buckets'].iteritems(
+                           )}
+        sketch.count = sketch._zero_count + sum(sketch._buckets.itervalues())
+        return sketch
+
+
+class MetricSummary(object):
+    """Streaming summary statistics of a single metric."""
+
+    def __init__(self, relative_accuracy=0.01):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(relative_accuracy=relative_accuracy)
+
+    def add(self, value):
+        self.stats.add(value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    def quantile(self, q):
+        """Estimates a quantile, bounded by the exact min and max values."""
+        estimate = self.sketch.quantile(q)
+        if estimate is None:
+            return None
+        return min(max(estimate, self.stats.min), self.stats.max)
+
+    def to_dict(self):
+        return {'stats': self.stats.to_dict(), 'sketch': self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, summary_dict):
+        summary = cls()
+        summary.stats = RunningStats.from_dict(summary_dict['stats'])
+        summary.sketch = QuantileSketch.from_dict(summary_dict['sketch'])
+        return summary
+
+
+class ResultSummary(object):
+    """Streaming summary of the throughput and latency of NDT results.
+
+    Missing metrics (e.g. the s2c throughput of a test that failed during c2s)
+    are left out of that metric's statistics, but the result still counts
+    towards the total number of results.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.result_count = 0
+        self.error_count = 0
+        self.metrics = {
+            metric: MetricSummary(relative_accuracy=relative_accuracy)
+            for metric in METRICS
+        }
+
+    def add_result(self, result):
+        """Adds an NdtResult's metrics to the summary."""
+        self.result_count += 1
+        if result.errors:
+            self.error_count += 1
+        for metric, value in _metric_values(result):
+            if value is not None:
+                self.metrics[metric].add(value)
+
+    def merge(self, other):
+        """Adds the results summarized by another ResultSummary to this one."""
+        self.result_count += other.result_count
+        self.error_count += other.error_count
+        for metric in METRICS:
+            self.metrics[metric].merge(other.metrics[metric])
+
+    def format_report(self):
+        """Formats the summary as human-readable lines of text.
+
+        Returns:
+            A string with one line for the result counts, then one line per
+            metric.
+        """
+        lines = ['results: %d, with errors: %d' % (self.result_count,
+                                                   self.error_count)]
+        for metric in METRICS:
+            lines.append('%s: %s' % (metric,
+                                     _format_metric(self.metrics[metric])))
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        """Converts the summary into a JSON-serializable dictionary."""
+        return {
+            'result_count': self.result_count,
+            'error_count': self.error_count,
+            'metrics': {
+                metric: summary.to_dict()
+                for metric, summary in self.metrics.iteritems()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, summary_dict):
+        """Recreates a summary from the output of to_dict."""
+        summary = cls()
+        summary.result_count = summary_dict['result_count']
+        summary.error_count = summary_dict['error_count']
+        for metric in METRICS:
+            summary.metrics[metric] = MetricSummary.from_dict(summary_dict[
+                'metrics'][metric])
+        return summary
+
+
+def _metric_values(result):
+    c2s_throughput = None
+    if result.c2s_result:
+        c2s_throughput = result.c2s_result.throughput
+    s2c_throughput = None
+    if result.s2c_result:
+        s2c_throughput = result.s2c_result.throughput
+    return (('c2s_throughput', c2s_throughput),
+            ('s2c_throughput', s2c_throughput), ('latency', result.latency))
+
+
+def _format_metric(summary):
+    stats = summary.stats
+    if not stats.count:
+        return 'no values'
+    stddev = stats.stddev
+    quantiles = ', '.join('p%d=%.2f' % (q * 100, summary.quantile(q))
+                          for q in REPORT_QUANTILES)
+    return 'n=%d, mean=%.2f, stddev=%s, min=%.2f, max=%.2f, %s' % (
+        stats.count, stats.mean, 'n/a' if stddev is None else '%.2f' % stddev,
+        stats.min, stats.max, quantiles)
@@ -0,0 +1,294 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import warnings
+
+from client_wrapper import adaptive_timeout
+from client_wrapper import results
+
+URL = 'http://ndt.mock-server.com:7123/'
+
+
+def create_result(start_ns, c2s_ns, s2c_ns, errors=None):
+    return results.NdtResult(
+        errors=errors,
+        duration_ns=start_ns + c2s_ns + s2c_ns,
+        c2s_result=results.NdtSingleTestResult(duration_ns=c2s_ns),
+        s2c_result=results.NdtSingleTestResult(duration_ns=s2c_ns))
+
+
+def run_simulated_test(policy, c2s_seconds):
+    """Records a simulated test whose c2s phase takes c2s_seconds.
+
+    The test times out in its c2s phase if that is longer than the timeout
+    the policy chooses.
+
+    Returns:
+        True if the test completed, False if it timed out.
+    """
+    timeouts = policy.timeouts(URL)
+    if c2s_seconds > timeouts['c2s']:
+        result = results.NdtResult(errors=[results.TestError(
+            None, 'Test did not complete within timeout period.')])
+        result.timed_out_phase = 'c2s'
+    else:
+        result = create_result(start_ns=1000000000,
+                               c2s_ns=int(c2s_seconds * 1e9),
+                               s2c_ns=1000000000)
+    result.phase_timeouts_ns = {
+        phase: int(timeout * 1e9)
+        for phase, timeout in timeouts.iteritems()
+    }
+    policy.record_result(URL, result)
+    return not result.errors
+
+
+def add_and_save_in_process(path, duration):
+    """Adds and saves durations through a history of its own, as a worker."""
+    history = adaptive_timeout.TimeoutHistory(path, max_samples=1000)
+    for _ in range(20):
+        history.add(URL, 'c2s', duration)
+        history.save()
+
+
+class TimeoutHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.path = os.path.join(self.temp_dir, 'history.json')
+
+    def temp_files(self):
+        return [name
+                for name in os.listdir(self.temp_dir) if name.endswith('.tmp')]
+
+    def test_history_persists_across_instances(self):
+        history = adaptive_timeout.TimeoutHistory(self.path)
+        history.add(URL, 'c2s', 10.5)
+        history.add('http://other/', 'c2s', 3.0)
+        history.save()
+
+        reloaded = adaptive_timeout.TimeoutHistory(self.path)
+        self.assertEqual([10.5], reloaded.durations(URL, 'c2s'))
+        self.assertEqual([3.0], reloaded.durations('http://other/', 'c2s'))
+        self.assertEqual([], reloaded.durations(URL, 's2c'))
+        self.assertEqual([], self.temp_files())
+
+    def test_concurrent_saves_keep_every_duration(self):
+        history = adaptive_timeout.TimeoutHistory(self.path, max_samples=1000)
+        errors = []
+
+        def add_and_save(duration):
+            try:
+                for _ in range(50):
+                    history.add(URL, 'c2s', duration)
+                    history.save()
+            except Exception as e:  # pylint: disable=broad-except
+                errors.append(e)
+
+        threads = [threading.Thread(target=add_and_save,
+                                    args=(float(i),)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], errors)
+        reloaded = adaptive_timeout.TimeoutHistory(self.path)
+        self.assertEqual(400, len(reloaded.durations(URL, 'c2s')))
+        self.assertEqual([], self.temp_files())
+
+    def test_saves_from_different_processes_keep_every_duration(self):
+        processes = [multiprocessing.Process(target=add_and_save_in_process,
+                                             args=(self.path, float(i)))
+                     for i in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual([0] * 4, [process.exitcode for process in processes])
+        reloaded = adaptive_timeout.TimeoutHistory(self.path, max_samples=1000)
+        self.assertEqual(80, len(reloaded.durations(URL, 'c2s')))
+        self.assertEqual([], self.temp_files())
+
+    def test_histories_sharing_a_file_merge_their_durations(self):
+        # As in separate worker processes, each history is loaded before
+        # either is saved.
+        history = adaptive_timeout.TimeoutHistory(self.path)
+        other_history = adaptive_timeout.TimeoutHistory(self.path)
+        history.add(URL, 'c2s', 1.0)
+        other_history.add(URL, 'c2s', 2.0)
+        history.save()
+        other_history.save()
+        history.add(URL, 'c2s', 3.0)
+        history.save()
+
+        reloaded = adaptive_timeout.TimeoutHistory(self.path)
+        self.assertEqual([1.0, 2.0, 3.0], reloaded.durations(URL, 'c2s'))
+        self.assertEqual([1.0, 2.0, 3.0], history.durations(URL, 'c2s'))
+
+    def test_timeouts_are_counted_until_the_phase_completes(self):
+        history = adaptive_timeout.TimeoutHistory(self.path)
+        history.add_timeout(URL, 'c2s', 6.0)
+        history.add_timeout(URL, 'c2s', 12.0)
+        history.save()
+
+        reloaded = adaptive_timeout.TimeoutHistory(self.path)
+        self.assertEqual([6.0, 12.0], reloaded.durations(URL, 'c2s'))
+        self.assertEqual(2, reloaded.consecutive_timeouts(URL, 'c2s'))
+        self.assertEqual(0, reloaded.consecutive_timeouts(URL, 's2c'))
+        reloaded.add(URL, 'c2s', 20.0)
+        self.assertEqual(0, reloaded.consecutive_timeouts(URL, 'c2s'))
+
+    def test_unreadable_history_file_is_ignored(self):
+        for contents in ('{"http://ndt.fake/": {"c2s', '[1, 2]',
+                         '{"http://ndt.fake/": {"c2s": [1.0]}}'):
+            with open(self.path, 'w') as history_file:
+                history_file.write(contents)
+
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                history = adaptive_timeout.TimeoutHistory(self.path)
+            self.assertEqual(1, len(caught))
+            self.assertEqual([], history.durations(URL, 'c2s'))
+
+            # Saving replaces the unreadable file.
+            history.add(URL, 'c2s', 10.5)
+            with warnings.catch_warnings(record=True):
+                warnings.simplefilter('always')
+                history.save()
+            reloaded = adaptive_timeout.TimeoutHistory(self.path)
+            self.assertEqual([10.5], reloaded.durations(URL, 'c2s'))
+
+    def test_only_recent_durations_are_kept(self):
+        history = adaptive_timeout.TimeoutHistory(max_samples=3)
+        for duration in range(5):
+            history.add(URL, 'c2s', duration)
+
+        self.assertEqual([2, 3, 4], history.durations(URL, 'c2s'))
+
+
+class AdaptiveTimeoutsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.history = adaptive_timeout.TimeoutHistory()
+
+    def create_policy(self, **kwargs):
+        return adaptive_timeout.AdaptiveTimeouts(self.history,
+                                                 default_timeout=20,
+                                                 **kwargs)
+
+    def test_default_timeout_without_enough_history(self):
+        for _ in range(4):
+            self.history.add(URL, 'c2s', 10.0)
+
+        self.assertEqual({'start': 20,
+                          'c2s': 20,
+                          's2c': 20}, self.create_policy().timeouts(URL))
+
+    def test_timeout_is_percentile_plus_margin_within_bounds(self):
+        for duration in range(1, 21):
+            self.history.add(URL, 'start', duration / 10.0)
+            self.history.add(URL, 'c2s', float(duration))
+            self.history.add(URL, 's2c', duration * 10.0)
+        timeouts = self.create_policy(percentile=90,
+                                      margin=2,
+                                      floor=5,
+                                      ceiling=60).timeouts(URL)
+
+        # The 90th percentile of the start delays is 1.8s, so the floor
+        # applies, and that of the s2c durations is 180s, so the ceiling
+        # applies.
+        self.assertEqual({'start': 5, 'c2s': 20.0, 's2c': 60}, timeouts)
+
+    def test_timeout_outside_the_test_phases_is_not_recorded(self):
+        # E.g. a timeout while reading the results, after every phase ended.
+        result = create_result(
+            start_ns=1,
+            c2s_ns=1,
+            s2c_ns=1,
+            errors=[results.TestError(
+                None, 'Test did not complete within timeout period.')])
+        result.phase_timeouts_ns = {'start': 1, 'c2s': 1, 's2c': 1}
+        self.create_policy().record_result(URL, result)
+
+        self.assertEqual([], self.history.durations(URL, 's2c'))
+        self.assertEqual(0, self.history.consecutive_timeouts(URL, 's2c'))
+
+    def test_records_phase_durations_of_successful_tests(self):
+        policy = self.create_policy(min_samples=1, margin=0, floor=0)
+        policy.record_result(URL,
+                             create_result(start_ns=500000000,
+                                           c2s_ns=10000000000,
+                                           s2c_ns=9000000000))
+        policy.record_result(
+            URL,
+            create_result(start_ns=1,
+                          c2s_ns=1,
+                          s2c_ns=1,
+                          errors=[results.TestError(None, 'illegal value')]))
+        policy.record_result(URL, results.NdtResult())
+
+        self.assertEqual(
+            {'start': 0.5,
+             'c2s': 10.0,
+             's2c': 9.0}, policy.timeouts(URL))
+
+    def test_timeout_doubles_with_each_consecutive_timeout(self):
+        for _ in range(5):
+            self.history.add(URL, 'c2s', 5.0)
+        policy = self.create_policy(margin=1, floor=1, ceiling=30)
+
+        timeouts = []
+        for _ in range(3):
+            timeouts.append(policy.timeouts(URL)['c2s'])
+            run_simulated_test(policy, c2s_seconds=100.0)
+
+        # The timeouts added to the history raise the percentile too.
+        self.assertEqual([6.0, 14.0, 30], timeouts)
+        self.assertEqual([5.0] * 5 + [6.0, 14.0, 30],
+                         self.history.durations(URL, 'c2s'))
+
+    def test_timeouts_grow_when_durations_grow_past_them(self):
+        policy = self.create_policy(margin=1, floor=1, ceiling=60)
+        for _ in range(50):
+            self.assertTrue(run_simulated_test(policy, c2s_seconds=5.0))
+        self.assertEqual(6.0, policy.timeouts(URL)['c2s'])
+
+        # The link becomes four times slower.
+        completed = [run_simulated_test(policy,
+                                        c2s_seconds=20.0) for _ in range(20)]
+
+        self.assertFalse(completed[0])
+        self.assertLess(completed.count(False), 10)
+        self.assertTrue(all(completed[-10:]))
+        self.assertGreaterEqual(policy.timeouts(URL)['c2s'], 20.0)
+
+    def test_invalid_settings_raise_error(self):
+        with self.assertRaises(ValueError):
+            self.create_policy(percentile=0)
+        with self.assertRaises(ValueError):
+            self.create_policy(floor=10, ceiling=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import unittest
+
+from selenium.webdriver.common import desired_capabilities
+
+from client_wrapper import browser_launch
+
+
+class BrowserLaunchTest(unittest.TestCase):
+
+    def test_default_options_use_selenium_defaults(self):
+        launch_options = browser_launch.LaunchOptions()
+        self.assertEqual({}, browser_launch.firefox_arguments(launch_options))
+        self.assertEqual({}, browser_launch.chrome_arguments(launch_options))
+        self.assertEqual({}, browser_launch.edge_arguments(launch_options))
+        self.assertEqual({}, browser_launch.safari_arguments(launch_options))
+
+    def test_invalid_page_load_strategy_raises_error(self):
+        with self.assertRaises(ValueError):
+            browser_launch.LaunchOptions(page_load_strategy='fast')
+
+    def test_firefox_minimal_profile_disables_updates(self):
+        arguments = browser_launch.firefox_arguments(
+            browser_launch.LaunchOptions(minimal_profile=True))
+
+        preferences = arguments['firefox_profile'].default_preferences
+        self.assertEqual(False, preferences['app.update.enabled'])
+        self.assertEqual(False, preferences['toolkit.telemetry.enabled'])
+
+    def test_headless_firefox_raises_error(self):
+        with self.assertRaises(ValueError):
+            browser_launch.firefox_arguments(browser_launch.LaunchOptions(
+                headless=True))
+
+    def test_firefox_eager_page_load_strategy_raises_error(self):
+        with self.assertRaises(ValueError):
+            browser_launch.firefox_arguments(browser_launch.LaunchOptions(
+                page_load_strategy='eager'))
+
+    def test_firefox_page_load_strategy_is_passed_as_capability(self):
+        arguments = browser_launch.firefox_arguments(
+            browser_launch.LaunchOptions(page_load_strategy='none'))
+
+        self.assertEqual('none', arguments['capabilities']['pageLoadStrategy'])
+        self.assertEqual('firefox', arguments['capabilities']['browserName'])
+
+    def test_chrome_options_are_passed_as_switches_and_capabilities(self):
+        arguments = browser_launch.chrome_arguments(
+            browser_launch.LaunchOptions(headless=True,
+                                         minimal_profile=True,
+                                         page_load_strategy='none'))
+
+        switches = arguments['chrome_options'].arguments
+        self.assertIn('--headless', switches)
+        self.assertIn('--disable-background-networking', switches)
+        self.assertEqual('none',
+                         arguments['desired_capabilities']['pageLoadStrategy'])
+        self.assertEqual('chrome',
+                         arguments['desired_capabilities']['browserName'])
+
+    def test_page_load_strategy_does_not_modify_default_capabilities(self):
+        arguments = browser_launch.edge_arguments(browser_launch.LaunchOptions(
+            page_load_strategy='eager'))
+
+        self.assertEqual('eager', arguments['capabilities']['pageLoadStrategy'])
+        self.assertNotIn('pageLoadStrategy',
+                         desired_capabilities.DesiredCapabilities.EDGE)
+
+    def test_headless_safari_raises_error(self):
+        with self.assertRaises(ValueError):
+            browser_launch.safari_arguments(browser_launch.LaunchOptions(
+                headless=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,6 +15,8 @@
 from __future__ import absolute_import
 import unittest
 
+import mock
+
 from client_wrapper import canonicalize
 from client_wrapper import names
 
@@ -59,3 +61,37 @@ class CanonicalizeTest(unittest.TestCase):
             canonicalize.browser_to_canonical_name(names.EDGE, 'banana')
         with self.assertRaises(canonicalize.UnrecognizedVersionStringError):
             canonicalize.browser_to_canonical_name(names.CHROME, '6')
+        with self.assertRaises(canonicalize.UnrecognizedVersionStringError):
+            canonicalize.browser_to_canonical_name(names.CHROME, None)
+
+    def test_browser_to_canonical_name_cache_is_bounded(self):
+        self.addCleanup(canonicalize._browser_cache.clear)
+        with mock.patch.object(canonicalize, '_MAX_BROWSER_CACHE_SIZE', 2):
+            for major_version in range(5):
+                self.assertEqual('firefox%d' % major_version,
+                                 canonicalize.browser_to_canonical_name(
+                                     names.FIREFOX, '%d.0' % major_version))
+                self.assertLessEqual(len(canonicalize._browser_cache), 2)
+
+    def test_os_to_shortnames_converts_columns(self):
+        self.assertEqual(
+            [names.WINDOWS_10, names.UBUNTU_14, names.WINDOWS_10],
+            canonicalize.os_to_shortnames(
+                ['Windows', 'Ubuntu', 'Windows'], ['10.0', '14.04', '10.0']))
+        self.assertEqual([], canonicalize.os_to_shortnames([], []))
+
+    def test_os_to_shortnames_raises_error_on_unsupported_platforms(self):
+        with self.assertRaises(canonicalize.UnsupportedPlatformError):
+            canonicalize.os_to_shortnames(
+                ['Ubuntu', 'Windows'], ['14.04', '7.0'])
+
+    def test_browsers_to_canonical_names_converts_columns(self):
+        self.assertEqual(['chrome49', 'firefox45', 'chrome49'],
+                         canonicalize.browsers_to_canonical_names(
+                             [names.CHROME, names.FIREFOX, names.CHROME],
+                             ['49.0.2623', '45.0', '49.0.2623']))
+
+    def test_browsers_to_canonical_names_raise_error_on_bad_version(self):
+        with self.assertRaises(canonicalize.UnrecognizedVersionStringError):
+            canonicalize.browsers_to_canonical_names(
+                [names.CHROME, names.EDGE], ['49.0.2623', 'banana'])
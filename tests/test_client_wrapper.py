@@ -0,0 +1,97 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+
+import mock
+from selenium.common import exceptions
+
+from client_wrapper import client_wrapper
+from client_wrapper import fake_webdriver
+from client_wrapper import html5_driver
+from client_wrapper import names
+
+
+class ClientWrapperTest(unittest.TestCase):
+
+    def setUp(self):
+        # Every browser the client wrapper launches fails to load the page.
+        self.factory = fake_webdriver.FakeWebDriverFactory(
+            failures={'get': exceptions.WebDriverException(u'Failed.')})
+        firefox_patcher = mock.patch.object(
+            html5_driver.webdriver,
+            'Firefox',
+            side_effect=lambda **_: self.factory('firefox'))
+        firefox_patcher.start()
+        self.addCleanup(firefox_patcher.stop)
+
+    def run_main(self, *args):
+        """Runs the client wrapper with arguments, returning its output."""
+        parsed_args = client_wrapper._create_parser().parse_args(
+            ['--client', names.NDT_HTML5, '--browser', 'firefox',
+             '--client_url', 'http://ndt.fake/', '--timeout', '1'] + list(args))
+        with mock.patch('sys.stdout', new_callable=StringIO.StringIO) as out:
+            client_wrapper.main(parsed_args)
+        return out.getvalue()
+
+    def test_load_failures_are_printed_and_summarized(self):
+        output = self.run_main('--iterations', '2')
+
+        self.assertEqual(2, output.count('c2s_throughput: None Mbps'))
+        self.assertEqual(2, output.count('Failed to load test UI.'))
+        self.assertIn('final summary', output)
+
+    def test_run_stops_when_load_failure_budget_is_exhausted(self):
+        output = self.run_main('--iterations', '10', '--load_retries', '1',
+                               '--load_backoff', '0', '--load_failure_budget',
+                               '3')
+
+        self.assertIn('stopping run', output)
+        self.assertNotIn('starting iteration 5', output)
+        self.assertEqual(3, len(self.factory.drivers))
+        # Each test's page load was retried once in the same browser.
+        for driver in self.factory.drivers:
+            self.assertEqual(2, driver.command_counts['get'])
+
+    def test_concurrent_sessions_stop_when_load_failure_budget_is_exhausted(
+            self):
+        output = self.run_main('--iterations', '20', '--sessions', '2',
+                               '--load_failure_budget', '2')
+
+        self.assertIn('stopping run', output)
+        # Each session's driver launches a browser for each of its tests,
+        # and may have started one more test when the other stopped the run.
+        self.assertLessEqual(len(self.factory.drivers), 4)
+
+    def test_load_failures_are_counted_in_metrics(self):
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+        metrics_path = os.path.join(metrics_dir, 'ndt.prom')
+
+        self.run_main('--iterations', '2', '--metrics_file', metrics_path)
+
+        with open(metrics_path) as metrics_file:
+            lines = metrics_file.read().splitlines()
+        self.assertIn('ndt_tests_total 2', lines)
+        self.assertIn('ndt_tests_failed_total{error_type="load_failure"} 2',
+                      lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
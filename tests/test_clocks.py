@@ -0,0 +1,56 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import datetime
+import time
+import unittest
+
+import pytz
+
+from client_wrapper import clocks
+
+
+class SystemClockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = clocks.SystemClock()
+
+    def test_now_is_timezone_aware_utc(self):
+        now = self.clock.now()
+        self.assertEqual(now.tzinfo, pytz.utc)
+        self.assertLess(
+            abs(now - datetime.datetime.now(pytz.utc)),
+            datetime.timedelta(seconds=5))
+
+    def test_monotonic_ns_never_decreases(self):
+        readings = [self.clock.monotonic_ns() for _ in range(1000)]
+        self.assertEqual(readings, sorted(readings))
+
+    def test_monotonic_ns_measures_elapsed_time_in_nanoseconds(self):
+        start_ns = self.clock.monotonic_ns()
+        time.sleep(0.05)
+        elapsed_ns = self.clock.monotonic_ns() - start_ns
+        self.assertGreaterEqual(elapsed_ns, 40000000)
+        self.assertLess(elapsed_ns, 5000000000)
+
+
+class ElapsedNsTest(unittest.TestCase):
+
+    def test_elapsed_ns_subtracts_readings(self):
+        self.assertEqual(250, clocks.elapsed_ns(1000, 1250))
+
+    def test_elapsed_ns_is_none_when_a_reading_is_missing(self):
+        self.assertIsNone(clocks.elapsed_ns(None, 1250))
+        self.assertIsNone(clocks.elapsed_ns(1000, None))
@@ -0,0 +1,87 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import json
+import re
+import unittest
+import urllib2
+
+from client_wrapper import fake_ndt_server
+
+
+class FakeNdtServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = fake_ndt_server.FakeNdtServer(upload_speed='34',
+                                                    upload_speed_units='kb/s')
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def fetch(self, path, data=None):
+        return urllib2.urlopen(self.server.url + path, data)
+
+    def test_page_has_elements_the_driver_depends_on(self):
+        page = self.fetch('').read()
+
+        for element_id in ('websocketButton', 'results', 'upload-speed',
+                           'upload-speed-units', 'download-speed',
+                           'download-speed-units', 'latency'):
+            self.assertIn('id="%s"' % element_id, page)
+        # The driver uses the first element containing each phrase, so each
+        # must appear exactly once.
+        for phrase in ('Start Test', 'your upload speed',
+                       'your download speed'):
+            self.assertEqual(1, page.count(phrase))
+
+    def test_page_displays_configured_values(self):
+        page = self.fetch('?latency=%3Cb%3E&c2s_duration_ms=250').read()
+
+        self.assertIn('<span id="upload-speed">34</span>', page)
+        self.assertIn('<span id="upload-speed-units">kb/s</span>', page)
+        self.assertIn('<span id="latency">&lt;b&gt;</span>', page)
+        settings = json.loads(re.search(r'var settings = (\{.*\});',
+                                        page).group(1))
+        self.assertEqual(
+            {'start_delay_ms': 100,
+             'c2s_duration_ms': 250,
+             's2c_duration_ms': 1000}, settings)
+
+    def test_invalid_settings_are_rejected(self):
+        for query in ('?spin_rate=10', '?c2s_duration_ms=fast',
+                      '?s2c_duration_ms=-1'):
+            with self.assertRaises(urllib2.HTTPError) as context:
+                self.fetch(query)
+            self.assertEqual(400, context.exception.code)
+        with self.assertRaises(ValueError):
+            fake_ndt_server.FakeNdtServer(spin_rate=10)
+
+    def test_unknown_path_is_not_found(self):
+        with self.assertRaises(urllib2.HTTPError) as context:
+            self.fetch('results.html')
+        self.assertEqual(404, context.exception.code)
+
+    def test_reported_timelines_are_recorded(self):
+        timeline = {'start': 1.0,
+                    'c2s_start': 101.5,
+                    's2c_start': 1102.0,
+                    'end': 2103.25}
+
+        self.fetch('timeline', json.dumps(timeline))
+
+        self.assertEqual([timeline], self.server.timelines)
+
+
+if __name__ == '__main__':
+    unittest.main()
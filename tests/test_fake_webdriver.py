@@ -0,0 +1,159 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import unittest
+
+from selenium.common import exceptions
+
+from client_wrapper import fake_webdriver
+from client_wrapper import html5_driver
+
+
+class ManualClock(object):
+    """Clock whose monotonic reading only changes when the test sets it."""
+
+    def __init__(self):
+        self.monotonic_reading_ns = 0
+
+    def monotonic_ns(self):
+        return self.monotonic_reading_ns
+
+
+class FakeWebDriverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = ManualClock()
+        self.driver = fake_webdriver.FakeWebDriver(start_delay_ms=100,
+                                                   c2s_duration_ms=1000,
+                                                   s2c_duration_ms=2000,
+                                                   metrics={'latency': '42'},
+                                                   clock=self.clock)
+        self.driver.get('http://ndt.mock-server.com:7123/')
+        self.upload_text = self.driver.find_elements_by_xpath(
+            "//*[contains(text(), 'your upload speed')]")[0]
+        self.download_text = self.driver.find_elements_by_xpath(
+            "//*[contains(text(), 'your download speed')]")[0]
+        self.results = self.driver.find_element_by_id('results')
+
+    def displayed_elements(self):
+        return [
+            element.is_displayed()
+            for element in (self.upload_text, self.download_text, self.results)
+        ]
+
+    def test_page_follows_scripted_phase_timings(self):
+        self.clock.monotonic_reading_ns = 5000000
+        self.driver.find_elements_by_xpath(
+            "//*[contains(text(), 'Start Test')]")[0].click()
+        self.assertEqual([False, False, False], self.displayed_elements())
+
+        self.clock.monotonic_reading_ns = 105000000
+        self.assertEqual([True, False, False], self.displayed_elements())
+        self.clock.monotonic_reading_ns = 1105000000
+        self.assertEqual([True, True, False], self.displayed_elements())
+        self.assertEqual('', self.driver.find_element_by_id('latency').text)
+        self.clock.monotonic_reading_ns = 3105000000
+        self.assertEqual([True, True, True], self.displayed_elements())
+        self.assertEqual('42', self.driver.find_element_by_id('latency').text)
+        self.assertEqual(
+            'Mb/s', self.driver.find_element_by_id('upload-speed-units').text)
+
+    def test_unknown_elements_are_not_found(self):
+        with self.assertRaises(exceptions.NoSuchElementException):
+            self.driver.find_element_by_id('spinner')
+        self.assertEqual([], self.driver.find_elements_by_xpath(
+            "//*[contains(text(), 'Stop Test')]"))
+
+    def test_injected_failures_are_raised(self):
+        driver = fake_webdriver.FakeWebDriver(
+            failures={'get': exceptions.WebDriverException('mock failure')})
+
+        with self.assertRaises(exceptions.WebDriverException):
+            driver.get('http://ndt.mock-server.com:7123/')
+        self.assertEqual(1, driver.command_counts['get'])
+
+    def test_unrecognized_failure_operation_raises_error(self):
+        with self.assertRaises(ValueError):
+            fake_webdriver.FakeWebDriver(failures={'teleport': Exception()})
+
+
+class NdtHtml5SeleniumDriverWithFakeWebDriverTest(unittest.TestCase):
+
+    def perform_test(self, factory, **kwargs):
+        return html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.mock-server.com:7123/',
+            timeout=1,
+            browser_factory=factory,
+            **kwargs).perform_test()
+
+    def assertSuccessfulResult(self, result):
+        self.assertEqual([], result.errors)
+        self.assertEqual(10.12, result.c2s_result.throughput)
+        self.assertEqual(98.23, result.s2c_result.throughput)
+        self.assertEqual(23.0, result.latency)
+        self.assertEqual('1.0', result.browser_version)
+
+    def test_completes_test_with_polling(self):
+        factory = fake_webdriver.FakeWebDriverFactory()
+
+        self.assertSuccessfulResult(self.perform_test(factory))
+        self.assertEqual(1, len(factory.drivers))
+        self.assertEqual(0, factory.drivers[0].command_counts[
+            'execute_async_script'])
+
+    def test_completes_test_with_observer_and_batch_scrape(self):
+        factory = fake_webdriver.FakeWebDriverFactory(start_delay_ms=50,
+                                                      c2s_duration_ms=10,
+                                                      s2c_duration_ms=20)
+
+        result = self.perform_test(
+            factory,
+            phase_detection=html5_driver.PHASE_DETECTION_OBSERVER,
+            batch_scrape=True)
+
+        self.assertSuccessfulResult(result)
+        self.assertAlmostEqual(10000000,
+                               result.c2s_result.duration_ns,
+                               delta=1000)
+        self.assertAlmostEqual(20000000,
+                               result.s2c_result.duration_ns,
+                               delta=1000)
+        command_counts = factory.drivers[0].command_counts
+        self.assertEqual(1, command_counts['execute_async_script'])
+        self.assertEqual(1, command_counts['execute_script'])
+
+    def test_injected_load_failure_is_recorded(self):
+        factory = fake_webdriver.FakeWebDriverFactory(
+            failures={'get': exceptions.WebDriverException('mock failure')})
+
+        result = self.perform_test(factory)
+
+        self.assertEqual(['Failed to load test UI.'],
+                         [error.message for error in result.errors])
+
+    def test_injected_timeout_is_recorded(self):
+        factory = fake_webdriver.FakeWebDriverFactory(
+            failures={'is_displayed': exceptions.TimeoutException()})
+
+        result = self.perform_test(factory)
+
+        self.assertEqual(
+            ['Test did not complete within timeout period.'],
+            [error.message for error in result.errors])
+
+
+if __name__ == '__main__':
+    unittest.main()
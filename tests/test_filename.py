@@ -94,3 +94,115 @@ class FilenamesTest(unittest.TestCase):
                                 client=names.NDT_HTML5,
                                 start_time=datetime.datetime(2015, 9, 17, 8, 9,
                                                              49, 0, pytz.utc))
+
+    def test_raises_error_on_result_without_browser_version(self):
+        # Drivers that do not report a browser version leave it as None.
+        with self.assertRaises(filename.FilenameCreationError):
+            get_result_filename(os='Ubuntu',
+                                os_version='14.04',
+                                browser=names.FIREFOX,
+                                browser_version=None,
+                                client=names.NDT_HTML5,
+                                start_time=datetime.datetime(2015, 9, 17, 8, 9,
+                                                             49, 0, pytz.utc))
+
+    def test_raises_error_on_result_without_start_time(self):
+        with self.assertRaises(filename.FilenameCreationError):
+            get_result_filename(os='Ubuntu',
+                                os_version='14.04',
+                                browser=names.FIREFOX,
+                                browser_version='45.0',
+                                client=names.NDT_HTML5,
+                                start_time=None)
+
+
+def create_ndt_result(os, os_version, browser, browser_version, start_time):
+    result = results.NdtResult(start_time=start_time)
+    result.os = os
+    result.os_version = os_version
+    result.client = names.NDT_HTML5
+    result.browser = browser
+    result.browser_version = browser_version
+    return result
+
+
+class BulkFilenamesTest(unittest.TestCase):
+
+    def test_creates_same_filenames_as_single_result_function(self):
+        ndt_results = []
+        for second in range(3):
+            for microsecond in (0, 500000):
+                ndt_results.append(create_ndt_result(
+                    'Windows', '10.0', names.CHROME, '49.0.2623',
+                    datetime.datetime(2016, 2, 26, 15, 54, second, microsecond,
+                                      pytz.utc)))
+                ndt_results.append(create_ndt_result(
+                    'OSX', '10.11', names.SAFARI, '9.0.3', datetime.datetime(
+                        2017, 3, 29, 4, 21, second, microsecond, pytz.utc)))
+
+        filenames, failures = filename.create_result_filenames(ndt_results)
+
+        self.assertEqual([], failures)
+        self.assertEqual(
+            [filename.create_result_filename(r)
+             for r in ndt_results], filenames)
+        self.assertEqual(
+            'osx10.11-safari9-ndt_js-2017-03-29T042102Z-results.json',
+            filenames[-1])
+
+    def test_reports_failures_without_aborting_batch(self):
+        start_time = datetime.datetime(2016, 2, 26, 15, 54, 23, 0, pytz.utc)
+        ndt_results = [
+            create_ndt_result('invalid OS', '14.04', names.FIREFOX, '45.0',
+                              start_time),
+            create_ndt_result('Ubuntu', '14.04', names.FIREFOX, '45.0',
+                              start_time),
+            create_ndt_result('Ubuntu', '14.04', None, None, start_time),
+            create_ndt_result('Ubuntu', '14.04', names.FIREFOX, '45.0', None),
+            create_ndt_result('invalid OS', '14.04', names.FIREFOX, '45.0',
+                              start_time),
+        ]
+
+        filenames, failures = filename.create_result_filenames(ndt_results)
+
+        self.assertEqual(
+            [None,
+             'ubuntu14.04-firefox45-ndt_js-2016-02-26T155423Z-results.json',
+             None, None, None], filenames)
+        self.assertEqual([0, 2, 3, 4], [index for index, _ in failures])
+        self.assertIsInstance(failures[0][1], filename.FilenameCreationError)
+        self.assertIsInstance(failures[1][1], NotImplementedError)
+        self.assertIsInstance(failures[2][1], filename.FilenameCreationError)
+
+    def test_timestamps_use_each_result_timezone(self):
+        eastern = pytz.timezone('US/Eastern')
+        ndt_results = [
+            create_ndt_result('Ubuntu', '14.04', names.FIREFOX, '45.0',
+                              datetime.datetime(2016, 2, 26, 15, 54, 23, 0,
+                                                pytz.utc)),
+            create_ndt_result(
+                'Ubuntu', '14.04', names.FIREFOX, '45.0',
+                eastern.localize(datetime.datetime(2016, 2, 26, 10, 54, 23))),
+        ]
+
+        filenames, _ = filename.create_result_filenames(ndt_results)
+
+        self.assertEqual(
+            [filename.create_result_filename(r)
+             for r in ndt_results], filenames)
+
+    def test_creates_result_shard(self):
+        result = create_ndt_result(
+            'Windows', '10.0', names.CHROME, '49.0.2623',
+            datetime.datetime(2016, 2, 6, 15, 54, 23, 0, pytz.utc))
+
+        self.assertEqual(
+            ('win10', 'chrome49', '2016', '02', '06'),
+            filename.create_result_shard(result))
+
+    def test_result_shard_without_start_time_raises_error(self):
+        result = create_ndt_result('Windows', '10.0', names.CHROME, '49.0.2623',
+                                   None)
+
+        with self.assertRaises(filename.FilenameCreationError):
+            filename.create_result_shard(result)
@@ -19,7 +19,66 @@ import pytz
 import freezegun
 import selenium.webdriver.support.expected_conditions as selenium_expected_conditions
 from selenium.common import exceptions
+from client_wrapper import adaptive_timeout
+from client_wrapper import browser_launch
+from client_wrapper import fake_webdriver
 from client_wrapper import html5_driver
+from client_wrapper import instrumentation
+from client_wrapper import retry
+
+
+class FakeClock(object):
+    """Clock whose readings advance by a fixed step each time it is read."""
+
+    def __init__(self, step_ns):
+        self._step_ns = step_ns
+        self._monotonic_ns = 0
+        self._now = datetime.datetime(2016, 1, 1, tzinfo=pytz.utc)
+
+    def now(self):
+        self._now += datetime.timedelta(microseconds=self._step_ns // 1000)
+        return self._now
+
+    def monotonic_ns(self):
+        self._monotonic_ns += self._step_ns
+        return self._monotonic_ns
+
+
+def find_metric_element(id):
+    """Returns a mock results page element, as if the test succeeded."""
+    if id.endswith('-units'):
+        return mock.Mock(text='Mb/s')
+    return mock.Mock(text='34')
+
+
+def create_mock_browser():
+    """Creates a mock browser whose results page reports valid metrics."""
+    browser = mock.MagicMock()
+    browser.find_element_by_id.side_effect = find_metric_element
+    return browser
+
+
+class MockFirefoxTestCase(unittest.TestCase):
+    """Base class of tests that run drivers against a mock Firefox browser.
+
+    Launching Firefox returns self.mock_browser, a MagicMock whose results page
+    reports valid metrics, and every element the driver waits for is visible.
+    """
+
+    def setUp(self):
+        self.mock_browser = create_mock_browser()
+        firefox_patcher = mock.patch.object(html5_driver.webdriver,
+                                            'Firefox',
+                                            autospec=True,
+                                            return_value=self.mock_browser)
+        self.mock_firefox = firefox_patcher.start()
+        self.addCleanup(firefox_patcher.stop)
+
+        visibility_patcher = mock.patch.object(selenium_expected_conditions,
+                                               'visibility_of',
+                                               autospec=True)
+        visibility_patcher.start()
+        self.addCleanup(visibility_patcher.stop)
 
 
 class NdtHtml5SeleniumDriverGeneralTest(unittest.TestCase):
@@ -74,6 +133,28 @@ class NdtHtml5SeleniumDriverGeneralTest(unittest.TestCase):
         self.assertEqual(test_results.errors[0].message,
                          'Test did not complete within timeout period.')
 
+    def test_result_metadata_is_populated(self):
+        self.mock_browser.capabilities = {'browserName': 'firefox',
+                                          'version': '45.0'}
+        self.mock_browser.get.side_effect = exceptions.WebDriverException(
+            u'Failed to load test UI.')
+        with mock.patch.object(html5_driver.platform,
+                               'system',
+                               return_value='Windows'), mock.patch.object(
+                                   html5_driver.platform,
+                                   'version',
+                                   return_value='10.0.10586'):
+            test_results = html5_driver.NdtHtml5SeleniumDriver(
+                browser='firefox',
+                url='http://ndt.mock-server.com:7123/',
+                timeout=1).perform_test()
+
+        self.assertEqual('ndt_js', test_results.client)
+        self.assertEqual('firefox', test_results.browser)
+        self.assertEqual('45.0', test_results.browser_version)
+        self.assertEqual('Windows', test_results.os)
+        self.assertEqual('10.0', test_results.os_version)
+
     def test_unrecognized_browser_raises_error(self):
         selenium_driver = html5_driver.NdtHtml5SeleniumDriver(
             browser='not_a_browser',
@@ -705,5 +786,645 @@ class NdtHtml5SeleniumDriverCustomClassTest(unittest.TestCase):
                                            tzinfo=pytz.utc))
 
 
+class NdtHtml5SeleniumDriverPersistentSessionTest(MockFirefoxTestCase):
+
+    def setUp(self):
+        super(NdtHtml5SeleniumDriverPersistentSessionTest, self).setUp()
+        # Each launched browser is a fresh mock browser.
+        self.launched_browsers = []
+
+        def launch_browser(**kwargs):
+            browser = create_mock_browser()
+            self.launched_browsers.append(browser)
+            return browser
+
+        self.mock_firefox.side_effect = launch_browser
+
+    def create_driver(self, max_tests_per_session=None):
+        return html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.mock-server.com:7123/',
+            timeout=1,
+            persistent_session=True,
+            max_tests_per_session=max_tests_per_session)
+
+    def test_browser_is_reused_across_tests(self):
+        selenium_driver = self.create_driver()
+        for _ in range(3):
+            test_results = selenium_driver.perform_test()
+            self.assertEqual(len(test_results.errors), 0)
+
+        self.assertEqual(len(self.launched_browsers), 1)
+        self.assertEqual(selenium_driver.browser_launches, 1)
+        self.assertEqual(selenium_driver.browser_reuses, 2)
+        # The browser stays open until the driver is closed.
+        self.assertFalse(self.launched_browsers[0].close.called)
+        selenium_driver.close()
+        self.launched_browsers[0].close.assert_called_once_with()
+
+    def test_page_state_is_reset_between_tests(self):
+        selenium_driver = self.create_driver()
+        selenium_driver.perform_test()
+
+        browser = self.launched_browsers[0]
+        self.assertTrue(browser.execute_script.called)
+        browser.delete_all_cookies.assert_called_once_with()
+        self.assertEqual(browser.get.call_args_list[-1],
+                         mock.call('about:blank'))
+
+    def test_browser_is_relaunched_after_max_tests_per_session(self):
+        selenium_driver = self.create_driver(max_tests_per_session=2)
+        for _ in range(5):
+            selenium_driver.perform_test()
+        selenium_driver.close()
+
+        self.assertEqual(len(self.launched_browsers), 3)
+        for browser in self.launched_browsers:
+            browser.close.assert_called_once_with()
+
+    def test_browser_is_relaunched_after_a_failed_test(self):
+        selenium_driver = self.create_driver()
+        selenium_driver.perform_test()
+        self.launched_browsers[0].get.side_effect = (
+            exceptions.WebDriverException(u'Failed to load test UI.'))
+
+        test_results = selenium_driver.perform_test()
+        self.assertEqual(test_results.errors[0].message,
+                         'Failed to load test UI.')
+        self.launched_browsers[0].close.assert_called_once_with()
+
+        selenium_driver.perform_test()
+        self.assertEqual(len(self.launched_browsers), 2)
+
+    def test_browser_is_relaunched_when_page_reset_fails(self):
+        selenium_driver = self.create_driver()
+        selenium_driver.perform_test()
+        self.launched_browsers[0].delete_all_cookies.side_effect = (
+            exceptions.WebDriverException(u'Browser has gone away.'))
+
+        selenium_driver.perform_test()
+        self.launched_browsers[0].close.assert_called_once_with()
+        selenium_driver.perform_test()
+        self.assertEqual(len(self.launched_browsers), 2)
+
+    def test_startup_time_saved_is_based_on_mean_launch_time(self):
+        # Every reading of the monotonic clock advances it by 4 seconds, so
+        # each browser launch takes 4 seconds.
+        selenium_driver = html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.mock-server.com:7123/',
+            timeout=1,
+            persistent_session=True,
+            clock=FakeClock(step_ns=4000000000))
+        for _ in range(3):
+            selenium_driver.perform_test()
+
+        self.assertEqual(selenium_driver.startup_time_saved, 8.0)
+
+    def test_launch_time_is_recorded_for_tests_that_launch_a_browser(self):
+        # Every reading of the monotonic clock advances it by 4 seconds.
+        selenium_driver = html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.mock-server.com:7123/',
+            timeout=1,
+            persistent_session=True,
+            clock=FakeClock(step_ns=4000000000))
+        first_result = selenium_driver.perform_test()
+        second_result = selenium_driver.perform_test()
+
+        self.assertEqual(first_result.browser_launch_ns, 4000000000)
+        self.assertIsNone(second_result.browser_launch_ns)
+
+    def test_launch_options_configure_the_browser(self):
+        selenium_driver = html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.mock-server.com:7123/',
+            timeout=1,
+            launch_options=browser_launch.LaunchOptions(
+                minimal_profile=True,
+                page_load_strategy=browser_launch.PAGE_LOAD_NONE))
+        selenium_driver.perform_test()
+
+        _, kwargs = html5_driver.webdriver.Firefox.call_args
+        self.assertEqual(kwargs['capabilities']['pageLoadStrategy'], 'none')
+        self.assertIn('firefox_profile', kwargs)
+
+    def test_non_persistent_driver_reports_no_startup_time_saved(self):
+        selenium_driver = html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.mock-server.com:7123/',
+            timeout=1)
+        selenium_driver.perform_test()
+        selenium_driver.perform_test()
+
+        self.assertEqual(len(self.launched_browsers), 2)
+        self.assertEqual(selenium_driver.browser_reuses, 0)
+        self.assertEqual(selenium_driver.startup_time_saved, 0.0)
+
+
+class NdtHtml5SeleniumDriverPhaseObserverTest(MockFirefoxTestCase):
+
+    def setUp(self):
+        super(NdtHtml5SeleniumDriverPhaseObserverTest, self).setUp()
+        self.mock_wait = mock.patch.object(html5_driver.ui,
+                                           'WebDriverWait',
+                                           autospec=True)
+        self.addCleanup(self.mock_wait.stop)
+        self.mock_wait.start()
+
+    def perform_test(self):
+        selenium_driver = html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.mock-server.com:7123/',
+            timeout=20,
+            phase_detection=html5_driver.PHASE_DETECTION_OBSERVER)
+        return selenium_driver.perform_test()
+
+    def test_phase_times_are_derived_from_browser_timeline(self):
+        self.mock_browser.execute_async_script.return_value = {
+            'installed': 1000.0,
+            'c2s_start': 1500.0,
+            's2c_start': 11500.0,
+            'end': 21500.25,
+            'timed_out': False
+        }
+        click_time = datetime.datetime(2016, 1, 1, 8, 0, 0, tzinfo=pytz.utc)
+        installed_time = datetime.datetime(2016, 1, 1, 8, 0, 1, tzinfo=pytz.utc)
+        with mock.patch.object(html5_driver.datetime,
+                               'datetime',
+                               autospec=True) as mocked_datetime:
+            mocked_datetime.now.side_effect = [click_time, installed_time]
+            test_results = self.perform_test()
+
+        self.assertEqual(len(test_results.errors), 0)
+        self.assertEqual(test_results.start_time, click_time)
+        self.assertEqual(test_results.c2s_result.start_time,
+                         installed_time + datetime.timedelta(seconds=0.5))
+        self.assertEqual(test_results.c2s_result.end_time,
+                         installed_time + datetime.timedelta(seconds=10.5))
+        self.assertEqual(test_results.s2c_result.start_time,
+                         installed_time + datetime.timedelta(seconds=10.5))
+        self.assertEqual(
+            test_results.s2c_result.end_time,
+            installed_time + datetime.timedelta(seconds=20,
+                                                microseconds=500250))
+        self.assertEqual(test_results.end_time,
+                         test_results.s2c_result.end_time)
+        # Durations come from the browser's high-resolution clock.
+        self.assertEqual(test_results.c2s_result.duration_ns, 10000000000)
+        self.assertEqual(test_results.s2c_result.duration_ns, 10000250000)
+        # The timeline is gathered in one script call, without polling.
+        self.assertEqual(self.mock_browser.execute_async_script.call_count, 1)
+        self.assertFalse(html5_driver.ui.WebDriverWait.called)
+        # And metrics are still scraped from the results page
+        self.assertEqual(test_results.c2s_result.throughput, 34.0)
+        self.assertEqual(test_results.s2c_result.throughput, 34.0)
+
+    def test_observer_timeout_records_partial_timeline_and_error(self):
+        self.mock_browser.execute_async_script.return_value = {
+            'installed': 1000.0,
+            'c2s_start': 1500.0,
+            'timed_out': True
+        }
+        test_results = self.perform_test()
+
+        self.assertIsNotNone(test_results.c2s_result.start_time)
+        self.assertIsNone(test_results.c2s_result.end_time)
+        self.assertIsNone(test_results.s2c_result)
+        self.assertIsNone(test_results.end_time)
+        self.assertEqual(len(test_results.errors), 1)
+        self.assertEqual(test_results.errors[0].message,
+                         'Test did not complete within timeout period.')
+
+    def test_script_timeout_records_error(self):
+        self.mock_browser.execute_async_script.side_effect = (
+            exceptions.TimeoutException)
+        test_results = self.perform_test()
+
+        self.assertIsNone(test_results.c2s_result)
+        self.assertEqual(len(test_results.errors), 1)
+        self.assertEqual(test_results.errors[0].message,
+                         'Test did not complete within timeout period.')
+
+    def test_falls_back_to_polling_when_script_fails(self):
+        self.mock_browser.execute_async_script.side_effect = (
+            exceptions.WebDriverException(u'MutationObserver is not defined'))
+        test_results = self.perform_test()
+
+        self.assertTrue(html5_driver.ui.WebDriverWait.called)
+        self.assertEqual(len(test_results.errors), 0)
+        self.assertEqual(test_results.c2s_result.throughput, 34.0)
+
+
+class NdtHtml5SeleniumDriverBatchScrapeTest(MockFirefoxTestCase):
+
+    def perform_test(self):
+        selenium_driver = html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.mock-server.com:7123/',
+            timeout=1,
+            batch_scrape=True)
+        return selenium_driver.perform_test()
+
+    def metric_element_lookups(self):
+        """Returns the IDs of metric elements looked up individually."""
+        looked_up_ids = [
+            call[0][0]
+            for call in self.mock_browser.find_element_by_id.call_args_list
+        ]
+        return [id
+                for id in looked_up_ids
+                if id not in ('websocketButton', 'results')]
+
+    def test_metrics_are_read_in_one_script_call(self):
+        self.mock_browser.execute_script.return_value = {
+            'upload-speed': '72',
+            'upload-speed-units': 'kb/s',
+            'download-speed': '1.5',
+            'download-speed-units': 'Gb/s',
+            'latency': '23'
+        }
+        test_results = self.perform_test()
+
+        self.assertEqual(self.mock_browser.execute_script.call_count, 1)
+        self.assertEqual([], self.metric_element_lookups())
+        self.assertEqual(test_results.c2s_result.throughput, 0.072)
+        self.assertEqual(test_results.s2c_result.throughput, 1500.0)
+        self.assertEqual(test_results.latency, 23.0)
+        self.assertEqual(len(test_results.errors), 0)
+
+    def test_batched_metrics_are_validated(self):
+        self.mock_browser.execute_script.return_value = {
+            'upload-speed': '72',
+            'upload-speed-units': 'Mb/s',
+            'download-speed': '34',
+            'download-speed-units': 'Mb/s',
+            'latency': 'Non-numeric value'
+        }
+        test_results = self.perform_test()
+
+        self.assertIsNone(test_results.latency)
+        self.assertEqual(len(test_results.errors), 1)
+        self.assertEqual(test_results.errors[0].message,
+                         'illegal value shown for latency: Non-numeric value')
+
+    def test_falls_back_to_element_lookups_when_script_fails(self):
+        self.mock_browser.execute_script.side_effect = (
+            exceptions.WebDriverException(u'javascript error'))
+        test_results = self.perform_test()
+
+        self.assertEqual(len(self.metric_element_lookups()), 5)
+        self.assertEqual(test_results.c2s_result.throughput, 34.0)
+        self.assertEqual(test_results.s2c_result.throughput, 34.0)
+        self.assertEqual(len(test_results.errors), 0)
+
+    def test_falls_back_to_element_lookups_when_element_is_missing(self):
+        # The script returns null if any metric element is missing.
+        self.mock_browser.execute_script.return_value = None
+        test_results = self.perform_test()
+
+        self.assertEqual(len(self.metric_element_lookups()), 5)
+        self.assertEqual(test_results.latency, 34.0)
+        self.assertEqual(len(test_results.errors), 0)
+
+
+class NdtHtml5SeleniumDriverMonotonicTimingTest(MockFirefoxTestCase):
+
+    def test_phase_durations_are_measured_with_injected_clock(self):
+        mock_clock = mock.Mock()
+        mock_clock.now.return_value = datetime.datetime(2016,
+                                                        1,
+                                                        1,
+                                                        tzinfo=pytz.utc)
+        # Readings are taken at browser launch start and end, test start, c2s
+        # start, s2c start, and when the results are displayed.
+        mock_clock.monotonic_ns.side_effect = [0, 2000000000, 2000000000,
+                                               2500000000, 12500000123,
+                                               22600000123]
+
+        test_results = html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.mock-server.com:7123/',
+            timeout=1,
+            clock=mock_clock).perform_test()
+
+        self.assertEqual(len(test_results.errors), 0)
+        self.assertEqual(test_results.c2s_result.duration_ns, 10000000123)
+        self.assertEqual(test_results.s2c_result.duration_ns, 10100000000)
+        self.assertEqual(test_results.duration_ns, 20600000123)
+
+    def test_phase_durations_are_none_when_test_times_out(self):
+        with mock.patch.object(html5_driver.ui,
+                               'WebDriverWait',
+                               side_effect=exceptions.TimeoutException,
+                               autospec=True):
+            test_results = html5_driver.NdtHtml5SeleniumDriver(
+                browser='firefox',
+                url='http://ndt.mock-server.com:7123/',
+                timeout=1).perform_test()
+
+        self.assertIsNone(test_results.c2s_result.duration_ns)
+        self.assertIsNone(test_results.s2c_result)
+        self.assertIsNone(test_results.duration_ns)
+
+
+class NdtHtml5SeleniumDriverPrewarmTest(unittest.TestCase):
+
+    def create_driver(self, browser_factory, **kwargs):
+        return html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.fake/',
+            timeout=1,
+            browser_factory=browser_factory,
+            prewarm=True,
+            **kwargs)
+
+    def test_each_test_after_the_first_runs_in_a_prewarmed_browser(self):
+        factory = fake_webdriver.FakeWebDriverFactory()
+        selenium_driver = self.create_driver(factory)
+        for _ in range(3):
+            test_results = selenium_driver.perform_test()
+            self.assertEqual(len(test_results.errors), 0)
+            self.assertIsNotNone(test_results.browser_launch_ns)
+
+        self.assertEqual(selenium_driver.prewarmed_tests, 2)
+        self.assertEqual(selenium_driver.browser_launches, 3)
+        # The browser prewarmed during the last test is closed with the
+        # driver.
+        selenium_driver.close()
+        self.assertEqual(len(factory.drivers), 4)
+        for fake_driver in factory.drivers:
+            self.assertEqual(fake_driver.command_counts['close'], 1)
+
+    def test_observer_phase_detection_prewarms_browser(self):
+        factory = fake_webdriver.FakeWebDriverFactory()
+        selenium_driver = self.create_driver(
+            factory,
+            phase_detection=html5_driver.PHASE_DETECTION_OBSERVER)
+        selenium_driver.perform_test()
+        selenium_driver.perform_test()
+        selenium_driver.close()
+
+        self.assertEqual(selenium_driver.prewarmed_tests, 1)
+
+    def test_failed_prewarm_is_retried_before_the_next_test(self):
+        browsers = [fake_webdriver.FakeWebDriver(),
+                    exceptions.WebDriverException(u'Failed to launch.'),
+                    fake_webdriver.FakeWebDriver(),
+                    fake_webdriver.FakeWebDriver()]
+        browser_factory = mock.Mock(side_effect=browsers)
+        selenium_driver = self.create_driver(browser_factory)
+        selenium_driver.perform_test()
+        test_results = selenium_driver.perform_test()
+        selenium_driver.close()
+
+        self.assertEqual(len(test_results.errors), 0)
+        self.assertEqual(selenium_driver.prewarmed_tests, 0)
+        # The second test also prewarms a browser, which close() discards.
+        self.assertEqual(browser_factory.call_count, 4)
+
+    def test_test_that_fails_early_does_not_prewarm(self):
+        factory = fake_webdriver.FakeWebDriverFactory(
+            failures={'get': exceptions.WebDriverException(u'Failed.')})
+        selenium_driver = self.create_driver(factory)
+        selenium_driver.perform_test()
+        selenium_driver.close()
+
+        self.assertEqual(len(factory.drivers), 1)
+
+    def test_prewarm_cannot_be_used_with_persistent_session(self):
+        with self.assertRaises(ValueError):
+            self.create_driver(fake_webdriver.FakeWebDriverFactory(),
+                               persistent_session=True)
+
+
+class RecordingHooks(instrumentation.PhaseHooks):
+
+    def __init__(self):
+        self.events = []
+
+    def phase_started(self, phase, monotonic_ns):
+        self.events.append(('start', phase))
+
+    def phase_ended(self, phase, monotonic_ns):
+        self.events.append(('end', phase))
+
+
+class NdtHtml5SeleniumDriverInstrumentationTest(unittest.TestCase):
+
+    def create_driver(self, browser_factory, **kwargs):
+        return html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.fake/',
+            timeout=1,
+            browser_factory=browser_factory,
+            **kwargs)
+
+    def test_spans_are_collected_for_each_phase(self):
+        selenium_driver = self.create_driver(
+            fake_webdriver.FakeWebDriverFactory(),
+            collect_spans=True)
+        test_results = selenium_driver.perform_test()
+
+        self.assertEqual(len(test_results.errors), 0)
+        self.assertEqual(
+            [instrumentation.PHASE_LOAD_URL, instrumentation.PHASE_CLICK_START,
+             instrumentation.PHASE_TEST_IN_PROGRESS,
+             instrumentation.PHASE_SCRAPE_METRICS],
+            [span.phase for span in test_results.spans])
+        load_url, click_start, _, scrape_metrics = test_results.spans
+        self.assertEqual(0, load_url.start_offset_ns)
+        self.assertEqual({'get': 1}, load_url.command_counts)
+        self.assertEqual(2, click_start.command_counts['click'])
+        self.assertIn('find_element_by_id', scrape_metrics.command_counts)
+        self.assertIn('text', scrape_metrics.command_counts)
+        for span in test_results.spans:
+            self.assertIsNotNone(span.duration_ns)
+            self.assertEqual(
+                set(span.command_counts), set(span.command_durations_ns))
+
+    def test_hooks_see_phase_that_failed(self):
+        hooks = RecordingHooks()
+        selenium_driver = self.create_driver(
+            fake_webdriver.FakeWebDriverFactory(
+                failures={'get': exceptions.WebDriverException(u'Failed.')}),
+            hooks=[hooks])
+        test_results = selenium_driver.perform_test()
+
+        self.assertEqual(len(test_results.errors), 1)
+        self.assertIsNone(test_results.spans)
+        self.assertEqual(
+            [('start', instrumentation.PHASE_LOAD_URL),
+             ('end', instrumentation.PHASE_LOAD_URL)], hooks.events)
+
+    def test_spans_are_not_collected_by_default(self):
+        test_results = self.create_driver(fake_webdriver.FakeWebDriverFactory(
+        )).perform_test()
+
+        self.assertIsNone(test_results.spans)
+
+
+class FlakyWebDriver(fake_webdriver.FakeWebDriver):
+    """Fake driver whose first page loads fail."""
+
+    def __init__(self, failed_loads):
+        super(FlakyWebDriver, self).__init__()
+        self._failed_loads = failed_loads
+
+    def get(self, url):
+        if self._failed_loads:
+            self._failed_loads -= 1
+            raise exceptions.WebDriverException(u'Failed to connect.')
+        super(FlakyWebDriver, self).get(url)
+
+
+class NdtHtml5SeleniumDriverLoadRetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.waits = []
+        self.retry_policy = retry.RetryPolicy(max_retries=2,
+                                              initial_backoff=1.0,
+                                              jitter=0,
+                                              sleep=self.waits.append)
+
+    def create_driver(self, browsers, **kwargs):
+        return html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.fake/',
+            timeout=1,
+            browser_factory=mock.Mock(side_effect=browsers),
+            **kwargs)
+
+    def test_failed_load_is_retried_in_same_browser(self):
+        browser = FlakyWebDriver(failed_loads=2)
+        test_results = self.create_driver(
+            [browser],
+            load_retry_policy=self.retry_policy).perform_test()
+
+        self.assertEqual(len(test_results.errors), 0)
+        self.assertEqual(test_results.load_retries, 2)
+        self.assertEqual(test_results.load_backoff_ns, 3000000000)
+        self.assertEqual(self.waits, [1.0, 2.0])
+        self.assertEqual(browser.command_counts['get'], 1)
+
+    def test_load_fails_once_retries_are_used_up(self):
+        test_results = self.create_driver(
+            [FlakyWebDriver(failed_loads=3)],
+            load_retry_policy=self.retry_policy).perform_test()
+
+        self.assertEqual(len(test_results.errors), 1)
+        self.assertEqual(test_results.errors[0].message,
+                         'Failed to load test UI.')
+        self.assertEqual(test_results.load_retries, 2)
+        self.assertIsNone(test_results.c2s_result)
+
+    def test_load_retries_are_not_recorded_without_policy(self):
+        test_results = self.create_driver([FlakyWebDriver(failed_loads=1)
+                                          ]).perform_test()
+
+        self.assertEqual(len(test_results.errors), 1)
+        self.assertIsNone(test_results.load_retries)
+        self.assertIsNone(test_results.load_backoff_ns)
+
+    def test_exhausted_failure_budget_stops_tests(self):
+        browsers = [FlakyWebDriver(failed_loads=1),
+                    FlakyWebDriver(failed_loads=0),
+                    FlakyWebDriver(failed_loads=1),
+                    FlakyWebDriver(failed_loads=1)]
+        selenium_driver = self.create_driver(browsers, load_failure_budget=2)
+        for _ in range(4):
+            selenium_driver.perform_test()
+
+        # A successful load resets the count of consecutive failures.
+        with self.assertRaises(html5_driver.FailureBudgetExhaustedError):
+            selenium_driver.perform_test()
+        self.assertEqual(selenium_driver.browser_launches, 4)
+
+
+class NdtHtml5SeleniumDriverAdaptiveTimeoutTest(unittest.TestCase):
+
+    def setUp(self):
+        self.history = adaptive_timeout.TimeoutHistory()
+        self.timeout_policy = adaptive_timeout.AdaptiveTimeouts(
+            self.history,
+            default_timeout=20,
+            min_samples=1,
+            margin=1,
+            floor=2)
+
+    def create_driver(self, browser_factory, **kwargs):
+        return html5_driver.NdtHtml5SeleniumDriver(
+            browser='firefox',
+            url='http://ndt.fake/',
+            timeout=1,
+            browser_factory=browser_factory,
+            **kwargs)
+
+    def test_fixed_timeout_is_recorded_for_each_phase(self):
+        test_results = self.create_driver(fake_webdriver.FakeWebDriverFactory(
+        )).perform_test()
+
+        self.assertEqual(
+            {'start': 1000000000,
+             'c2s': 1000000000,
+             's2c': 1000000000}, test_results.phase_timeouts_ns)
+
+    def test_timeouts_are_learned_from_earlier_tests(self):
+        self.history.add('http://ndt.fake/', 'c2s', 9.0)
+        selenium_driver = self.create_driver(
+            fake_webdriver.FakeWebDriverFactory(),
+            timeout_policy=self.timeout_policy)
+        test_results = selenium_driver.perform_test()
+
+        self.assertEqual(len(test_results.errors), 0)
+        self.assertEqual(
+            {'start': 20000000000,
+             'c2s': 10000000000,
+             's2c': 20000000000}, test_results.phase_timeouts_ns)
+        # The fake test's phases take no time, so the floor applies.
+        self.assertEqual({'start': 2,
+                          'c2s': 10.0,
+                          's2c': 2},
+                         self.timeout_policy.timeouts('http://ndt.fake/'))
+        self.assertEqual(2,
+                         len(self.history.durations('http://ndt.fake/', 'c2s')))
+
+    def test_observer_gets_per_phase_timeouts(self):
+        self.history.add('http://ndt.fake/', 'c2s', 9.0)
+        browser = fake_webdriver.FakeWebDriver()
+        with mock.patch.object(browser,
+                               'execute_async_script',
+                               wraps=browser.execute_async_script):
+            self.create_driver(
+                mock.Mock(return_value=browser),
+                timeout_policy=self.timeout_policy,
+                phase_detection=
+                html5_driver.PHASE_DETECTION_OBSERVER).perform_test()
+
+            _, timeouts_ms = browser.execute_async_script.call_args[0]
+        self.assertEqual([20000, 10000, 20000], timeouts_ms)
+
+    def test_timed_out_phase_is_added_to_history_at_its_timeout(self):
+        test_results = self.create_driver(
+            fake_webdriver.FakeWebDriverFactory(
+                failures={'is_displayed': exceptions.TimeoutException()}),
+            timeout_policy=self.timeout_policy).perform_test()
+
+        self.assertEqual('start', test_results.timed_out_phase)
+        self.assertEqual([20.0],
+                         self.history.durations('http://ndt.fake/', 'start'))
+        self.assertEqual(1,
+                         self.history.consecutive_timeouts('http://ndt.fake/',
+                                                           'start'))
+        self.assertEqual([], self.history.durations('http://ndt.fake/', 'c2s'))
+
+    def test_failed_test_is_not_added_to_history(self):
+        self.create_driver(
+            fake_webdriver.FakeWebDriverFactory(metrics={'latency': 'x'}),
+            timeout_policy=self.timeout_policy).perform_test()
+
+        self.assertEqual([], self.history.durations('http://ndt.fake/', 'c2s'))
+
+
 if __name__ == '__main__':
     unittest.main()
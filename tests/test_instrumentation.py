@@ -0,0 +1,136 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import unittest
+
+import mock
+
+from client_wrapper import instrumentation
+
+
+class SteppingClock(object):
+    """Monotonic clock that advances by a fixed step on every reading."""
+
+    def __init__(self, step_ns):
+        self._step_ns = step_ns
+        self._reading_ns = 0
+
+    def monotonic_ns(self):
+        self._reading_ns += self._step_ns
+        return self._reading_ns
+
+
+class FakeElement(object):
+
+    def __init__(self, text):
+        self.text = text
+
+    def click(self):
+        pass
+
+
+class FakeBrowser(object):
+
+    capabilities = {'version': '45.0'}
+
+    def find_element_by_id(self, element_id):
+        return FakeElement(element_id)
+
+    def find_elements_by_xpath(self, xpath):
+        return [FakeElement(xpath), FakeElement(xpath)]
+
+    def get(self, url):
+        raise ValueError('unreachable')
+
+
+class SpanCollectorTest(unittest.TestCase):
+
+    def test_records_span_per_phase_with_command_totals(self):
+        collector = instrumentation.SpanCollector()
+        collector.phase_started('load_url', 1000)
+        collector.command_completed('get', 300)
+        collector.command_completed('get', 200)
+        collector.phase_ended('load_url', 1800)
+        collector.command_completed('quit', 50)
+        collector.phase_started('click_start', 2000)
+        collector.command_completed('click', 100)
+        collector.phase_ended('click_start', 2500)
+
+        load_url, click_start = collector.spans
+        self.assertEqual(
+            ('load_url', 0, 800), (load_url.phase, load_url.start_offset_ns,
+                                   load_url.duration_ns))
+        self.assertEqual({'get': 2}, load_url.command_counts)
+        self.assertEqual({'get': 500}, load_url.command_durations_ns)
+        self.assertEqual(
+            ('click_start', 1000, 500), (click_start.phase,
+                                         click_start.start_offset_ns,
+                                         click_start.duration_ns))
+        # Commands between phases are not attributed to any span.
+        self.assertEqual({'click': 1}, click_start.command_counts)
+
+
+class HookDispatcherTest(unittest.TestCase):
+
+    def test_delivers_events_to_every_hook(self):
+        hooks = [mock.Mock(spec=instrumentation.PhaseHooks) for _ in range(2)]
+        dispatcher = instrumentation.HookDispatcher(hooks)
+        dispatcher.phase_started('load_url', 10)
+        dispatcher.command_completed('get', 5)
+        dispatcher.phase_ended('load_url', 20)
+
+        for hook in hooks:
+            hook.phase_started.assert_called_once_with('load_url', 10)
+            hook.command_completed.assert_called_once_with('get', 5)
+            hook.phase_ended.assert_called_once_with('load_url', 20)
+
+
+class InstrumentedWebDriverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.hooks = mock.Mock(spec=instrumentation.PhaseHooks)
+        self.driver = instrumentation.InstrumentedWebDriver(
+            FakeBrowser(),
+            self.hooks,
+            SteppingClock(step_ns=10))
+
+    def test_times_commands_and_elements_they_find(self):
+        element = self.driver.find_element_by_id('latency')
+        self.assertEqual('latency', element.text)
+        for button in self.driver.find_elements_by_xpath('//button'):
+            button.click()
+
+        self.assertEqual(
+            [
+                mock.call('find_element_by_id', 10),
+                mock.call('text', 10),
+                mock.call('find_elements_by_xpath', 10),
+                mock.call('click', 10),
+                mock.call('click', 10),
+            ], self.hooks.command_completed.call_args_list)
+
+    def test_times_commands_that_raise(self):
+        with self.assertRaises(ValueError):
+            self.driver.get('http://ndt.fake/')
+
+        self.hooks.command_completed.assert_called_once_with('get', 10)
+
+    def test_attributes_are_not_timed(self):
+        self.assertEqual({'version': '45.0'}, self.driver.capabilities)
+        self.assertFalse(self.hooks.command_completed.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
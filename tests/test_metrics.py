@@ -0,0 +1,157 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+import urllib2
+
+import pytz
+
+from client_wrapper import metrics
+from client_wrapper import results
+
+
+def create_result(errors=(), c2s_throughput=10.0, s2c_throughput=90.0):
+    timestamp = datetime.datetime(2016, 2, 26, 15, 51, 23, 452234, pytz.utc)
+    result = results.NdtResult(
+        start_time=timestamp,
+        errors=[results.TestError(timestamp, message) for message in errors])
+    result.browser_launch_ns = 1500000000
+    result.c2s_result = results.NdtSingleTestResult(throughput=c2s_throughput,
+                                                    duration_ns=10000000000)
+    result.s2c_result = results.NdtSingleTestResult(throughput=s2c_throughput,
+                                                    duration_ns=200000000)
+    return result
+
+
+class ClassifyErrorTest(unittest.TestCase):
+
+    def test_classifies_driver_error_messages(self):
+        self.assertEqual(metrics.ERROR_LOAD_FAILURE,
+                         metrics.classify_error('Failed to load test UI.'))
+        self.assertEqual(metrics.ERROR_TIMEOUT, metrics.classify_error(
+            'Test did not complete within timeout period.'))
+        self.assertEqual(
+            metrics.ERROR_ILLEGAL_METRIC,
+            metrics.classify_error('illegal value shown for latency: abc'))
+        self.assertEqual(metrics.ERROR_OTHER,
+                         metrics.classify_error('Browser crashed.'))
+
+
+class HarnessMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = metrics.HarnessMetrics()
+
+    def test_counts_tests_and_failures_by_error_type(self):
+        self.metrics.record_result(create_result())
+        self.metrics.record_result(create_result(errors=[
+            'illegal value shown for latency: abc',
+            'illegal value shown for c2s throughput: def'
+        ]))
+        self.metrics.record_result(create_result(
+            errors=['Test did not complete within timeout period.']))
+        text = self.metrics.format_text()
+
+        self.assertIn('# TYPE ndt_tests_total counter\nndt_tests_total 3\n',
+                      text)
+        # A test is counted once per type of error it has.
+        self.assertIn(
+            'ndt_tests_failed_total{error_type="illegal_metric_value"} 1\n',
+            text)
+        self.assertIn('ndt_tests_failed_total{error_type="timeout"} 1\n', text)
+        self.assertIn('ndt_tests_failed_total{error_type="load_failure"} 0\n',
+                      text)
+
+    def test_formats_cumulative_histograms(self):
+        self.metrics.record_result(create_result(s2c_throughput=90.0))
+        self.metrics.record_result(create_result(s2c_throughput=600.0))
+        text = self.metrics.format_text()
+
+        self.assertIn('ndt_browser_launch_seconds_bucket{le="1.0"} 0\n', text)
+        self.assertIn('ndt_browser_launch_seconds_bucket{le="2.5"} 2\n', text)
+        self.assertIn('ndt_browser_launch_seconds_sum 3.0\n', text)
+        self.assertIn('ndt_browser_launch_seconds_count 2\n', text)
+        self.assertIn(
+            'ndt_throughput_mbps_bucket{direction="s2c",le="100.0"} 1\n', text)
+        self.assertIn(
+            'ndt_throughput_mbps_bucket{direction="s2c",le="1000.0"} 2\n', text)
+        self.assertIn(
+            'ndt_throughput_mbps_bucket{direction="s2c",le="+Inf"} 2\n', text)
+        self.assertIn('ndt_throughput_mbps_sum{direction="s2c"} 690.0\n', text)
+        self.assertIn(
+            'ndt_phase_duration_seconds_bucket{phase="s2c",le="0.25"} 2\n',
+            text)
+
+    def test_records_span_durations_by_phase(self):
+        result = create_result()
+        result.spans = [results.PhaseSpan('load_url', 0, 300000000),
+                        results.PhaseSpan('click_start', 300000000)]
+        self.metrics.record_result(result)
+        text = self.metrics.format_text()
+
+        self.assertIn('ndt_phase_duration_seconds_count{phase="load_url"} 1\n',
+                      text)
+        # Spans that did not end have no duration to record.
+        self.assertNotIn('phase="click_start"', text)
+
+    def test_ignores_missing_values(self):
+        result = results.NdtResult(errors=[])
+        self.metrics.record_result(result)
+        text = self.metrics.format_text()
+
+        self.assertIn('ndt_tests_total 1\n', text)
+        self.assertIn('ndt_browser_launch_seconds_count 0\n', text)
+        self.assertNotIn('direction=', text)
+
+
+class ExporterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = metrics.HarnessMetrics()
+        self.metrics.record_result(create_result())
+
+    def test_textfile_exporter_writes_metrics_file(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        path = os.path.join(temp_dir, 'ndt.prom')
+        exporter = metrics.TextfileExporter(self.metrics, path, interval=60)
+        sink = metrics.MetricsSink(self.metrics, [exporter])
+        sink.write(create_result())
+        sink.close()
+
+        with open(path) as metrics_file:
+            self.assertEqual(self.metrics.format_text(), metrics_file.read())
+        self.assertEqual(['ndt.prom'], os.listdir(temp_dir))
+
+    def test_http_exporter_serves_metrics(self):
+        exporter = metrics.HttpExporter(self.metrics, host='127.0.0.1')
+        exporter.start()
+        self.addCleanup(exporter.stop)
+        response = urllib2.urlopen('http://127.0.0.1:%d/metrics' %
+                                   exporter.port)
+
+        self.assertEqual(metrics.CONTENT_TYPE,
+                         response.info().getheader('Content-Type'))
+        self.assertEqual(self.metrics.format_text(), response.read())
+        with self.assertRaises(urllib2.HTTPError):
+            urllib2.urlopen('http://127.0.0.1:%d/' % exporter.port)
+
+
+if __name__ == '__main__':
+    unittest.main()
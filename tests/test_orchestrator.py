@@ -0,0 +1,223 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import collections
+import threading
+import time
+import unittest
+
+from selenium.common import exceptions
+
+from client_wrapper import fake_webdriver
+from client_wrapper import html5_driver
+from client_wrapper import orchestrator
+from client_wrapper import results
+
+
+class FakeDriverFactory(object):
+    """Creates stand-in NDT drivers that track how many tests run at once."""
+
+    def __init__(self, test_seconds=0.02, failing_urls=()):
+        self._test_seconds = test_seconds
+        self._failing_urls = failing_urls
+        self._lock = threading.Lock()
+        self.active = collections.Counter()
+        self.max_active = collections.Counter()
+        self.tests_run = 0
+        self.drivers = []
+
+    def __call__(self, url):
+        driver = FakeDriver(self, url)
+        with self._lock:
+            self.drivers.append(driver)
+        return driver
+
+    def update_active(self, url, change):
+        with self._lock:
+            for key in (url, 'total'):
+                self.active[key] += change
+                self.max_active[key] = max(self.max_active[key],
+                                           self.active[key])
+            if change < 0:
+                self.tests_run += 1
+
+
+class FakeDriver(object):
+
+    def __init__(self, factory, url):
+        self._factory = factory
+        self._url = url
+        self.closed = False
+
+    def perform_test(self):
+        self._factory.update_active(self._url, 1)
+        try:
+            time.sleep(self._factory._test_seconds)
+        finally:
+            self._factory.update_active(self._url, -1)
+        if self._url in self._factory._failing_urls:
+            raise RuntimeError('browser crashed')
+        return results.NdtResult(latency=10.0, errors=[])
+
+    def close(self):
+        self.closed = True
+
+
+class OrchestratorTest(unittest.TestCase):
+
+    def test_every_test_completes_once(self):
+        factory = FakeDriverFactory()
+        completions = []
+        summary = orchestrator.Orchestrator(factory,
+                                            max_workers=4).run(
+                                                ['http://a/', 'http://b/'] * 5,
+                                                completions.append)
+
+        self.assertEqual(10, summary.completed)
+        self.assertEqual(0, summary.cancelled)
+        self.assertFalse(summary.timed_out)
+        self.assertEqual(
+            range(10), sorted(completion.index for completion in completions))
+        for driver in factory.drivers:
+            self.assertTrue(driver.closed)
+
+    def test_concurrency_is_bounded_by_workers_and_targets(self):
+        factory = FakeDriverFactory()
+        orchestrator.Orchestrator(factory,
+                                  max_workers=4,
+                                  max_concurrent_per_target=1).run(
+                                      ['http://a/', 'http://b/'] * 4,
+                                      lambda completion: None)
+
+        self.assertLessEqual(factory.max_active['total'], 2)
+        self.assertEqual(1, factory.max_active['http://a/'])
+        self.assertEqual(1, factory.max_active['http://b/'])
+
+    def test_callback_runs_on_calling_thread(self):
+        callback_threads = set()
+
+        def record_thread(_):
+            callback_threads.add(threading.current_thread())
+
+        orchestrator.Orchestrator(FakeDriverFactory(),
+                                  max_workers=3).run(
+                                      ['http://a/'] * 6, record_thread)
+
+        self.assertEqual(set([threading.current_thread()]), callback_threads)
+
+    def test_slow_callback_applies_back_pressure(self):
+        factory = FakeDriverFactory(test_seconds=0)
+        callback_count = [0]
+
+        def slow_callback(completion):
+            callback_count[0] += 1
+            time.sleep(0.02)
+            # Workers cannot run ahead of the callback by more than the
+            # pending result plus one completed test each.
+            self.assertLessEqual(factory.tests_run, callback_count[0] + 1 + 2)
+
+        orchestrator.Orchestrator(factory,
+                                  max_workers=2,
+                                  max_pending_results=1).run(
+                                      ['http://a/'] * 8, slow_callback)
+
+    def test_failed_test_is_reported_and_its_driver_replaced(self):
+        factory = FakeDriverFactory(failing_urls=('http://bad/',))
+        completions = []
+        summary = orchestrator.Orchestrator(factory,
+                                            max_workers=1).run(
+                                                ['http://bad/', 'http://bad/',
+                                                 'http://good/'],
+                                                completions.append)
+
+        self.assertEqual(2, summary.failed)
+        self.assertIsInstance(completions[0].error, RuntimeError)
+        self.assertIsNone(completions[0].result)
+        self.assertIsNotNone(completions[2].result)
+        # Each failure discards its driver.
+        self.assertEqual(3, len(factory.drivers))
+
+    def test_exhausted_load_failure_budget_stops_the_run(self):
+        browser_factory = fake_webdriver.FakeWebDriverFactory(
+            failures={'get': exceptions.WebDriverException(u'Failed.')})
+
+        def create_driver(url):
+            return html5_driver.NdtHtml5SeleniumDriver(
+                browser='firefox',
+                url=url,
+                timeout=1,
+                browser_factory=browser_factory,
+                load_failure_budget=2)
+
+        completions = []
+        with self.assertRaises(html5_driver.FailureBudgetExhaustedError):
+            orchestrator.Orchestrator(create_driver,
+                                      max_workers=1).run(
+                                          ['http://ndt.fake/'] * 20,
+                                          completions.append)
+
+        self.assertEqual(2, len(completions))
+        self.assertEqual(2, len(browser_factory.drivers))
+
+    def test_drivers_are_closed_when_run_returns(self):
+        factory = FakeDriverFactory()
+        orchestrator.Orchestrator(factory,
+                                  max_workers=2).run(
+                                      ['http://a/'] * 4,
+                                      lambda completion: None)
+
+        self.assertEqual(2, len(factory.drivers))
+        self.assertTrue(all(driver.closed for driver in factory.drivers))
+
+    def test_drivers_of_abandoned_tests_are_closed_when_run_returns(self):
+        factory = FakeDriverFactory(test_seconds=0.2)
+        orchestrator.Orchestrator(factory,
+                                  max_workers=2,
+                                  timeout=0.05).run(
+                                      ['http://a/'] * 4,
+                                      lambda completion: None)
+
+        self.assertTrue(all(driver.closed for driver in factory.drivers))
+
+    def test_timeout_cancels_tests_that_have_not_started(self):
+        factory = FakeDriverFactory(test_seconds=0.1)
+        summary = orchestrator.Orchestrator(factory,
+                                            max_workers=2,
+                                            timeout=0.15).run(
+                                                ['http://a/'] * 10,
+                                                lambda completion: None)
+
+        self.assertTrue(summary.timed_out)
+        self.assertGreater(summary.cancelled, 0)
+        self.assertEqual(
+            10, summary.completed + summary.cancelled + summary.abandoned)
+
+    def test_callback_error_stops_the_run(self):
+
+        def failing_callback(completion):
+            raise ValueError('sink failed')
+
+        with self.assertRaises(ValueError):
+            orchestrator.Orchestrator(FakeDriverFactory(),
+                                      max_workers=1).run(
+                                          ['http://a/'] * 5, failing_callback)
+
+    def test_invalid_worker_count_raises_error(self):
+        with self.assertRaises(ValueError):
+            orchestrator.Orchestrator(FakeDriverFactory(), max_workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import multiprocessing
+import time
+import unittest
+
+import mock
+
+from client_wrapper import parallel
+from client_wrapper import results
+
+# Counters shared between the test process and the pool's worker processes.
+_active_tests = multiprocessing.Value('i', 0)
+_max_active_tests = multiprocessing.Value('i', 0)
+_tests_run = multiprocessing.Value('i', 0)
+_closed_drivers = multiprocessing.Value('i', 0)
+
+
+class FakeDriver(object):
+    """Stand-in NDT driver that tracks how many tests run concurrently."""
+
+    def perform_test(self):
+        with _active_tests.get_lock():
+            _active_tests.value += 1
+            _max_active_tests.value = max(_max_active_tests.value,
+                                          _active_tests.value)
+        time.sleep(0.05)
+        with _active_tests.get_lock():
+            _active_tests.value -= 1
+            _tests_run.value += 1
+        return results.NdtResult(latency=10.0, errors=[])
+
+    def close(self):
+        with _closed_drivers.get_lock():
+            _closed_drivers.value += 1
+
+
+class FailingDriver(FakeDriver):
+    """Stand-in NDT driver whose tests fail after the first few."""
+
+    def perform_test(self):
+        result = super(FailingDriver, self).perform_test()
+        if _tests_run.value > 2:
+            raise ValueError('mock test failure')
+        return result
+
+
+class ParallelTest(unittest.TestCase):
+
+    def setUp(self):
+        _active_tests.value = 0
+        _max_active_tests.value = 0
+        _tests_run.value = 0
+        _closed_drivers.value = 0
+
+    def test_run_iterations_yields_one_result_per_iteration(self):
+        ordered_results = list(parallel.run_iterations(FakeDriver,
+                                                       'http://ndt.mock:7123/',
+                                                       iterations=6,
+                                                       workers=3))
+
+        self.assertEqual(len(ordered_results), 6)
+        for result in ordered_results:
+            self.assertEqual(result.latency, 10.0)
+
+    def test_workers_close_their_drivers_when_run_is_aborted(self):
+        with self.assertRaises(ValueError):
+            list(parallel.run_iterations(FailingDriver,
+                                         'http://ndt.mock:7123/',
+                                         iterations=20,
+                                         workers=2))
+
+        self.assertEqual(2, _closed_drivers.value)
+        # Tests that had not started when the run was aborted are skipped.
+        self.assertLess(_tests_run.value, 20)
+
+    def test_workers_close_their_drivers_when_caller_stops_iterating(self):
+        ordered_results = parallel.run_iterations(FakeDriver,
+                                                  'http://ndt.mock:7123/',
+                                                  iterations=20,
+                                                  workers=2)
+        next(ordered_results)
+        ordered_results.close()
+
+        self.assertEqual(2, _closed_drivers.value)
+        self.assertLess(_tests_run.value, 20)
+
+    def test_url_semaphore_prevents_overlapping_tests(self):
+        url = 'http://ndt.mock:7123/'
+        url_semaphores = parallel.create_url_semaphores([url], 1)
+        list(parallel.run_iterations(FakeDriver,
+                                     url,
+                                     iterations=6,
+                                     workers=3,
+                                     url_semaphores=url_semaphores))
+
+        self.assertEqual(_max_active_tests.value, 1)
+
+    def test_url_semaphores_are_created_once_per_unique_url(self):
+        url_semaphores = parallel.create_url_semaphores(
+            ['http://a:7123/', 'http://b:7123/', 'http://a:7123/'], 2)
+
+        self.assertItemsEqual(
+            ['http://a:7123/', 'http://b:7123/'], url_semaphores.keys())
+
+    def test_run_iteration_holds_semaphore_during_test(self):
+        mock_driver = mock.Mock()
+        mock_semaphore = mock.MagicMock()
+
+        def perform_test():
+            mock_semaphore.__enter__.assert_called_once_with()
+            self.assertFalse(mock_semaphore.__exit__.called)
+            return 'mock result'
+
+        mock_driver.perform_test.side_effect = perform_test
+        parallel._init_worker(lambda: mock_driver, mock_semaphore)
+
+        self.assertEqual('mock result', parallel._run_iteration(0))
+        self.assertTrue(mock_semaphore.__exit__.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
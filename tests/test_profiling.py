@@ -0,0 +1,108 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import os
+import pstats
+import shutil
+import tempfile
+import time
+import unittest
+
+from client_wrapper import profiling
+
+
+def wait_for_browser():
+    time.sleep(0.05)
+    return 'result'
+
+
+class FakeDriver(object):
+
+    def __init__(self):
+        self.closed = False
+
+    def perform_test(self):
+        return wait_for_browser()
+
+    def close(self):
+        self.closed = True
+
+
+class IterationProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+    def test_saves_stats_of_each_iteration_and_of_the_run(self):
+        profiler = profiling.IterationProfiler(self.output_dir)
+        driver = profiling.ProfiledDriver(FakeDriver(), profiler)
+        for _ in range(2):
+            self.assertEqual('result', driver.perform_test())
+        driver.close()
+        profiler.finish()
+
+        self.assertTrue(driver.closed)
+        self.assertEqual(
+            ['aggregate.prof', 'iteration-0001.prof', 'iteration-0002.prof'],
+            sorted(os.listdir(self.output_dir)))
+        aggregate = pstats.Stats(os.path.join(self.output_dir,
+                                              'aggregate.prof'))
+        call_counts = {function[2]: stats[1]
+                       for function, stats in aggregate.stats.iteritems()}
+        self.assertEqual(2, call_counts['wait_for_browser'])
+        report = profiler.format_report(top_n=5)
+        self.assertIn('top 5 functions by cumulative time over 2 iterations',
+                      report)
+        self.assertIn('wait_for_browser', report)
+
+    def test_samples_wall_clock_stacks(self):
+        profiler = profiling.IterationProfiler(self.output_dir,
+                                               sample_interval=0.005)
+        profiler.profile(wait_for_browser)
+        profiler.finish()
+
+        with open(os.path.join(self.output_dir,
+                               profiling.STACK_SAMPLES_FILENAME)) as samples:
+            lines = samples.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertIn('wait_for_browser', stack)
+            self.assertGreater(int(count), 0)
+        self.assertIn('by wall-clock samples', profiler.format_report())
+
+    def test_failed_iteration_is_still_saved(self):
+        profiler = profiling.IterationProfiler(self.output_dir)
+
+        def failing_test():
+            raise RuntimeError('browser crashed')
+
+        with self.assertRaises(RuntimeError):
+            profiler.profile(failing_test)
+
+        self.assertEqual(1, profiler.iterations)
+        self.assertEqual(['iteration-0001.prof'], os.listdir(self.output_dir))
+
+    def test_report_without_iterations(self):
+        profiler = profiling.IterationProfiler(self.output_dir)
+        profiler.finish()
+
+        self.assertEqual('no iterations profiled\n', profiler.format_report())
+        self.assertEqual([], os.listdir(self.output_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
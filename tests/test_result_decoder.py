@@ -0,0 +1,182 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import datetime
+import unittest
+
+import pytz
+
+from client_wrapper import result_decoder
+from client_wrapper import result_encoder
+from client_wrapper import results
+
+
+def create_full_ndt_result():
+    result = results.NdtResult(
+        start_time=datetime.datetime(2016, 2, 26, 15, 51, 23, 452234, pytz.utc),
+        end_time=datetime.datetime(2016, 2, 26, 15, 59, 33, 284345, pytz.utc),
+        duration_ns=489832111500,
+        latency=23.8,
+        errors=[results.TestError(
+            datetime.datetime(2016, 2, 26, 15, 53, 29, 123456,
+                              pytz.utc), 'mock error message 1')])
+    result.client = 'mock_client'
+    result.client_version = 'mock_client_version'
+    result.os = 'mock_os'
+    result.os_version = 'mock_os_version'
+    result.browser = 'mock_browser'
+    result.browser_version = 'mock_browser_version'
+    result.browser_launch_ns = 2345678000
+    result.load_retries = 2
+    result.load_backoff_ns = 1500000000
+    result.phase_timeouts_ns = {'start': 5000000000, 'c2s': 12500000000}
+    result.timed_out_phase = 'c2s'
+    result.spans = [
+        results.PhaseSpan('load_url', 0, 1500000, {'get': 1}, {'get': 1400000}),
+        results.PhaseSpan('click_start', 1600000)
+    ]
+    result.c2s_result = results.NdtSingleTestResult(
+        start_time=datetime.datetime(2016, 2, 26, 15, 51, 24, 123456, pytz.utc),
+        end_time=datetime.datetime(2016, 2, 26, 15, 51, 34, 123456, pytz.utc),
+        duration_ns=10000250000,
+        throughput=10.127)
+    result.s2c_result = results.NdtSingleTestResult(
+        start_time=datetime.datetime(2016, 2, 26, 15, 51, 35, 123456, pytz.utc),
+        end_time=datetime.datetime(2016, 2, 26, 15, 51, 45, 0, pytz.utc),
+        duration_ns=9999000001,
+        throughput=0.0)
+    return result
+
+
+class NdtResultDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = result_encoder.NdtResultEncoder()
+        self.decoder = result_decoder.NdtResultDecoder()
+
+    def test_decodes_fully_populated_result(self):
+        original = create_full_ndt_result()
+        decoded = self.decoder.decode(self.encoder.encode(original))
+
+        self.assertEqual(decoded.start_time, original.start_time)
+        self.assertEqual(decoded.end_time, original.end_time)
+        self.assertEqual(decoded.duration_ns, original.duration_ns)
+        self.assertEqual(decoded.client, 'mock_client')
+        self.assertEqual(decoded.client_version, 'mock_client_version')
+        self.assertEqual(decoded.os, 'mock_os')
+        self.assertEqual(decoded.os_version, 'mock_os_version')
+        self.assertEqual(decoded.browser, 'mock_browser')
+        self.assertEqual(decoded.browser_version, 'mock_browser_version')
+        self.assertEqual(decoded.browser_launch_ns, 2345678000)
+        self.assertEqual(decoded.load_retries, 2)
+        self.assertEqual(decoded.load_backoff_ns, 1500000000)
+        self.assertEqual(decoded.phase_timeouts_ns, {'start': 5000000000,
+                                                     'c2s': 12500000000})
+        self.assertEqual(decoded.timed_out_phase, 'c2s')
+        self.assertEqual([span.phase for span in decoded.spans],
+                         ['load_url', 'click_start'])
+        self.assertEqual(decoded.spans[0].duration_ns, 1500000)
+        self.assertEqual(decoded.spans[0].command_counts, {'get': 1})
+        self.assertEqual(decoded.spans[0].command_durations_ns,
+                         {'get': 1400000})
+        self.assertEqual(decoded.spans[1].start_offset_ns, 1600000)
+        self.assertIsNone(decoded.spans[1].duration_ns)
+        self.assertEqual(decoded.latency, 23.8)
+        self.assertEqual(decoded.c2s_result.start_time,
+                         original.c2s_result.start_time)
+        self.assertEqual(decoded.c2s_result.end_time,
+                         original.c2s_result.end_time)
+        self.assertEqual(decoded.c2s_result.duration_ns, 10000250000)
+        self.assertEqual(decoded.c2s_result.throughput, 10.127)
+        self.assertEqual(decoded.s2c_result.duration_ns, 9999000001)
+        self.assertEqual(decoded.s2c_result.throughput, 0.0)
+        self.assertEqual(len(decoded.errors), 1)
+        self.assertEqual(decoded.errors[0].timestamp,
+                         original.errors[0].timestamp)
+        self.assertEqual(decoded.errors[0].message, 'mock error message 1')
+        self.assertEqual(decoded.start_time.tzinfo, pytz.utc)
+
+    def test_decoding_then_encoding_reproduces_original_encoding(self):
+        encoded = self.encoder.encode(create_full_ndt_result())
+        self.assertEqual(encoded,
+                         self.encoder.encode(self.decoder.decode(encoded)))
+
+    def test_null_single_test_results_decode_to_none(self):
+        result = results.NdtResult(start_time=datetime.datetime(
+            2016, 2, 26, 15, 51, 23, 452234, pytz.utc),
+                                   errors=[])
+        decoded = self.decoder.decode(self.encoder.encode(result))
+
+        self.assertIsNone(decoded.c2s_result)
+        self.assertIsNone(decoded.s2c_result)
+        self.assertIsNone(decoded.end_time)
+        self.assertIsNone(decoded.duration_ns)
+        self.assertEqual(decoded.errors, [])
+
+    def test_fields_missing_from_older_encodings_decode_to_none(self):
+        decoded = self.decoder.decode(
+            '{"start_time": "2016-02-26T15:51:23.452234Z", '
+            '"c2s_throughput": 10.5, "errors": []}')
+
+        self.assertIsNone(decoded.duration_ns)
+        self.assertIsNone(decoded.c2s_result.duration_ns)
+        self.assertEqual(decoded.c2s_result.throughput, 10.5)
+        self.assertIsNone(decoded.s2c_result)
+
+    def test_decoded_results_have_independent_error_lists(self):
+        first = self.decoder.decode('{"errors": []}')
+        second = self.decoder.decode('{"errors": []}')
+        first.errors.append('mock error')
+        self.assertEqual(second.errors, [])
+
+    def test_raises_error_on_malformed_results(self):
+        with self.assertRaises(result_decoder.DecodeError):
+            self.decoder.decode('not json')
+        with self.assertRaises(result_decoder.DecodeError):
+            self.decoder.decode('[1, 2, 3]')
+        with self.assertRaises(result_decoder.DecodeError):
+            self.decoder.decode('{"start_time": "2016-02-26 15:51:23"}')
+        with self.assertRaises(result_decoder.DecodeError):
+            self.decoder.decode('{"start_time": "2016-13-26T15:51:23.452234Z"}')
+        with self.assertRaises(result_decoder.DecodeError):
+            self.decoder.decode('{"start_time": 1456501883}')
+        with self.assertRaises(result_decoder.DecodeError):
+            self.decoder.decode('{"errors": [{"message": "no timestamp"}]}')
+
+
+class DecodeJsonlTest(unittest.TestCase):
+
+    def test_decodes_one_result_per_line_skipping_blank_lines(self):
+        encoded = list(result_encoder.encode_many([create_full_ndt_result(),
+                                                   create_full_ndt_result()]))
+        lines = [encoded[0] + '\n', '\n', encoded[1] + '\n']
+
+        decoded = list(result_decoder.decode_jsonl(lines))
+
+        self.assertEqual(len(decoded), 2)
+        self.assertEqual(decoded[1].latency, 23.8)
+
+    def test_decodes_lazily(self):
+
+        def lines():
+            yield '{"latency": 1.0, "errors": []}\n'
+            raise AssertionError('read past first result')
+
+        decoded = result_decoder.decode_jsonl(lines())
+        self.assertEqual(next(decoded).latency, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
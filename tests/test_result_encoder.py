@@ -57,15 +57,26 @@ class NdtResultEncoderTest(unittest.TestCase):
 {
     "start_time": "2016-02-26T15:51:23.452234Z",
     "end_time": "2016-02-26T15:59:33.284345Z",
+    "duration_ms": null,
     "client": "mock_client",
     "client_version": "mock_client_version",
     "os": "mock_os",
     "os_version": "mock_os_version",
+    "browser": null,
+    "browser_version": null,
+    "browser_launch_ms": null,
+    "load_retries": null,
+    "load_backoff_ms": null,
+    "phase_timeouts_ms": null,
+    "timed_out_phase": null,
+    "spans": null,
     "c2s_start_time": null,
     "c2s_end_time": null,
+    "c2s_duration_ms": null,
     "c2s_throughput": null,
     "s2c_start_time": null,
     "s2c_end_time": null,
+    "s2c_duration_ms": null,
     "s2c_throughput": null,
     "latency": null,
     "errors": []
@@ -91,15 +102,26 @@ class NdtResultEncoderTest(unittest.TestCase):
 {
     "start_time": "2016-02-26T15:51:23.452234Z",
     "end_time": "2016-02-26T15:59:33.284345Z",
+    "duration_ms": null,
     "client": "mock_client",
     "client_version": "mock_client_version",
     "os": "mock_os",
     "os_version": "mock_os_version",
+    "browser": null,
+    "browser_version": null,
+    "browser_launch_ms": null,
+    "load_retries": null,
+    "load_backoff_ms": null,
+    "phase_timeouts_ms": null,
+    "timed_out_phase": null,
+    "spans": null,
     "c2s_start_time": null,
     "c2s_end_time": null,
+    "c2s_duration_ms": null,
     "c2s_throughput": null,
     "s2c_start_time": null,
     "s2c_end_time": null,
+    "s2c_duration_ms": null,
     "s2c_throughput": null,
     "latency": null,
     "errors": [
@@ -135,15 +157,26 @@ class NdtResultEncoderTest(unittest.TestCase):
 {
     "start_time": "2016-02-26T15:51:23.452234Z",
     "end_time": "2016-02-26T15:59:33.284345Z",
+    "duration_ms": null,
     "client": "mock_client",
     "client_version": "mock_client_version",
     "os": "mock_os",
     "os_version": "mock_os_version",
+    "browser": null,
+    "browser_version": null,
+    "browser_launch_ms": null,
+    "load_retries": null,
+    "load_backoff_ms": null,
+    "phase_timeouts_ms": null,
+    "timed_out_phase": null,
+    "spans": null,
     "c2s_start_time": null,
     "c2s_end_time": null,
+    "c2s_duration_ms": null,
     "c2s_throughput": null,
     "s2c_start_time": null,
     "s2c_end_time": null,
+    "s2c_duration_ms": null,
     "s2c_throughput": null,
     "latency": null,
     "errors": [
@@ -193,15 +226,26 @@ class NdtResultEncoderTest(unittest.TestCase):
 {
     "start_time": "2016-02-26T15:51:23.452234Z",
     "end_time": "2016-02-26T15:59:33.284345Z",
+    "duration_ms": null,
     "client": "mock_client",
     "client_version": "mock_client_version",
     "os": "mock_os",
     "os_version": "mock_os_version",
+    "browser": null,
+    "browser_version": null,
+    "browser_launch_ms": null,
+    "load_retries": null,
+    "load_backoff_ms": null,
+    "phase_timeouts_ms": null,
+    "timed_out_phase": null,
+    "spans": null,
     "c2s_start_time": "2016-02-26T15:51:24.123456Z",
     "c2s_end_time": "2016-02-26T15:51:34.123456Z",
+    "c2s_duration_ms": null,
     "c2s_throughput": 10.127,
     "s2c_start_time": "2016-02-26T15:51:35.123456Z",
     "s2c_end_time": "2016-02-26T15:51:45.123456Z",
+    "s2c_duration_ms": null,
     "s2c_throughput": 98.235,
     "latency": 23.8,
     "errors": [
@@ -236,15 +280,26 @@ class NdtResultEncoderTest(unittest.TestCase):
 {
     "start_time": "2016-02-26T15:51:23.452234Z",
     "end_time": "2016-02-26T15:59:33.284345Z",
+    "duration_ms": null,
     "client": "mock_client",
     "client_version": "mock_client_version",
     "os": "mock_os",
     "os_version": "mock_os_version",
+    "browser": null,
+    "browser_version": null,
+    "browser_launch_ms": null,
+    "load_retries": null,
+    "load_backoff_ms": null,
+    "phase_timeouts_ms": null,
+    "timed_out_phase": null,
+    "spans": null,
     "c2s_start_time": null,
     "c2s_end_time": null,
+    "c2s_duration_ms": null,
     "c2s_throughput": null,
     "s2c_start_time": "2016-02-26T15:51:35.123456Z",
     "s2c_end_time": "2016-02-26T15:51:45.123456Z",
+    "s2c_duration_ms": null,
     "s2c_throughput": 98.235,
     "latency": 23.8,
     "errors": []
@@ -274,15 +329,26 @@ class NdtResultEncoderTest(unittest.TestCase):
 {
     "start_time": "2016-02-26T15:51:23.452234Z",
     "end_time": "2016-02-26T15:59:33.284345Z",
+    "duration_ms": null,
     "client": "mock_client",
     "client_version": "mock_client_version",
     "os": "mock_os",
     "os_version": "mock_os_version",
+    "browser": null,
+    "browser_version": null,
+    "browser_launch_ms": null,
+    "load_retries": null,
+    "load_backoff_ms": null,
+    "phase_timeouts_ms": null,
+    "timed_out_phase": null,
+    "spans": null,
     "c2s_start_time": "2016-02-26T15:51:24.123456Z",
     "c2s_end_time": "2016-02-26T15:51:34.123456Z",
+    "c2s_duration_ms": null,
     "c2s_throughput": 10.127,
     "s2c_start_time": null,
     "s2c_end_time": null,
+    "s2c_duration_ms": null,
     "s2c_throughput": null,
     "latency": 23.8,
     "errors": []
@@ -317,15 +383,26 @@ class NdtResultEncoderTest(unittest.TestCase):
 {
     "start_time": "2016-02-26T15:51:23.452234Z",
     "end_time": "2016-02-26T15:59:33.284345Z",
+    "duration_ms": null,
     "client": "mock_client",
     "client_version": "mock_client_version",
     "os": "mock_os",
     "os_version": "mock_os_version",
+    "browser": null,
+    "browser_version": null,
+    "browser_launch_ms": null,
+    "load_retries": null,
+    "load_backoff_ms": null,
+    "phase_timeouts_ms": null,
+    "timed_out_phase": null,
+    "spans": null,
     "c2s_start_time": "2016-02-26T15:51:24.123456Z",
     "c2s_end_time": "2016-02-26T15:51:34.123456Z",
+    "c2s_duration_ms": null,
     "c2s_throughput": 10.127,
     "s2c_start_time": "2016-02-26T15:51:35.123456Z",
     "s2c_end_time": "2016-02-26T15:51:45.123456Z",
+    "s2c_duration_ms": null,
     "s2c_throughput": 98.235,
     "latency": null,
     "errors": []
@@ -334,6 +411,125 @@ class NdtResultEncoderTest(unittest.TestCase):
         encoded_actual = self.encoder.encode(result)
         self.assertJsonEqual(encoded_expected, encoded_actual)
 
+    def test_encodes_browser_metadata(self):
+        result = create_ndt_result(
+            start_time=datetime.datetime(2016, 2, 26, 15, 51, 23, 452234,
+                                         pytz.utc),
+            end_time=datetime.datetime(2016, 2, 26, 15, 59, 33, 284345,
+                                       pytz.utc),
+            client='mock_client',
+            client_version='mock_client_version',
+            os='mock_os',
+            os_version='mock_os_version')
+        result.browser = 'mock_browser'
+        result.browser_version = 'mock_browser_version'
+        encoded = json.loads(self.encoder.encode(result))
+
+        self.assertEqual(encoded['browser'], 'mock_browser')
+        self.assertEqual(encoded['browser_version'], 'mock_browser_version')
+
+    def test_encodes_browser_launch_time_in_milliseconds(self):
+        result = create_ndt_result(start_time=datetime.datetime(
+            2016, 2, 26, 15, 51, 23, 452234, pytz.utc),
+                                   end_time=None,
+                                   client='mock_client',
+                                   client_version='mock_client_version',
+                                   os='mock_os',
+                                   os_version='mock_os_version')
+        result.browser_launch_ns = 2345678000
+        encoded = json.loads(self.encoder.encode(result))
+
+        self.assertEqual(encoded['browser_launch_ms'], 2345.678)
+
+    def test_encodes_spans_with_command_timings(self):
+        result = create_ndt_result(start_time=datetime.datetime(
+            2016, 2, 26, 15, 51, 23, 452234, pytz.utc),
+                                   end_time=None,
+                                   client='mock_client',
+                                   client_version='mock_client_version',
+                                   os='mock_os',
+                                   os_version='mock_os_version')
+        result.spans = [
+            results.PhaseSpan('load_url', 0, 1500000, {'get': 1},
+                              {'get': 1400000}),
+            results.PhaseSpan('click_start', 1600000)
+        ]
+        encoded = json.loads(self.encoder.encode(result))
+
+        self.assertEqual(encoded['spans'], [
+            {
+                'phase': 'load_url',
+                'start_offset_ms': 0.0,
+                'duration_ms': 1.5,
+                'commands': {'get': {'count': 1,
+                                     'duration_ms': 1.4}}
+            },
+            {
+                'phase': 'click_start',
+                'start_offset_ms': 1.6,
+                'duration_ms': None,
+                'commands': {}
+            },
+        ])
+
+    def test_encodes_monotonic_durations_in_milliseconds(self):
+        result = create_ndt_result(
+            start_time=datetime.datetime(2016, 2, 26, 15, 51, 23, 452234,
+                                         pytz.utc),
+            end_time=datetime.datetime(2016, 2, 26, 15, 59, 33, 284345,
+                                       pytz.utc),
+            client='mock_client',
+            client_version='mock_client_version',
+            os='mock_os',
+            os_version='mock_os_version')
+        result.duration_ns = 489832111500
+        result.c2s_result = results.NdtSingleTestResult(
+            start_time=datetime.datetime(2016, 2, 26, 15, 51, 24, 123456,
+                                         pytz.utc),
+            end_time=datetime.datetime(2016, 2, 26, 15, 51, 34, 123456,
+                                       pytz.utc),
+            duration_ns=10000250000,
+            throughput=10.127)
+        result.s2c_result = results.NdtSingleTestResult(
+            start_time=datetime.datetime(2016, 2, 26, 15, 51, 35, 123456,
+                                         pytz.utc),
+            end_time=datetime.datetime(2016, 2, 26, 15, 51, 45, 123456,
+                                       pytz.utc),
+            duration_ns=9999000001,
+            throughput=98.235)
+        result.latency = 23.8
+        encoded_expected = """
+{
+    "start_time": "2016-02-26T15:51:23.452234Z",
+    "end_time": "2016-02-26T15:59:33.284345Z",
+    "duration_ms": 489832.1115,
+    "client": "mock_client",
+    "client_version": "mock_client_version",
+    "os": "mock_os",
+    "os_version": "mock_os_version",
+    "browser": null,
+    "browser_version": null,
+    "browser_launch_ms": null,
+    "load_retries": null,
+    "load_backoff_ms": null,
+    "phase_timeouts_ms": null,
+    "timed_out_phase": null,
+    "spans": null,
+    "c2s_start_time": "2016-02-26T15:51:24.123456Z",
+    "c2s_end_time": "2016-02-26T15:51:34.123456Z",
+    "c2s_duration_ms": 10000.25,
+    "c2s_throughput": 10.127,
+    "s2c_start_time": "2016-02-26T15:51:35.123456Z",
+    "s2c_end_time": "2016-02-26T15:51:45.123456Z",
+    "s2c_duration_ms": 9999.000001,
+    "s2c_throughput": 98.235,
+    "latency": 23.8,
+    "errors": []
+}"""
+
+        encoded_actual = self.encoder.encode(result)
+        self.assertJsonEqual(encoded_expected, encoded_actual)
+
     def test_encodes_zero_valued_metrics(self):
         """Explicit zeroes should be encoded as zeroes, not nulls."""
         result = create_ndt_result(
@@ -362,15 +558,26 @@ class NdtResultEncoderTest(unittest.TestCase):
 {
     "start_time": "2016-02-26T15:51:23.452234Z",
     "end_time": "2016-02-26T15:59:33.284345Z",
+    "duration_ms": null,
     "client": "mock_client",
     "client_version": "mock_client_version",
     "os": "mock_os",
     "os_version": "mock_os_version",
+    "browser": null,
+    "browser_version": null,
+    "browser_launch_ms": null,
+    "load_retries": null,
+    "load_backoff_ms": null,
+    "phase_timeouts_ms": null,
+    "timed_out_phase": null,
+    "spans": null,
     "c2s_start_time": "2016-02-26T15:51:24.123456Z",
     "c2s_end_time": "2016-02-26T15:51:34.123456Z",
+    "c2s_duration_ms": null,
     "c2s_throughput": 0.0,
     "s2c_start_time": "2016-02-26T15:51:35.123456Z",
     "s2c_end_time": "2016-02-26T15:51:45.123456Z",
+    "s2c_duration_ms": null,
     "s2c_throughput": 0.0,
     "latency": 0.0,
     "errors": []
@@ -378,3 +585,68 @@ class NdtResultEncoderTest(unittest.TestCase):
 
         encoded_actual = self.encoder.encode(result)
         self.assertJsonEqual(encoded_expected, encoded_actual)
+
+
+class EncodeManyTest(unittest.TestCase):
+
+    def create_ndt_results(self):
+        minimal_result = create_ndt_result(start_time=datetime.datetime(
+            2016, 2, 26, 15, 51, 23, 452234, pytz.utc),
+                                           end_time=None,
+                                           client='mock_client',
+                                           client_version='mock_client_version',
+                                           os='mock_os',
+                                           os_version='mock_os_version')
+        full_result = create_ndt_result(
+            start_time=datetime.datetime(2016, 2, 26, 15, 51, 23, 0, pytz.utc),
+            end_time=datetime.datetime(2016, 2, 26, 15, 59, 33, 284345,
+                                       pytz.utc),
+            client='mock_client',
+            client_version='mock_client_version',
+            os='mock_os',
+            os_version='mock_os_version')
+        full_result.duration_ns = 489832111500
+        full_result.c2s_result = results.NdtSingleTestResult(
+            start_time=datetime.datetime(2016, 2, 26, 15, 51, 24, 123456,
+                                         pytz.utc),
+            end_time=datetime.datetime(2016, 2, 26, 15, 51, 34, 123456,
+                                       pytz.utc),
+            duration_ns=10000250000,
+            throughput=10.127)
+        full_result.s2c_result = results.NdtSingleTestResult(
+            start_time=datetime.datetime(2016, 2, 26, 15, 51, 35, 123456,
+                                         pytz.utc),
+            throughput=0.0)
+        full_result.latency = 23.8
+        full_result.errors = [
+            results.TestError(
+                datetime.datetime(2016, 2, 26, 15, 53, 29, 123456, pytz.utc),
+                u'mock error message \u2013 1'),
+            results.TestError(
+                datetime.datetime(2016, 2, 26, 15, 53, 29, 654321, pytz.utc),
+                'mock error message "2"')
+        ]
+        return [minimal_result, full_result]
+
+    def test_encode_many_output_is_identical_to_encoder_output(self):
+        ndt_results = self.create_ndt_results()
+        encoder = result_encoder.NdtResultEncoder()
+
+        self.assertEqual(
+            [encoder.encode(r) for r in ndt_results],
+            list(result_encoder.encode_many(ndt_results)))
+
+    def test_encode_many_accepts_any_iterable(self):
+        ndt_results = self.create_ndt_results()
+
+        encoded = result_encoder.encode_many(iter(ndt_results))
+        self.assertEqual(len(list(encoded)), 2)
+
+    def test_time_encoding_matches_strftime(self):
+        for time in (datetime.datetime(2016, 2, 26, 15, 51, 23, 452234,
+                                       pytz.utc),
+                     datetime.datetime(2016, 2, 26, 0, 0, 0, 0, pytz.utc),
+                     datetime.datetime(1999, 12, 31, 23, 59, 59, 999999)):
+            self.assertEqual(
+                time.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+                result_encoder._encode_time(time))
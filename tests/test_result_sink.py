@@ -0,0 +1,99 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+import pytz
+
+from client_wrapper import result_sink
+from client_wrapper import results
+
+
+def create_ndt_result(latency):
+    return results.NdtResult(
+        start_time=datetime.datetime(2016, 2, 26, 15, 51, 23, 452234, pytz.utc),
+        end_time=datetime.datetime(2016, 2, 26, 15, 59, 33, 284345, pytz.utc),
+        latency=latency,
+        errors=[])
+
+
+class JsonlResultSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        self.output_path = os.path.join(self.output_dir, 'results.jsonl')
+
+    def read_output_lines(self):
+        with open(self.output_path) as output_file:
+            return output_file.readlines()
+
+    def test_writes_one_json_line_per_result(self):
+        with result_sink.JsonlResultSink(self.output_path) as sink:
+            sink.write(create_ndt_result(latency=1.0))
+            sink.write(create_ndt_result(latency=2.0))
+
+        lines = self.read_output_lines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])['latency'], 1.0)
+        self.assertEqual(json.loads(lines[1])['latency'], 2.0)
+        self.assertEqual(
+            json.loads(lines[1])['start_time'], '2016-02-26T15:51:23.452234Z')
+
+    def test_appends_to_existing_file(self):
+        with result_sink.JsonlResultSink(self.output_path) as sink:
+            sink.write(create_ndt_result(latency=1.0))
+        with result_sink.JsonlResultSink(self.output_path) as sink:
+            sink.write(create_ndt_result(latency=2.0))
+
+        self.assertEqual(len(self.read_output_lines()), 2)
+
+    def test_results_are_flushed_every_flush_interval(self):
+        sink = result_sink.JsonlResultSink(self.output_path, flush_interval=2)
+        self.addCleanup(sink.close)
+
+        sink.write(create_ndt_result(latency=1.0))
+        self.assertEqual(len(self.read_output_lines()), 0)
+        sink.write(create_ndt_result(latency=2.0))
+        self.assertEqual(len(self.read_output_lines()), 2)
+
+    def test_results_are_synced_every_fsync_interval(self):
+        with mock.patch.object(result_sink.os, 'fsync') as mock_fsync:
+            sink = result_sink.JsonlResultSink(self.output_path,
+                                               flush_interval=None,
+                                               fsync_interval=3)
+            for i in range(7):
+                sink.write(create_ndt_result(latency=float(i)))
+            self.assertEqual(mock_fsync.call_count, 2)
+            self.assertEqual(len(self.read_output_lines()), 6)
+
+            sink.close()
+            self.assertEqual(mock_fsync.call_count, 3)
+            self.assertEqual(len(self.read_output_lines()), 7)
+
+    def test_close_is_idempotent(self):
+        sink = result_sink.JsonlResultSink(self.output_path)
+        sink.close()
+        sink.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
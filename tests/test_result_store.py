@@ -0,0 +1,158 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import datetime
+import json
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import mock
+import pytz
+
+from client_wrapper import filename
+from client_wrapper import names
+from client_wrapper import result_store
+from client_wrapper import results
+
+
+def create_ndt_result(os_name='Windows',
+                      browser=names.CHROME,
+                      browser_version='49.0.2623',
+                      start_time=datetime.datetime(2016, 2, 26, 15, 54, 23, 0,
+                                                   pytz.utc)):
+    result = results.NdtResult(start_time=start_time, latency=10.0, errors=[])
+    result.os = os_name
+    result.os_version = {'Windows': '10.0', 'Ubuntu': '14.04'}.get(os_name)
+    result.client = names.NDT_HTML5
+    result.browser = browser
+    result.browser_version = browser_version
+    return result
+
+
+class ResultFileStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_dir)
+
+    def test_sharded_layout_writes_result_to_shard_directory(self):
+        store = result_store.ResultFileStore(self.root_dir)
+
+        path = store.write(create_ndt_result())
+
+        self.assertEqual(
+            os.path.join(
+                self.root_dir, 'win10', 'chrome49', '2016', '02', '26',
+                'win10-chrome49-ndt_js-2016-02-26T155423Z-results.json'), path)
+        with open(path) as result_file:
+            self.assertEqual(10.0, json.load(result_file)['latency'])
+
+    def test_flat_layout_writes_result_to_root_directory(self):
+        store = result_store.ResultFileStore(self.root_dir,
+                                             layout=result_store.LAYOUT_FLAT)
+
+        path = store.write(create_ndt_result())
+
+        self.assertEqual(
+            os.path.join(
+                self.root_dir,
+                'win10-chrome49-ndt_js-2016-02-26T155423Z-results.json'), path)
+
+    def test_colliding_filenames_get_numbered_suffixes(self):
+        store = result_store.ResultFileStore(self.root_dir)
+        other_store = result_store.ResultFileStore(self.root_dir)
+
+        paths = [store.write(create_ndt_result()),
+                 other_store.write(create_ndt_result()),
+                 store.write(create_ndt_result())]
+
+        self.assertEqual(
+            ['win10-chrome49-ndt_js-2016-02-26T155423Z-results.json',
+             'win10-chrome49-ndt_js-2016-02-26T155423Z-results-1.json',
+             'win10-chrome49-ndt_js-2016-02-26T155423Z-results-2.json'],
+            [os.path.basename(path) for path in paths])
+
+    def test_result_files_have_same_permissions_as_index(self):
+        store = result_store.ResultFileStore(self.root_dir,
+                                             layout=result_store.LAYOUT_FLAT)
+        path = store.write(create_ndt_result())
+
+        index_path = os.path.join(self.root_dir, result_store.INDEX_FILENAME)
+        self.assertEqual(
+            stat.S_IMODE(os.stat(index_path).st_mode),
+            stat.S_IMODE(os.stat(path).st_mode))
+        self.assertEqual(0644 & ~result_store._UMASK,
+                         stat.S_IMODE(os.stat(path).st_mode))
+
+    def test_temporary_files_are_not_left_behind(self):
+        store = result_store.ResultFileStore(self.root_dir,
+                                             layout=result_store.LAYOUT_FLAT)
+        store.write(create_ndt_result())
+
+        with mock.patch.object(result_store.os,
+                               'rename',
+                               side_effect=OSError('mock rename error')):
+            with self.assertRaises(OSError):
+                store.write(create_ndt_result())
+
+        self.assertItemsEqual(
+            ['win10-chrome49-ndt_js-2016-02-26T155423Z-results.json',
+             'win10-chrome49-ndt_js-2016-02-26T155423Z-results-1.json',
+             result_store.INDEX_FILENAME], os.listdir(self.root_dir))
+
+    def test_invalid_result_metadata_raises_error(self):
+        store = result_store.ResultFileStore(self.root_dir)
+
+        with self.assertRaises(filename.FilenameCreationError):
+            store.write(create_ndt_result(os_name='SpaghettiOS'))
+        self.assertEqual([], os.listdir(self.root_dir))
+
+    def test_result_without_start_time_raises_error(self):
+        store = result_store.ResultFileStore(self.root_dir)
+
+        with self.assertRaises(filename.FilenameCreationError):
+            store.write(create_ndt_result(start_time=None))
+        self.assertEqual([], os.listdir(self.root_dir))
+
+    def test_invalid_layout_raises_error(self):
+        with self.assertRaises(ValueError):
+            result_store.ResultFileStore(self.root_dir, layout='spiral')
+
+    def test_lookup_reads_results_from_index(self):
+        for layout in (result_store.LAYOUT_SHARDED, result_store.LAYOUT_FLAT):
+            root_dir = os.path.join(self.root_dir, layout)
+            store = result_store.ResultFileStore(root_dir, layout=layout)
+            expected_paths = [store.write(create_ndt_result()),
+                              store.write(create_ndt_result())]
+            store.write(create_ndt_result(browser=names.FIREFOX,
+                                          browser_version='45.0'))
+            store.write(create_ndt_result(os_name='Ubuntu'))
+            store.write(create_ndt_result(start_time=datetime.datetime(
+                2016, 2, 27, 15, 54, 23, 0, pytz.utc)))
+
+            with mock.patch.object(result_store.os, 'listdir') as mock_listdir:
+                self.assertEqual(expected_paths,
+                                 store.lookup('win10', 'chrome49',
+                                              datetime.date(2016, 2, 26)))
+                self.assertFalse(mock_listdir.called)
+            self.assertEqual([], store.lookup('osx10.11', 'safari9',
+                                              datetime.date(2016, 2, 26)))
+
+
+if __name__ == '__main__':
+    unittest.main()
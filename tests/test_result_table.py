@@ -0,0 +1,189 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import datetime
+import unittest
+
+import numpy
+import pytz
+
+from client_wrapper import result_encoder
+from client_wrapper import result_table
+from client_wrapper import results
+
+
+def create_ndt_result(browser, os, c2s_throughput, latency=None, errors=None):
+    result = results.NdtResult(
+        start_time=datetime.datetime(2016, 2, 26, 15, 51, 23, 452234, pytz.utc),
+        end_time=datetime.datetime(2016, 2, 26, 15, 51, 48, 1, pytz.utc),
+        duration_ns=24547767000,
+        c2s_result=results.NdtSingleTestResult(
+            throughput=c2s_throughput,
+            start_time=datetime.datetime(2016, 2, 26, 15, 51, 24, 0, pytz.utc),
+            end_time=datetime.datetime(2016, 2, 26, 15, 51, 34, 0, pytz.utc),
+            duration_ns=10000000000),
+        s2c_result=None,
+        latency=latency,
+        errors=errors or [])
+    result.browser = browser
+    result.browser_version = None if browser is None else '45.0'
+    result.os = os
+    result.client = 'ndt_js'
+    return result
+
+
+class ResultTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ndt_results = [
+            create_ndt_result('firefox',
+                              'Ubuntu',
+                              10.0,
+                              latency=20.0),
+            create_ndt_result('chrome', 'Ubuntu', 20.0),
+            create_ndt_result(
+                'firefox',
+                'Windows',
+                30.0,
+                errors=[
+                    results.TestError(
+                        datetime.datetime(2016, 2, 26, 15, 51, 50, 0,
+                                          pytz.utc), 'mock error')
+                ]),
+            create_ndt_result(None, 'Ubuntu', None),
+        ]
+        self.table = result_table.ResultTable.from_results(self.ndt_results)
+
+    def test_numeric_columns_are_numpy_arrays(self):
+        self.assertEqual(len(self.table), 4)
+        numpy.testing.assert_array_equal(self.table['c2s_throughput'],
+                                         [10.0, 20.0, 30.0, numpy.nan])
+        self.assertEqual(self.table['start_time'].dtype, numpy.int64)
+        self.assertEqual(self.table['start_time'][0], 1456501883452234000)
+        self.assertEqual(self.table['s2c_start_time'][0],
+                         result_table.MISSING_INT)
+        numpy.testing.assert_array_equal(self.table['error_count'],
+                                         [0, 0, 1, 0])
+        numpy.testing.assert_array_equal(
+            self.table['latency'], [20.0, numpy.nan, numpy.nan, numpy.nan])
+
+    def test_time_columns_can_be_viewed_as_datetime64(self):
+        start_times = self.table['start_time'].view('datetime64[ns]')
+        self.assertEqual(start_times[0],
+                         numpy.datetime64('2016-02-26T15:51:23.452234'))
+        s2c_start_times = self.table['s2c_start_time'].view('datetime64[ns]')
+        self.assertTrue(numpy.isnat(s2c_start_times[0]))
+
+    def test_categorical_columns_are_coded(self):
+        self.assertEqual(
+            self.table.categories('browser'), ['firefox', 'chrome'])
+        numpy.testing.assert_array_equal(
+            self.table.codes('browser'), [0, 1, 0, result_table.MISSING_CODE])
+        self.assertEqual(
+            list(self.table.values('browser')),
+            ['firefox', 'chrome', 'firefox', None])
+
+    def test_filter_by_mask(self):
+        with numpy.errstate(invalid='ignore'):
+            mask = (self.table.equals('os', 'Ubuntu')
+                    & (self.table['c2s_throughput'] > 15.0))
+        filtered = self.table.filter(mask)
+
+        self.assertEqual(len(filtered), 1)
+        self.assertEqual(filtered.row(0).browser, 'chrome')
+
+    def test_equals_unknown_value_matches_nothing(self):
+        self.assertFalse(self.table.equals('browser', 'safari').any())
+
+    def test_group_by_single_column(self):
+        groups = self.table.group_by('browser')
+
+        self.assertItemsEqual(['firefox', 'chrome', None], groups.keys())
+        numpy.testing.assert_array_equal(groups['firefox']['c2s_throughput'],
+                                         [10.0, 30.0])
+        self.assertEqual(len(groups[None]), 1)
+
+    def test_group_by_multiple_columns(self):
+        groups = self.table.group_by('os', 'browser')
+
+        self.assertItemsEqual(
+            [('Ubuntu', 'firefox'), ('Ubuntu', 'chrome'),
+             ('Windows', 'firefox'), ('Ubuntu', None)], groups.keys())
+        self.assertEqual(groups[('Windows', 'firefox')]['c2s_throughput'][0],
+                         30.0)
+
+    def test_converts_back_to_equivalent_results(self):
+        encoder = result_encoder.NdtResultEncoder()
+        round_tripped = self.table.to_results()
+
+        self.assertEqual(len(round_tripped), len(self.ndt_results))
+        for original, converted in zip(self.ndt_results, round_tripped):
+            self.assertEqual(
+                encoder.encode(original), encoder.encode(converted))
+
+    def test_converts_back_results_with_every_field(self):
+        encoder = result_encoder.NdtResultEncoder()
+        result = create_ndt_result('firefox', 'Ubuntu', None)
+        result.browser_launch_ns = 2000000000
+        result.load_retries = 2
+        result.load_backoff_ns = 1500000000
+        result.phase_timeouts_ns = {'start': 20000000000, 'c2s': 30000000000}
+        result.timed_out_phase = 'c2s'
+        result.spans = [results.PhaseSpan('load_url', 0, 500000000, {'get': 1},
+                                          {'get': 500000000})]
+        # Every row has a list of spans of the same length.
+        table = result_table.ResultTable.from_results([result] * 2)
+
+        self.assertEqual(table['load_retries'][0], 2)
+        self.assertEqual(list(table.values('timed_out_phase')), ['c2s'] * 2)
+        self.assertEqual(
+            encoder.encode(result), encoder.encode(table.filter([1]).row(0)))
+
+    def test_from_jsonl(self):
+        encoder = result_encoder.NdtResultEncoder()
+        lines = [encoder.encode(result) + '\n' for result in self.ndt_results]
+
+        table = result_table.ResultTable.from_jsonl(lines)
+
+        self.assertEqual(len(table), 4)
+        numpy.testing.assert_array_equal(table['start_time'],
+                                         self.table['start_time'])
+        self.assertEqual(table.row(2).errors[0].message, 'mock error')
+
+    def test_int64_columns_are_exact(self):
+        # Neither value can be represented exactly as a double.
+        result = create_ndt_result('firefox', 'Ubuntu', 10.0)
+        result.start_time = datetime.datetime(2016, 2, 26, 15, 51, 23, 452235,
+                                              pytz.utc)
+        result.duration_ns = 2**62 + 1
+        ndt_results = [result] * 2000
+
+        table = result_table.ResultTable.from_results(ndt_results)
+
+        self.assertEqual(len(table['start_time']), 2000)
+        self.assertTrue(numpy.all(table['start_time'] == 1456501883452235000))
+        self.assertTrue(numpy.all(table['duration_ns'] == 2**62 + 1))
+        self.assertEqual(table.row(1999).start_time, result.start_time)
+
+    def test_empty_table(self):
+        table = result_table.ResultTable.from_results([])
+
+        self.assertEqual(len(table), 0)
+        self.assertEqual(table.group_by('browser'), {})
+        self.assertEqual(table.to_results(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import copy
+import datetime
+import pickle
+import unittest
+
+import pytz
+
+from client_wrapper import results
+
+
+class NdtResultTest(unittest.TestCase):
+
+    def test_results_created_without_errors_have_independent_error_lists(self):
+        first = results.NdtResult()
+        second = results.NdtResult()
+        first.errors.append(results.TestError(None, 'mock error'))
+
+        self.assertEqual(len(first.errors), 1)
+        self.assertEqual(second.errors, [])
+
+    def test_results_do_not_have_per_instance_dicts(self):
+        for obj in (results.NdtResult(), results.NdtSingleTestResult(),
+                    results.TestError(None, 'mock error')):
+            self.assertFalse(hasattr(obj, '__dict__'))
+            with self.assertRaises(AttributeError):
+                obj.unknown_field = 'mock value'
+
+    def test_metadata_fields_default_to_none(self):
+        result = results.NdtResult()
+        for field in ('os', 'os_version', 'client', 'client_version', 'browser',
+                      'browser_version'):
+            self.assertIsNone(getattr(result, field))
+
+    def test_results_can_be_pickled_with_any_protocol(self):
+        result = results.NdtResult(
+            start_time=datetime.datetime(2016, 2, 26, 15, 51, 23, 452234,
+                                         pytz.utc),
+            c2s_result=results.NdtSingleTestResult(throughput=10.5),
+            errors=[results.TestError(None, 'mock error')])
+        result.browser = 'firefox'
+
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            unpickled = pickle.loads(pickle.dumps(result, protocol))
+            self.assertEqual(unpickled.start_time, result.start_time)
+            self.assertEqual(unpickled.c2s_result.throughput, 10.5)
+            self.assertEqual(unpickled.errors[0].message, 'mock error')
+            self.assertEqual(unpickled.browser, 'firefox')
+            self.assertIsNone(unpickled.s2c_result)
+
+    def test_results_can_be_deep_copied(self):
+        result = results.NdtResult(errors=[results.TestError(None, 'error')])
+        copied = copy.deepcopy(result)
+        copied.errors.append(results.TestError(None, 'another error'))
+
+        self.assertEqual(len(result.errors), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
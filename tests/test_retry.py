@@ -0,0 +1,63 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import random
+import unittest
+
+from client_wrapper import retry
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_backoff_grows_exponentially_up_to_maximum(self):
+        policy = retry.RetryPolicy(max_retries=5,
+                                   initial_backoff=0.5,
+                                   backoff_multiplier=3,
+                                   max_backoff=10,
+                                   jitter=0)
+
+        self.assertEqual([0.5, 1.5, 4.5, 10, 10],
+                         [policy.backoff(retry_number)
+                          for retry_number in range(1, 6)])
+
+    def test_jitter_shortens_backoff(self):
+        policy = retry.RetryPolicy(initial_backoff=4,
+                                   jitter=0.25,
+                                   random_source=random.Random(1))
+        backoffs = [policy.backoff(1) for _ in range(50)]
+
+        for backoff in backoffs:
+            self.assertGreater(backoff, 3)
+            self.assertLessEqual(backoff, 4)
+        self.assertGreater(len(set(backoffs)), 1)
+
+    def test_wait_sleeps_for_backoff(self):
+        sleeps = []
+        policy = retry.RetryPolicy(initial_backoff=2,
+                                   jitter=0,
+                                   sleep=sleeps.append)
+
+        self.assertEqual(4, policy.wait(2))
+        self.assertEqual([4], sleeps)
+
+    def test_invalid_settings_raise_error(self):
+        for kwargs in ({'max_retries': -1}, {'initial_backoff': -1},
+                       {'backoff_multiplier': 0.5}, {'jitter': 1.5}):
+            with self.assertRaises(ValueError):
+                retry.RetryPolicy(**kwargs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import random
+import threading
+import unittest
+
+from client_wrapper import scheduler
+
+
+class FakeClock(object):
+    """Monotonic clock that only advances when told to."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def monotonic_ns(self):
+        return int(round(self.seconds * 1e9))
+
+    def sleep(self, seconds):
+        self.seconds += seconds
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.run_times = []
+
+    def create_scheduler(self, **kwargs):
+        return scheduler.Scheduler(clock=self.clock,
+                                   sleep=self.clock.sleep,
+                                   **kwargs)
+
+    def create_task(self, durations):
+        """Creates a task whose runs take the given numbers of seconds."""
+        durations = iter(durations)
+
+        def task():
+            self.run_times.append(self.clock.seconds)
+            self.clock.sleep(next(durations, 1))
+
+        return task
+
+    def test_runs_start_on_a_fixed_cadence(self):
+        test_scheduler = self.create_scheduler(interval=300)
+        test_scheduler.run(self.create_task([10, 250, 40]), max_runs=4)
+
+        self.assertEqual([0, 300, 600, 900], self.run_times)
+        self.assertEqual(4, test_scheduler.runs)
+        self.assertEqual(0, test_scheduler.skipped_runs)
+
+    def test_jitter_delays_runs_within_their_slots(self):
+        test_scheduler = self.create_scheduler(interval=300,
+                                               jitter=30,
+                                               random_source=random.Random(1))
+        test_scheduler.run(self.create_task([]), max_runs=20)
+
+        for slot, run_time in enumerate(self.run_times):
+            self.assertGreaterEqual(run_time, slot * 300)
+            self.assertLessEqual(run_time, slot * 300 + 30)
+        self.assertGreater(len(set(t % 300 for t in self.run_times)), 1)
+
+    def test_overrunning_run_skips_passed_slots(self):
+        test_scheduler = self.create_scheduler(interval=300)
+        test_scheduler.run(self.create_task([10, 700, 10]), max_runs=3)
+
+        self.assertEqual([0, 300, 1200], self.run_times)
+        self.assertEqual(2, test_scheduler.skipped_runs)
+
+    def test_overrunning_run_queues_passed_slots(self):
+        test_scheduler = self.create_scheduler(
+            interval=300,
+            overrun_policy=scheduler.OVERRUN_QUEUE)
+        test_scheduler.run(self.create_task([10, 700, 10, 10]), max_runs=4)
+
+        # The run in the 900s slot starts as soon as the overrunning run
+        # finishes, and the slot at 600s is dropped because only one run is
+        # queued.
+        self.assertEqual([0, 300, 1000, 1200], self.run_times)
+        self.assertEqual(1, test_scheduler.skipped_runs)
+
+    def test_queue_depth_is_configurable(self):
+        test_scheduler = self.create_scheduler(
+            interval=300,
+            overrun_policy=scheduler.OVERRUN_QUEUE,
+            max_queued_runs=2)
+        test_scheduler.run(self.create_task([10, 700, 10, 10]), max_runs=4)
+
+        self.assertEqual([0, 300, 1000, 1010], self.run_times)
+        self.assertEqual(0, test_scheduler.skipped_runs)
+
+    def test_stop_interrupts_wait_for_next_slot(self):
+        test_scheduler = scheduler.Scheduler(interval=60)
+        thread = threading.Thread(target=test_scheduler.run,
+                                  args=(lambda: None,))
+        thread.start()
+        test_scheduler.stop()
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertLessEqual(test_scheduler.runs, 1)
+
+    def test_task_error_stops_scheduler(self):
+        test_scheduler = self.create_scheduler(interval=300)
+
+        def failing_task():
+            raise RuntimeError('browser crashed')
+
+        with self.assertRaises(RuntimeError):
+            test_scheduler.run(failing_task)
+
+    def test_invalid_jitter_raises_error(self):
+        with self.assertRaises(ValueError):
+            scheduler.Scheduler(interval=60, jitter=60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+# Copyright 2016 Measurement Lab
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+import json
+import math
+import random
+import unittest
+
+from client_wrapper import results
+from client_wrapper import summary_stats
+
+
+class RunningStatsTest(unittest.TestCase):
+
+    def test_empty_stats(self):
+        stats = summary_stats.RunningStats()
+
+        self.assertEqual(stats.count, 0)
+        self.assertIsNone(stats.min)
+        self.assertIsNone(stats.stddev)
+
+    def test_computes_moments(self):
+        stats = summary_stats.RunningStats()
+        for value in (2, 4, 4, 4, 5, 5, 7, 9):
+            stats.add(value)
+
+        self.assertEqual(stats.count, 8)
+        self.assertAlmostEqual(stats.mean, 5.0)
+        self.assertAlmostEqual(stats.variance, 32.0 / 7)
+        self.assertAlmostEqual(stats.stddev, math.sqrt(32.0 / 7))
+        self.assertEqual(stats.min, 2)
+        self.assertEqual(stats.max, 9)
+
+    def test_merge_equals_single_stream(self):
+        values = [random.uniform(0, 100) for _ in range(101)]
+        combined = summary_stats.RunningStats()
+        first = summary_stats.RunningStats()
+        second = summary_stats.RunningStats()
+        for value in values:
+            combined.add(value)
+        for value in values[:40]:
+            first.add(value)
+        for value in values[40:]:
+            second.add(value)
+
+        first.merge(second)
+
+        self.assertEqual(first.count, combined.count)
+        self.assertAlmostEqual(first.mean, combined.mean)
+        self.assertAlmostEqual(first.variance, combined.variance)
+        self.assertEqual(first.min, combined.min)
+        self.assertEqual(first.max, combined.max)
+
+    def test_merge_into_empty_stats(self):
+        stats = summary_stats.RunningStats()
+        other = summary_stats.RunningStats()
+        other.add(3.0)
+
+        stats.merge(other)
+        stats.merge(summary_stats.RunningStats())
+
+        self.assertEqual(stats.count, 1)
+        self.assertEqual(stats.mean, 3.0)
+        self.assertEqual(stats.min, 3.0)
+
+
+class QuantileSketchTest(unittest.TestCase):
+
+    def assertWithinRelativeError(self, actual, expected, relative_error):
+        self.assertLessEqual(abs(actual - expected), relative_error * expected)
+
+    def test_empty_sketch(self):
+        self.assertIsNone(summary_stats.QuantileSketch().quantile(0.5))
+
+    def test_quantiles_are_within_relative_accuracy(self):
+        sketch = summary_stats.QuantileSketch(relative_accuracy=0.01)
+        for value in range(1, 1001):
+            sketch.add(float(value))
+
+        self.assertWithinRelativeError(sketch.quantile(0.5), 500.5, 0.01)
+        self.assertWithinRelativeError(sketch.quantile(0.9), 900.1, 0.01)
+        self.assertWithinRelativeError(sketch.quantile(0.99), 990.01, 0.01)
+        self.assertWithinRelativeError(sketch.quantile(1), 1000, 0.01)
+
+    def test_counts_zero_values(self):
+        sketch = summary_stats.QuantileSketch()
+        for value in (0.0, 0.0, 0.0, 5.0):
+            sketch.add(value)
+
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertWithinRelativeError(sketch.quantile(1), 5.0, 0.01)
+
+    def test_rejects_negative_values(self):
+        with self.assertRaises(ValueError):
+            summary_stats.QuantileSketch().add(-1.0)
+
+    def test_bucket_count_is_bounded(self):
+        sketch = summary_stats.QuantileSketch(max_buckets=10)
+        for exponent in range(100):
+            sketch.add(2.0**exponent)
+
+        self.assertLessEqual(len(sketch.to_dict()['buckets']), 10)
+        self.assertEqual(sketch.count, 100)
+        self.assertWithinRelativeError(sketch.quantile(1), 2.0**99, 0.01)
+
+    def test_merge_equals_single_stream(self):
+        values = [random.lognormvariate(3, 1) for _ in range(500)]
+        combined = summary_stats.QuantileSketch()
+        first = summary_stats.QuantileSketch()
+        second = summary_stats.QuantileSketch()
+        for value in values:
+            combined.add(value)
+        for value in values[:200]:
+            first.add(value)
+        for value in values[200:]:
+            second.add(value)
+
+        first.merge(second)
+
+        for q in (0.0, 0.5, 0.9, 0.99, 1.0):
+            self.assertEqual(first.quantile(q), combined.quantile(q))
+
+    def test_merge_rejects_different_accuracy(self):
+        with self.assertRaises(summary_stats.IncompatibleSketchError):
+            summary_stats.QuantileSketch(relative_accuracy=0.01).merge(
+                summary_stats.QuantileSketch(relative_accuracy=0.02))
+
+
+class ResultSummaryTest(unittest.TestCase):
+
+    def create_ndt_result(self, c2s_throughput, s2c_throughput, latency):
+        return results.NdtResult(
+            c2s_result=results.NdtSingleTestResult(throughput=c2s_throughput),
+            s2c_result=results.NdtSingleTestResult(throughput=s2c_throughput),
+            latency=latency,
+            errors=[])
+
+    def test_summarizes_results(self):
+        summary = summary_stats.ResultSummary()
+        summary.add_result(self.create_ndt_result(10.0, 100.0, 20.0))
+        summary.add_result(self.create_ndt_result(30.0, None, 40.0))
+        summary.add_result(results.NdtResult(errors=[results.TestError(
+            None, 'mock error')]))
+
+        self.assertEqual(summary.result_count, 3)
+        self.assertEqual(summary.error_count, 1)
+        self.assertEqual(summary.metrics['c2s_throughput'].stats.count, 2)
+        self.assertEqual(summary.metrics['c2s_throughput'].stats.mean, 20.0)
+        self.assertEqual(summary.metrics['s2c_throughput'].stats.count, 1)
+        self.assertEqual(summary.metrics['latency'].quantile(0.0), 20.0)
+        self.assertEqual(summary.metrics['latency'].quantile(1.0), 40.0)
+
+    def test_format_report(self):
+        summary = summary_stats.ResultSummary()
+        summary.add_result(self.create_ndt_result(10.0, 100.0, None))
+
+        report = summary.format_report().splitlines()
+
+        self.assertEqual(report[0], 'results: 1, with errors: 0')
+        self.assertEqual(report[1], (
+            'c2s_throughput: n=1, mean=10.00, stddev=n/a, min=10.00, '
+            'max=10.00, p50=10.00, p90=10.00, p99=10.00'))
+        self.assertEqual(report[3], 'latency: no values')
+
+    def test_merges_summaries_round_tripped_through_json(self):
+        first = summary_stats.ResultSummary()
+        first.add_result(self.create_ndt_result(10.0, 100.0, 20.0))
+        second = summary_stats.ResultSummary()
+        second.add_result(self.create_ndt_result(30.0, 300.0, 40.0))
+        second.add_result(self.create_ndt_result(50.0, 500.0, 60.0))
+
+        merged = summary_stats.ResultSummary.from_dict(json.loads(json.dumps(
+            first.to_dict())))
+        merged.merge(summary_stats.ResultSummary.from_dict(json.loads(
+            json.dumps(second.to_dict()))))
+
+        self.assertEqual(merged.result_count, 3)
+        c2s_summary = merged.metrics['c2s_throughput']
+        self.assertEqual(c2s_summary.stats.count, 3)
+        self.assertAlmostEqual(c2s_summary.stats.mean, 30.0)
+        self.assertAlmostEqual(c2s_summary.stats.stddev, 20.0)
+        self.assertEqual(c2s_summary.sketch.count, 3)
+        self.assertLessEqual(abs(c2s_summary.quantile(0.5) - 30.0), 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()